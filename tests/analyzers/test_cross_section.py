@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+import pandas as pd
+from tradebot.analyzers.cross_section import (
+    batch_sma,
+    latest_indicator_table,
+    warmup_bars,
+)
+from tradebot.analyzers.technical import (
+    calculate_macd,
+    calculate_rsi,
+    calculate_sma,
+    get_latest_indicator,
+)
+
+
+class TestLatestIndicatorTable(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.dates = pd.bdate_range("2019-01-01", periods=1200)
+        self.tickers = ["AAPL", "TSLA", "MSFT", "NEW", "TINY"]
+        self.close = 100 + np.cumsum(rng.normal(0, 1, (1200, 5)), axis=0)
+        # shorter histories: NEW listed 100 bars ago, TINY only has 20 bars
+        self.close[:-100, 3] = np.nan
+        self.close[:-20, 4] = np.nan
+
+    def frame(self, column):
+        series = pd.Series(self.close[:, column], index=self.dates).dropna()
+        return pd.DataFrame({"close": series})
+
+    def test_matches_pandas_ta_per_ticker(self):
+        table = latest_indicator_table(self.close, self.tickers)
+
+        self.assertEqual(list(table.index), self.tickers)
+        for column, ticker in enumerate(self.tickers[:4]):
+            data = self.frame(column)
+            row = table.loc[ticker]
+            self.assertAlmostEqual(
+                row["sma"], get_latest_indicator(calculate_sma(data, 50)), places=9
+            )
+            self.assertAlmostEqual(
+                row["rsi"], get_latest_indicator(calculate_rsi(data, 14)), places=9
+            )
+            macd = get_latest_indicator(calculate_macd(data))
+            self.assertAlmostEqual(row["macd"], macd["MACD_12_26_9"], places=9)
+            self.assertAlmostEqual(row["macd_hist"], macd["MACDh_12_26_9"], places=9)
+            self.assertAlmostEqual(row["macd_signal"], macd["MACDs_12_26_9"], places=9)
+
+    def test_short_history_is_masked(self):
+        row = latest_indicator_table(self.close, self.tickers).loc["TINY"]
+
+        self.assertTrue(np.isnan(row["sma"]))
+        self.assertTrue(np.isnan(row["macd"]))
+        self.assertAlmostEqual(
+            row["rsi"],
+            get_latest_indicator(calculate_rsi(self.frame(4), 14)),
+            places=9,
+        )
+
+    def test_only_warm_up_window_is_needed(self):
+        window = warmup_bars()
+        self.assertLess(window, len(self.close))
+        pd.testing.assert_frame_equal(
+            latest_indicator_table(self.close, self.tickers),
+            latest_indicator_table(self.close[-window:], self.tickers),
+        )
+
+    def test_shape_mismatch(self):
+        with self.assertRaises(ValueError):
+            latest_indicator_table(self.close, self.tickers[:2])
+
+
+class TestBatchSMA(unittest.TestCase):
+    def test_gap_invalidates_window(self):
+        close = np.array([[1.0], [2.0], [np.nan], [4.0], [5.0], [6.0]])
+        sma = batch_sma(close, period=2)[:, 0]
+        np.testing.assert_array_equal(
+            np.isnan(sma), [True, False, True, True, False, False]
+        )
+        self.assertEqual(sma[-1], 5.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from tradebot.analyzers.panel import PricePanel
+from tradebot.analyzers.technical import calculate_sma
+from tradebot.clients.ohlcv_store import OHLCVStore
+
+
+def make_bars(dates, start_price=100.0):
+    n = len(dates)
+    return pd.DataFrame(
+        {
+            "open": [start_price + i for i in range(n)],
+            "high": [start_price + i + 1 for i in range(n)],
+            "low": [start_price + i - 1 for i in range(n)],
+            "close": [start_price + i + 0.5 for i in range(n)],
+            "volume": [1000.0 + i for i in range(n)],
+        },
+        index=pd.DatetimeIndex(dates),
+    )
+
+
+class TestPricePanel(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frames = {
+            "AAPL": make_bars(pd.bdate_range("2023-01-02", periods=30)),
+            "NEW": make_bars(pd.bdate_range("2023-01-16", periods=20), 50.0),
+        }
+        self.panel = PricePanel.build(self.tmp.name, self.frames)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_layout_and_dtypes(self):
+        close = self.panel.matrix("close")
+        self.assertIsInstance(close, np.memmap)
+        self.assertEqual(close.shape, (30, 2))
+        self.assertEqual(close.dtype, np.float32)
+        self.assertEqual(self.panel.matrix("volume").dtype, np.int64)
+        # the newer ticker is NaN-padded before its first bar
+        self.assertTrue(np.isnan(close[:10, 1]).all())
+        self.assertFalse(np.isnan(close[10:, 1]).any())
+
+    def test_frame_matches_source(self):
+        frame = self.panel.frame("new")
+        source = self.frames["NEW"]
+        self.assertTrue(frame.index.equals(source.index))
+        np.testing.assert_allclose(frame["close"], source["close"])
+        np.testing.assert_array_equal(frame["volume"], source["volume"])
+
+    def test_frame_works_with_technicals(self):
+        sma = calculate_sma(self.panel.frame("AAPL"), period=5)
+        expected = calculate_sma(self.frames["AAPL"], period=5)
+        self.assertAlmostEqual(sma.iloc[-1], expected.iloc[-1], places=4)
+
+    def test_frame_from_start(self):
+        frame = self.panel.frame("AAPL", start=pd.Timestamp("2023-02-01"))
+        self.assertEqual(frame.index[0], pd.Timestamp("2023-02-01"))
+
+    def test_unknown_ticker(self):
+        self.assertIsNone(self.panel.frame("GARBAGE"))
+        self.assertNotIn("GARBAGE", self.panel)
+
+    def test_reopen_shares_files(self):
+        reopened = PricePanel.open(self.tmp.name)
+        self.assertEqual(reopened.tickers, ["AAPL", "NEW"])
+        np.testing.assert_array_equal(
+            reopened.matrix("close"), self.panel.matrix("close")
+        )
+
+    def test_from_store(self):
+        with (
+            tempfile.TemporaryDirectory() as store_dir,
+            tempfile.TemporaryDirectory() as panel_dir,
+        ):
+            store = OHLCVStore(store_dir)
+            store.write("AAPL", self.frames["AAPL"])
+            panel = PricePanel.from_store(panel_dir, store, ["AAPL", "MISSING"])
+            self.assertEqual(panel.tickers, ["AAPL"])
+            self.assertEqual(len(panel.frame("AAPL")), 30)
+
+
+if __name__ == "__main__":
+    unittest.main()
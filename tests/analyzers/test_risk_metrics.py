@@ -0,0 +1,80 @@
+import unittest
+import numpy as np
+import pandas as pd
+from tradebot.analyzers.risk_metrics import (
+    covariance,
+    historical_var,
+    parametric_var,
+    portfolio_correlation,
+    realized_volatility,
+    returns_matrix,
+)
+
+
+class TestRiskMetrics(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.dates = pd.bdate_range("2024-01-01", periods=300)
+        self.market = rng.normal(0, 0.01, 300)
+        self.noise = rng.normal(0, 0.01, 300)
+
+    def prices(self, returns):
+        return pd.Series(100 * np.cumprod(1 + returns), index=self.dates)
+
+    def test_returns_are_aligned_and_trimmed(self):
+        closes = {
+            "AAPL": self.prices(self.market),
+            "NEW": self.prices(self.noise).iloc[-30:],
+        }
+        returns = returns_matrix(closes, lookback=100)
+
+        self.assertEqual(list(returns.columns), ["AAPL", "NEW"])
+        self.assertEqual(len(returns), 100)
+        self.assertEqual(int(returns["NEW"].notna().sum()), 29)
+        np.testing.assert_allclose(returns["AAPL"].to_numpy(), self.market[-100:])
+
+    def test_volatility_and_var_match_definitions(self):
+        returns = np.column_stack([self.market, 3 * self.noise])
+
+        volatility = realized_volatility(returns)
+        var = historical_var(returns, confidence=0.95)
+
+        np.testing.assert_allclose(
+            volatility[0], self.market.std(ddof=1) * np.sqrt(252)
+        )
+        self.assertAlmostEqual(var[0], -np.quantile(self.market, 0.05))
+        self.assertGreater(volatility[1], 2.5 * volatility[0])
+        self.assertGreater(var[1], var[0])
+
+    def test_short_histories_are_unknown(self):
+        self.assertTrue(np.isnan(realized_volatility(self.market[:10])[0]))
+        self.assertTrue(np.isnan(historical_var(self.market[:10])[0]))
+
+    def test_correlation_with_weighted_holdings(self):
+        holdings = np.column_stack([self.market, self.noise])
+
+        correlated = portfolio_correlation(self.market, holdings, [0.9, 0.1])
+        unrelated = portfolio_correlation(self.noise, holdings, [1.0, 0.0])
+
+        self.assertGreater(correlated, 0.9)
+        self.assertLess(abs(unrelated), 0.2)
+        self.assertIsNone(portfolio_correlation(self.market, holdings[:, :0], []))
+
+    def test_covariance_and_parametric_var(self):
+        returns = pd.DataFrame(
+            {"A": self.market, "B": self.market, "NEW": np.nan}, index=self.dates
+        )
+        returns.iloc[-5:, 2] = self.noise[-5:]
+        cov = covariance(returns)
+
+        # too little history for NEW: no variance, no covariance
+        self.assertEqual(cov[2].tolist(), [0.0, 0.0, 0.0])
+        one = parametric_var([100.0, 0.0, 0.0], cov)
+        self.assertAlmostEqual(one, 1.645 * 100 * np.std(self.market, ddof=1), 2)
+        # a sale offsets a perfectly correlated purchase
+        self.assertAlmostEqual(parametric_var([100.0, -100.0, 50.0], cov), 0.0)
+        self.assertAlmostEqual(parametric_var([100.0, 100.0, 0.0], cov), 2 * one)
+
+
+if __name__ == "__main__":
+    unittest.main()
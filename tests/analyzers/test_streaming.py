@@ -0,0 +1,69 @@
+import unittest
+import numpy as np
+import pandas as pd
+from tradebot.analyzers.streaming import IndicatorEngine
+from tradebot.analyzers.technical import (
+    calculate_macd,
+    calculate_rsi,
+    calculate_sma,
+    get_latest_indicator,
+)
+
+
+def random_walk(n, seed=0):
+    rng = np.random.default_rng(seed)
+    closes = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame(
+        {"close": closes}, index=pd.bdate_range("2020-01-01", periods=n)
+    )
+
+
+class TestIndicatorEngine(unittest.TestCase):
+    def assert_matches_pandas_ta(self, engine, data):
+        values = engine.values
+        self.assertAlmostEqual(
+            values.sma, get_latest_indicator(calculate_sma(data, period=50)), places=9
+        )
+        self.assertAlmostEqual(
+            values.rsi, get_latest_indicator(calculate_rsi(data, period=14)), places=9
+        )
+        macd = get_latest_indicator(calculate_macd(data.copy()))
+        self.assertAlmostEqual(values.macd, macd["MACD_12_26_9"], places=9)
+        self.assertAlmostEqual(values.macd_hist, macd["MACDh_12_26_9"], places=9)
+        self.assertAlmostEqual(values.macd_signal, macd["MACDs_12_26_9"], places=9)
+
+    def test_seed_matches_pandas_ta(self):
+        data = random_walk(300)
+        engine = IndicatorEngine.from_history(data)
+        self.assert_matches_pandas_ta(engine, data)
+        self.assertEqual(engine.last_timestamp, data.index[-1])
+
+    def test_updates_match_pandas_ta(self):
+        data = random_walk(300, seed=1)
+        engine = IndicatorEngine.from_history(data.iloc[:200])
+        for timestamp, close in data["close"].iloc[200:].items():
+            engine.update(close, timestamp)
+        self.assert_matches_pandas_ta(engine, data)
+
+    def test_quote_revises_last_bar(self):
+        data = random_walk(120, seed=2)
+        engine = IndicatorEngine.from_history(data.iloc[:-1])
+        engine.update(data["close"].iloc[-1] + 5)
+        engine.update(data["close"].iloc[-1] - 3, new_bar=False)
+        engine.update(data["close"].iloc[-1], new_bar=False)
+        self.assert_matches_pandas_ta(engine, data)
+
+    def test_warm_up(self):
+        engine = IndicatorEngine.from_history(random_walk(20))
+        values = engine.values
+        self.assertIsNone(values.sma)
+        self.assertIsNotNone(values.rsi)
+        self.assertIsNone(values.macd)
+
+    def test_no_data(self):
+        engine = IndicatorEngine.from_history(None)
+        self.assertIsNone(engine.values.sma)
+
+
+if __name__ == "__main__":
+    unittest.main()
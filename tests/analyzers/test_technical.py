@@ -1,6 +1,17 @@
+import tempfile
 import unittest
+from unittest.mock import MagicMock
+import numpy as np
 import pandas as pd
-from tradebot.analyzers.technical import calculate_sma
+from tradebot.analyzers.technical import (
+    IndicatorCache,
+    IndicatorSpec,
+    calculate_macd,
+    calculate_rsi,
+    calculate_sma,
+    get_latest_indicator,
+    latest_indicators,
+)
 
 
 class TestTechnicalAnalyzers(unittest.TestCase):
@@ -27,5 +38,89 @@ class TestTechnicalAnalyzers(unittest.TestCase):
         self.assertIsNone(sma)
 
 
+class TestLatestIndicators(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.data = pd.DataFrame(
+            {"close": 100 + np.cumsum(rng.normal(0, 1, 2000))},
+            index=pd.bdate_range("2015-01-01", periods=2000),
+        )
+
+    def test_matches_full_history(self):
+        values = latest_indicators(self.data)
+
+        self.assertLess(IndicatorSpec().window, len(self.data))
+        self.assertAlmostEqual(
+            values.sma, get_latest_indicator(calculate_sma(self.data, 50)), places=9
+        )
+        self.assertAlmostEqual(
+            values.rsi, get_latest_indicator(calculate_rsi(self.data, 14)), places=9
+        )
+        macd = get_latest_indicator(calculate_macd(self.data))
+        self.assertAlmostEqual(values.macd, macd["MACD_12_26_9"], places=9)
+        self.assertAlmostEqual(values.macd_hist, macd["MACDh_12_26_9"], places=9)
+        self.assertAlmostEqual(values.macd_signal, macd["MACDs_12_26_9"], places=9)
+
+    def test_does_not_modify_input(self):
+        shuffled = self.data.sample(frac=1, random_state=0)
+        before = shuffled.copy()
+
+        values = latest_indicators(shuffled, IndicatorSpec(sma_period=20))
+        calculate_macd(shuffled)
+
+        pd.testing.assert_frame_equal(shuffled, before)
+        self.assertAlmostEqual(
+            values.sma, get_latest_indicator(calculate_sma(self.data, 20)), places=9
+        )
+
+    def test_short_history(self):
+        values = latest_indicators(self.data.iloc[:20])
+        self.assertIsNone(values.sma)
+        self.assertIsNone(values.macd)
+        self.assertIsNotNone(values.rsi)
+        self.assertIsNone(latest_indicators(None))
+
+
+class TestIndicatorCache(unittest.TestCase):
+    def setUp(self):
+        self.data = pd.DataFrame(
+            {"close": [float(i) for i in range(100, 160)]},
+            index=pd.bdate_range("2024-01-01", periods=60),
+        )
+        self.indicator = MagicMock(side_effect=calculate_sma, __name__="calculate_sma")
+
+    def test_unchanged_history_hits(self):
+        cache = IndicatorCache()
+        first = cache.compute("AAPL", self.data, self.indicator, period=20)
+        second = cache.compute("aapl", self.data.copy(), self.indicator, period=20)
+
+        pd.testing.assert_series_equal(first, second)
+        self.indicator.assert_called_once()
+        self.assertEqual((cache.stats.hits, cache.stats.misses), (1, 1))
+
+    def test_new_bar_or_params_miss(self):
+        cache = IndicatorCache()
+        cache.compute("AAPL", self.data, self.indicator, period=20)
+        cache.compute("AAPL", self.data, self.indicator, period=50)
+        revised = self.data.copy()
+        revised.iloc[-1, 0] += 1
+        cache.compute("AAPL", revised, self.indicator, period=20)
+        cache.compute("TSLA", self.data, self.indicator, period=20)
+
+        self.assertEqual(self.indicator.call_count, 4)
+        self.assertEqual(cache.stats.hits, 0)
+
+    def test_spills_to_disk(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first = IndicatorCache(directory=directory)
+            values = first.compute("AAPL", self.data, latest_indicators)
+
+            second = IndicatorCache(directory=directory)
+            self.assertEqual(
+                second.compute("AAPL", self.data, latest_indicators), values
+            )
+            self.assertEqual(second.stats.hits, 1)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest.mock import MagicMock
+from tradebot.clients.context_cache import ContextCache
+
+
+class TestContextCache(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.cache = ContextCache(ttl=600, min_tokens=10, clock=lambda: self.now)
+        self.client = MagicMock()
+        self.client.caches.create.return_value.name = "cachedContents/aapl"
+        self.send = MagicMock(return_value="answer")
+        self.full_prompt = "static data " * 200
+
+    def generate(self, state, articles=(), static=None):
+        return self.cache.generate(
+            self.send,
+            key="strategy:AAPL",
+            full_prompt=self.full_prompt,
+            client=self.client,
+            model="gemini-2.5-flash",
+            system_instruction=["You are a trading assistant."],
+            static=static or {"fundamentals": {"PE Ratio": 30}},
+            state=state,
+            articles=list(articles),
+            tweets=[],
+        )
+
+    def test_sends_only_changes_against_cached_context(self):
+        self.assertEqual(self.generate({"RSI": 55, "SMA": 100}), "answer")
+        self.client.caches.create.assert_called_once()
+        self.assertEqual(self.send.call_args.args[1], "cachedContents/aapl")
+
+        self.generate({"RSI": 61, "SMA": 100}, articles=[{"title": "Beat"}])
+        self.client.caches.create.assert_called_once()
+        contents, cached = self.send.call_args.args
+        self.assertEqual(cached, "cachedContents/aapl")
+        self.assertIn("'RSI': 61", contents)
+        self.assertNotIn("SMA", contents)
+        self.assertIn("Beat", contents)
+        self.assertEqual(self.cache.stats.created, 1)
+        self.assertEqual(self.cache.stats.reused, 1)
+        self.assertGreater(self.cache.stats.tokens_saved, 0)
+
+    def test_recreates_context_when_static_data_changes_or_expires(self):
+        self.generate({"RSI": 55})
+        self.generate({"RSI": 55}, static={"fundamentals": {"PE Ratio": 31}})
+        self.assertEqual(self.client.caches.create.call_count, 2)
+
+        self.now = 600
+        self.generate({"RSI": 55}, static={"fundamentals": {"PE Ratio": 31}})
+        self.assertEqual(self.client.caches.create.call_count, 3)
+
+    def test_small_prompts_are_sent_in_full(self):
+        self.full_prompt = "short"
+        self.generate({"RSI": 55})
+
+        self.client.caches.create.assert_not_called()
+        self.send.assert_called_once_with("short", None)
+        self.assertEqual(self.cache.stats.fallbacks, 1)
+
+    def test_falls_back_when_caching_is_unavailable(self):
+        self.client.caches.create.side_effect = RuntimeError("not supported")
+        self.generate({"RSI": 55})
+        self.generate({"RSI": 56})
+
+        # not retried until `retry_after` has passed
+        self.client.caches.create.assert_called_once()
+        self.send.assert_called_with(self.full_prompt, None)
+        self.assertEqual(self.cache.stats.fallbacks, 2)
+
+    def test_resends_full_prompt_when_cached_request_fails(self):
+        self.generate({"RSI": 55})
+        self.send.side_effect = [RuntimeError("cache expired"), "answer"]
+
+        self.assertEqual(self.generate({"RSI": 56}), "answer")
+        self.send.assert_called_with(self.full_prompt, None)
+        self.assertEqual(self.cache.stats.tokens_saved, 0)
+
+        self.send.side_effect = None
+        self.generate({"RSI": 57})
+        self.assertEqual(self.client.caches.create.call_count, 2)
+
+    def test_log_stats_resets(self):
+        self.generate({"RSI": 55})
+        stats = self.cache.log_stats()
+
+        self.assertEqual(stats["created"], 1)
+        self.assertEqual(self.cache.stats.created, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,27 @@
+import json
+import tempfile
+import threading
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
 import pandas as pd
 from unittest.mock import patch
-from tradebot.clients.fin_provider import FinDataProvider
+from tradebot.clients import fin_provider
+from tradebot.clients.fin_provider import FinDataProvider, FundamentalsCache
+from tradebot.clients.ohlcv_store import OHLCVStore
+
+
+def make_daily(dates):
+    n = len(dates)
+    data = {
+        "1. open": [100.0 + i for i in range(n)],
+        "2. high": [102.0 + i for i in range(n)],
+        "3. low": [99.0 + i for i in range(n)],
+        "4. close": [101.0 + i for i in range(n)],
+        "5. volume": [1000.0 + i for i in range(n)],
+    }
+    # Alpha Vantage returns the newest bar first
+    return pd.DataFrame(data, index=pd.to_datetime(dates)).iloc[::-1], None
 
 
 class TestFinDataProvider(unittest.TestCase):
@@ -47,6 +67,15 @@ class TestFinDataProvider(unittest.TestCase):
         self.assertIsNotNone(historical_data)
         self.assertEqual(len(historical_data), 2)
 
+    @patch("alpha_vantage.timeseries.TimeSeries.get_daily")
+    def test_get_historical_data_span(self, mock_get_daily):
+        mock_get_daily.return_value = make_daily(
+            pd.date_range("2022-01-01", "2023-06-30", freq="D")
+        )
+        historical_data = self.provider.get_historical_data("AAPL", span="month")
+        self.assertEqual(historical_data.index.min(), pd.Timestamp("2023-05-30"))
+        self.assertEqual(historical_data.index.max(), pd.Timestamp("2023-06-30"))
+
     @patch("alpha_vantage.fundamentaldata.FundamentalData.get_company_overview")
     def test_get_company_overview_success(self, mock_get_overview):
         mock_get_overview.return_value = (pd.DataFrame([{"Symbol": "AAPL"}]), None)
@@ -71,5 +100,214 @@ class TestFinDataProvider(unittest.TestCase):
         self.assertEqual(earnings["reportedEPS"].iloc[0], 1.52)
 
 
+class TestFinDataProviderOHLCVCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.provider = FinDataProvider(
+            api_key="test_key", ohlcv_store=OHLCVStore(self.tmp.name)
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    @patch("alpha_vantage.timeseries.TimeSeries.get_daily")
+    def test_cold_then_warm_run(self, mock_get_daily):
+        full_dates = pd.bdate_range("2023-01-02", "2023-03-31")
+        mock_get_daily.return_value = make_daily(full_dates)
+        cold = self.provider.get_historical_data("AAPL")
+        mock_get_daily.assert_called_once_with("AAPL", "full")
+        self.assertEqual(len(cold), len(full_dates))
+
+        mock_get_daily.reset_mock()
+        mock_get_daily.return_value = make_daily(
+            pd.bdate_range("2023-03-30", "2023-04-05")
+        )
+        warm = self.provider.get_historical_data("AAPL")
+        mock_get_daily.assert_called_once_with("AAPL", "compact")
+        self.assertEqual(warm.index.max(), pd.Timestamp("2023-04-05"))
+        self.assertEqual(len(warm), len(full_dates) + 3)
+        self.assertTrue(warm.index.is_unique)
+
+    @patch("alpha_vantage.timeseries.TimeSeries.get_daily")
+    def test_reloads_when_gap_exceeds_compact_window(self, mock_get_daily):
+        mock_get_daily.return_value = make_daily(["2023-01-02", "2023-01-03"])
+        self.provider.get_historical_data("AAPL")
+
+        mock_get_daily.side_effect = [
+            make_daily(["2023-09-01", "2023-09-05"]),
+            make_daily(["2023-01-02", "2023-01-03", "2023-09-01", "2023-09-05"]),
+        ]
+        historical_data = self.provider.get_historical_data("AAPL")
+        self.assertEqual(mock_get_daily.call_args_list[-1].args, ("AAPL", "full"))
+        self.assertEqual(len(historical_data), 4)
+
+    @patch("alpha_vantage.timeseries.TimeSeries.get_daily")
+    def test_serves_cache_when_top_up_fails(self, mock_get_daily):
+        mock_get_daily.return_value = make_daily(["2023-01-02", "2023-01-03"])
+        self.provider.get_historical_data("AAPL")
+
+        mock_get_daily.return_value = (None, None)
+        historical_data = self.provider.get_historical_data("AAPL")
+        self.assertEqual(len(historical_data), 2)
+
+    @patch("alpha_vantage.timeseries.TimeSeries.get_daily")
+    def test_serves_cache_when_top_up_is_rate_limited(self, mock_get_daily):
+        mock_get_daily.return_value = make_daily(["2023-01-02", "2023-01-03"])
+        self.provider.get_historical_data("AAPL")
+
+        mock_get_daily.side_effect = ValueError(
+            "Thank you for using Alpha Vantage! Our standard API rate limit is ..."
+        )
+        historical_data = self.provider.get_historical_data("AAPL")
+        self.assertEqual(len(historical_data), 2)
+
+    @patch("alpha_vantage.timeseries.TimeSeries.get_daily", return_value=(None, None))
+    def test_no_data(self, mock_get_daily):
+        self.assertIsNone(self.provider.get_historical_data("GARBAGE"))
+
+
+class TestFinDataProviderFundamentalsCache(unittest.TestCase):
+    def setUp(self):
+        self.now = pd.Timestamp("2023-05-15").timestamp()
+        self.cache = FundamentalsCache(ttl=7 * 24 * 3600, clock=lambda: self.now)
+        self.provider = FinDataProvider(
+            api_key="test_key", fundamentals_cache=self.cache
+        )
+
+    @staticmethod
+    def earnings(dates):
+        data = {"fiscalDateEnding": dates, "reportedEPS": [1.0] * len(dates)}
+        return pd.DataFrame(data), None
+
+    @patch("alpha_vantage.fundamentaldata.FundamentalData.get_company_overview")
+    def test_overview_served_from_cache(self, mock_get_overview):
+        mock_get_overview.return_value = (pd.DataFrame([{"Symbol": "AAPL"}]), None)
+        self.provider.get_company_overview("AAPL")
+        overview = self.provider.get_company_overview("AAPL")
+
+        self.assertEqual(overview["Symbol"].iloc[0], "AAPL")
+        mock_get_overview.assert_called_once()
+
+        self.now += 8 * 24 * 3600
+        self.provider.get_company_overview("AAPL")
+        self.assertEqual(mock_get_overview.call_count, 2)
+
+    @patch("alpha_vantage.fundamentaldata.FundamentalData.get_balance_sheet_quarterly")
+    @patch("alpha_vantage.fundamentaldata.FundamentalData.get_earnings_quarterly")
+    def test_new_quarter_invalidates_fundamentals(
+        self, mock_get_earnings, mock_get_balance_sheet
+    ):
+        mock_get_balance_sheet.return_value = (
+            pd.DataFrame({"fiscalDateEnding": ["2023-03-31"], "totalAssets": [1000]}),
+            None,
+        )
+        mock_get_earnings.return_value = self.earnings(["2023-03-31", "2022-12-31"])
+        # the quarter ending 2023-06-30 is over, so earnings are rechecked daily
+        self.now = pd.Timestamp("2023-07-02").timestamp()
+        self.provider.get_balance_sheet("AAPL")
+        self.provider.get_earnings_history("AAPL")
+
+        self.now += 2 * 24 * 3600
+        self.provider.get_balance_sheet("AAPL")
+        self.assertEqual(mock_get_balance_sheet.call_count, 1)
+
+        mock_get_earnings.return_value = self.earnings(["2023-06-30", "2023-03-31"])
+        earnings = self.provider.get_earnings_history("AAPL")
+        self.assertEqual(earnings.index.max(), pd.Timestamp("2023-06-30"))
+        self.assertEqual(mock_get_earnings.call_count, 2)
+
+        self.provider.get_balance_sheet("AAPL")
+        self.assertEqual(mock_get_balance_sheet.call_count, 2)
+
+
+class StubBulkQuoteHandler(BaseHTTPRequestHandler):
+    """Serves REALTIME_BULK_QUOTES responses for a fixed set of prices."""
+
+    prices = {"AAPL": "150.25", "MSFT": "310.5", "TSLA": "n/a"}
+    requests_seen: list = []
+
+    def do_GET(self):
+        params = parse_qs(urlparse(self.path).query)
+        symbols = params["symbol"][0].split(",")
+        self.requests_seen.append(symbols)
+        if params["apikey"][0] == "free_key":
+            body = {"Information": "This is a premium endpoint."}
+        elif params["apikey"][0] != "test_key":
+            body = {"Error Message": "Invalid API key"}
+        else:
+            body = {
+                "endpoint": "Realtime Bulk Quotes",
+                "data": [
+                    {"symbol": symbol, "close": self.prices[symbol]}
+                    for symbol in symbols
+                    if symbol in self.prices
+                ],
+            }
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestFinDataProviderBulkQuotes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), StubBulkQuoteHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.server_port}/query"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        StubBulkQuoteHandler.requests_seen = []
+
+    def test_get_latest_prices(self):
+        provider = FinDataProvider(api_key="test_key", base_url=self.base_url)
+        prices, errors = provider.get_latest_prices(["aapl", "MSFT", "TSLA", "GARBAGE"])
+
+        self.assertEqual(prices, {"AAPL": 150.25, "MSFT": 310.5})
+        self.assertEqual(set(errors), {"TSLA", "GARBAGE"})
+        self.assertEqual(errors["GARBAGE"], "No quote returned")
+        self.assertEqual(len(StubBulkQuoteHandler.requests_seen), 1)
+
+    def test_get_latest_prices_chunks_requests(self):
+        provider = FinDataProvider(api_key="test_key", base_url=self.base_url)
+        with patch.object(fin_provider, "BULK_QUOTE_LIMIT", 2):
+            prices, errors = provider.get_latest_prices(["AAPL", "MSFT", "GARBAGE"])
+
+        self.assertEqual(
+            StubBulkQuoteHandler.requests_seen, [["AAPL", "MSFT"], ["GARBAGE"]]
+        )
+        self.assertEqual(len(prices), 2)
+        self.assertEqual(list(errors), ["GARBAGE"])
+
+    def test_get_latest_prices_api_error(self):
+        provider = FinDataProvider(api_key="bad_key", base_url=self.base_url)
+        prices, errors = provider.get_latest_prices(["AAPL", "MSFT"])
+
+        self.assertEqual(prices, {})
+        self.assertEqual(errors, {"AAPL": "Invalid API key", "MSFT": "Invalid API key"})
+
+    def test_get_latest_prices_stops_after_premium_error(self):
+        provider = FinDataProvider(api_key="free_key", base_url=self.base_url)
+        with patch.object(fin_provider, "BULK_QUOTE_LIMIT", 1):
+            prices, errors = provider.get_latest_prices(["AAPL", "MSFT"])
+            self.assertEqual(prices, {})
+            self.assertEqual(set(errors), {"AAPL", "MSFT"})
+            self.assertEqual(len(StubBulkQuoteHandler.requests_seen), 1)
+
+            provider.get_latest_prices(["TSLA"])
+        self.assertEqual(len(StubBulkQuoteHandler.requests_seen), 1)
+
+
 if __name__ == "__main__":
     unittest.main()
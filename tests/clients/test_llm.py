@@ -0,0 +1,99 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+from google.genai.errors import APIError
+from tradebot.clients.llm import LLMInvoker, LLMMetrics, LLMTimeout
+
+
+class TestLLMInvoker(unittest.TestCase):
+    def test_returns_result(self):
+        invoker = LLMInvoker()
+        fn = MagicMock(return_value="answer")
+
+        self.assertEqual(invoker.call(fn, model="m", contents="c"), "answer")
+        fn.assert_called_once_with(model="m", contents="c")
+        self.assertEqual(invoker.metrics.stats.succeeded, 1)
+
+    def test_deadline(self):
+        invoker = LLMInvoker(timeout=0.1)
+        release = threading.Event()
+
+        start = time.monotonic()
+        with self.assertRaises(LLMTimeout):
+            invoker.call(lambda: release.wait(5))
+        release.set()
+
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(invoker.metrics.stats.timed_out, 1)
+
+    def test_retries_transient_errors(self):
+        invoker = LLMInvoker(retries=2, backoff=0.01)
+        fn = MagicMock(
+            side_effect=[APIError(503, {}), ConnectionError("reset"), "answer"]
+        )
+
+        self.assertEqual(invoker.call(fn), "answer")
+        self.assertEqual(fn.call_count, 3)
+        self.assertEqual(invoker.metrics.stats.retries, 2)
+
+    def test_does_not_retry_other_errors(self):
+        invoker = LLMInvoker(retries=2, backoff=0.01)
+        fn = MagicMock(side_effect=APIError(400, {}))
+
+        with self.assertRaises(APIError):
+            invoker.call(fn)
+        fn.assert_called_once()
+        self.assertEqual(invoker.metrics.stats.failed, 1)
+
+    def test_hedges_slow_calls(self):
+        invoker = LLMInvoker(hedge_percentile=0.9, hedge_min_samples=3)
+        for _ in range(3):
+            invoker.metrics.observe(0.01)
+        release = threading.Event()
+        calls = []
+
+        def fn():
+            calls.append(1)
+            if len(calls) == 1:
+                # the first request stalls; the hedge answers
+                release.wait(5)
+                return "slow"
+            return "fast"
+
+        self.assertEqual(invoker.call(fn), "fast")
+        release.set()
+        self.assertEqual(invoker.metrics.stats.hedged, 1)
+        self.assertEqual(invoker.metrics.stats.hedge_wins, 1)
+
+    def test_does_not_hedge_on_a_saturated_pool(self):
+        invoker = LLMInvoker(
+            max_concurrency=1, timeout=0.3, hedge_percentile=0.9, hedge_min_samples=3
+        )
+        for _ in range(3):
+            invoker.metrics.observe(0.01)
+        release = threading.Event()
+        fn = MagicMock(side_effect=lambda: release.wait(5))
+
+        with self.assertRaises(LLMTimeout):
+            invoker.call(fn)
+        release.set()
+
+        fn.assert_called_once()
+        self.assertEqual(invoker.metrics.stats.hedged, 0)
+
+
+class TestLLMMetrics(unittest.TestCase):
+    def test_percentiles(self):
+        metrics = LLMMetrics()
+        self.assertIsNone(metrics.percentile(0.5))
+        for latency in range(1, 101):
+            metrics.observe(latency / 100)
+
+        snapshot = metrics.log_stats()
+        self.assertAlmostEqual(snapshot["p50"], 0.51)
+        self.assertAlmostEqual(snapshot["p99"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+import time
+import unittest
+from unittest.mock import MagicMock
+from google.genai.types import GenerateContentConfig, HttpOptions
+from tradebot.clients.llm import LLMInvoker
+from tradebot.clients.llm_backend import GeminiBackend, StubBackend
+from tradebot.risk_mgmt import RiskManager, TradeDecision
+from tradebot.strategy import BatchTradeSignal, StockData, StrategyEngine, TradeSignal
+
+
+def make_stock(ticker):
+    return StockData(
+        ticker=ticker,
+        price=150.0,
+        volume=1000000,
+        sma=145.0,
+        rsi=60.0,
+        macd=1.5,
+        pe_ratio=25.0,
+        peg_ratio=1.5,
+        roe=0.15,
+        revenue_growth=0.1,
+        eps_growth=0.2,
+        de_ratio=0.5,
+        news_articles=[{"title": f"{ticker} News"}],
+        tweets=[],
+    )
+
+
+class TestStubBackend(unittest.TestCase):
+    def test_answers_follow_the_schema(self):
+        backend = StubBackend()
+        config = GenerateContentConfig(response_schema=list[BatchTradeSignal])
+
+        response = backend.generate(
+            "stub", "Ticker: AAPL\n...\nTicker: TSLA\n...", config
+        )
+
+        self.assertEqual([a["ticker"] for a in response.parsed], ["AAPL", "TSLA"])
+        self.assertIn(response.parsed[0]["signal"], {"BUY", "SELL", "HOLD"})
+        self.assertEqual(
+            backend.generate("stub", "Ticker: AAPL", config).parsed[0],
+            response.parsed[0],
+        )
+        self.assertGreater(backend.metrics.stats.input_tokens, 0)
+        self.assertGreater(backend.metrics.stats.output_tokens, 0)
+
+    def test_reply_shape_matches_the_sdk(self):
+        # a list schema parses into a list and a class schema into one object
+        backend = StubBackend()
+        single = GenerateContentConfig(response_schema=TradeSignal)
+        listed = GenerateContentConfig(response_schema=list[TradeSignal])
+
+        self.assertIn("signal", backend.generate("stub", "Ticker: AAPL", single).parsed)
+        self.assertEqual(
+            len(backend.generate("stub", "Ticker: AAPL", listed).parsed), 1
+        )
+
+    def test_latency_and_failures(self):
+        backend = StubBackend(latency=0.05, failure_rate=1.0)
+
+        start = time.monotonic()
+        with self.assertRaises(ConnectionError):
+            backend.generate("stub", "Ticker: AAPL")
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.05)
+        self.assertEqual(backend.metrics.stats.errors, 1)
+
+    def test_unparsed_replies_are_counted(self):
+        backend = StubBackend(responder=lambda model, contents, config: None)
+        backend.generate("stub", "anything")
+        self.assertEqual(backend.metrics.snapshot()["parse_failures"], 1)
+
+
+class TestGeminiBackend(unittest.TestCase):
+    def test_records_usage(self):
+        client = MagicMock()
+        reply = client.models.generate_content.return_value
+        reply.parsed = {"signal": "BUY"}
+        reply.text = '{"signal": "BUY"}'
+        reply.usage_metadata.prompt_token_count = 120
+        reply.usage_metadata.candidates_token_count = 30
+        backend = GeminiBackend(client)
+
+        response = backend.generate("gemini-2.5-flash", "prompt")
+
+        self.assertEqual(response.parsed, {"signal": "BUY"})
+        stats = backend.metrics.snapshot()
+        self.assertEqual((stats["input_tokens"], stats["output_tokens"]), (120, 30))
+        self.assertIsNotNone(stats["p50"])
+
+    def test_requests_carry_an_http_timeout(self):
+        client = MagicMock()
+        client.models.generate_content.return_value.usage_metadata = None
+        backend = GeminiBackend(client, timeout=2.5)
+
+        backend.generate("gemini-2.5-flash", "prompt", GenerateContentConfig())
+        config = client.models.generate_content.call_args.kwargs["config"]
+        self.assertEqual(config.http_options.timeout, 2500)
+
+        # a timeout set by the caller is kept
+        backend.generate(
+            "gemini-2.5-flash",
+            "prompt",
+            GenerateContentConfig(http_options=HttpOptions(timeout=100)),
+        )
+        config = client.models.generate_content.call_args.kwargs["config"]
+        self.assertEqual(config.http_options.timeout, 100)
+
+
+class TestOfflineDecisions(unittest.TestCase):
+    def test_decision_path_runs_on_the_stub(self):
+        backend = StubBackend(latency=0.01)
+        invoker = LLMInvoker(max_concurrency=4)
+        engine = StrategyEngine(backend=backend, invoker=invoker, model="stub")
+        manager = RiskManager(
+            rh_client=MagicMock(), backend=backend, invoker=invoker, model="stub"
+        )
+        stocks = [make_stock(ticker) for ticker in ("AAPL", "TSLA", "MSFT")]
+
+        decisions = engine.decide_trades(stocks)
+        risk = manager.assess_risk(stocks[0], {"cash": 1000})
+
+        self.assertEqual(set(decisions), {"AAPL", "TSLA", "MSFT"})
+        self.assertEqual(risk[0], TradeDecision.APPROVED)
+        self.assertEqual(backend.metrics.stats.requests, 2)
+        self.assertEqual(backend.metrics.stats.parse_failures, 0)
+
+    def test_malformed_batch_entries_are_counted(self):
+        def responder(model, contents, config):
+            if config.response_schema is TradeSignal:
+                return {"signal": "HOLD"}
+            return [{"ticker": "AAPL", "signal": "MAYBE"}]
+
+        backend = StubBackend(responder=responder)
+        engine = StrategyEngine(backend=backend)
+
+        decisions = engine.decide_trades([make_stock("AAPL"), make_stock("TSLA")])
+
+        self.assertEqual(set(decisions), {"AAPL", "TSLA"})
+        self.assertEqual(backend.metrics.stats.parse_failures, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+import pandas as pd
+from tradebot.clients.ohlcv_store import OHLCVStore
+
+
+def make_bars(dates, start_price=100.0):
+    n = len(dates)
+    return pd.DataFrame(
+        {
+            "open": [start_price + i for i in range(n)],
+            "high": [start_price + i + 1 for i in range(n)],
+            "low": [start_price + i - 1 for i in range(n)],
+            "close": [start_price + i + 0.5 for i in range(n)],
+            "volume": [1000.0 + i for i in range(n)],
+        },
+        index=pd.to_datetime(dates),
+    )
+
+
+class TestOHLCVStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = OHLCVStore(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_read_missing_ticker(self):
+        self.assertIsNone(self.store.read("AAPL"))
+        self.assertIsNone(self.store.last_date("AAPL"))
+
+    def test_write_and_read_round_trip(self):
+        dates = ["2023-01-04", "2023-01-03", "2023-01-05"]
+        self.store.write("aapl", make_bars(dates))
+
+        frame = self.store.read("AAPL")
+        self.assertEqual(
+            list(frame.columns), ["open", "high", "low", "close", "volume"]
+        )
+        self.assertTrue(frame.index.is_monotonic_increasing)
+        self.assertEqual(len(frame), 3)
+        self.assertEqual(frame["volume"].dtype, "int64")
+        self.assertEqual(self.store.last_date("AAPL"), pd.Timestamp("2023-01-05"))
+
+    def test_read_from_start_date(self):
+        dates = pd.bdate_range("2023-01-02", periods=10)
+        self.store.write("AAPL", make_bars(dates))
+
+        frame = self.store.read("AAPL", start=pd.Timestamp("2023-01-10"))
+        self.assertEqual(frame.index[0], pd.Timestamp("2023-01-10"))
+        self.assertEqual(len(frame), 4)
+
+    def test_append_replaces_overlapping_bars(self):
+        self.store.write("AAPL", make_bars(["2023-01-03", "2023-01-04"]))
+        self.store.append(
+            "AAPL", make_bars(["2023-01-04", "2023-01-05"], start_price=200.0)
+        )
+
+        frame = self.store.read("AAPL")
+        self.assertEqual(len(frame), 3)
+        self.assertEqual(frame["open"].iloc[0], 100.0)
+        self.assertEqual(frame.loc["2023-01-04", "open"], 200.0)
+        self.assertEqual(frame.loc["2023-01-05", "open"], 201.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+import pandas as pd
+from tradebot.clients.fin_provider import FinDataProvider
+from tradebot.clients.rate_limiter import (
+    DailyQuota,
+    Priority,
+    RateLimitExceeded,
+    RequestScheduler,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refills_over_time(self):
+        clock = FakeClock()
+        bucket = TokenBucket(capacity=2, period=60, clock=clock)
+        bucket.consume()
+        bucket.consume()
+        self.assertAlmostEqual(bucket.wait_time(), 30.0)
+
+        clock.now = 30.0
+        self.assertEqual(bucket.wait_time(), 0.0)
+
+
+class TestDailyQuota(unittest.TestCase):
+    def test_usage_carries_over_between_processes_until_midnight(self):
+        now = [datetime(2025, 1, 2, 23, 0, tzinfo=timezone.utc)]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "quota.json")
+            DailyQuota(2, path, now=lambda: now[0]).consume()
+
+            quota = DailyQuota(2, path, now=lambda: now[0])
+            self.assertEqual(quota.wait_time(), 0.0)
+            quota.consume()
+            self.assertEqual(
+                DailyQuota(2, path, now=lambda: now[0]).wait_time(), 3600.0
+            )
+
+            now[0] = datetime(2025, 1, 3, 0, 1, tzinfo=timezone.utc)
+            self.assertEqual(DailyQuota(2, path, now=lambda: now[0]).wait_time(), 0.0)
+
+
+class TestRequestScheduler(unittest.TestCase):
+    def make_scheduler(self, rate=100, quota=100, max_concurrency=1):
+        return RequestScheduler(
+            rate=TokenBucket(rate, 60),
+            quota=TokenBucket(quota, 24 * 60 * 60),
+            max_concurrency=max_concurrency,
+        )
+
+    def test_issues_call(self):
+        scheduler = self.make_scheduler()
+        self.assertEqual(scheduler.call(("quote", "AAPL"), lambda: 1), 1)
+        self.assertEqual(scheduler.stats.issued, 1)
+
+    def test_coalesces_identical_requests(self):
+        scheduler = self.make_scheduler(max_concurrency=4)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_fetch():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "quote"
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            first = executor.submit(scheduler.call, ("quote", "AAPL"), slow_fetch)
+            started.wait(5)
+            others = [
+                executor.submit(scheduler.call, ("quote", "AAPL"), slow_fetch)
+                for _ in range(2)
+            ]
+            while scheduler.stats.coalesced < 2:
+                time.sleep(0.001)
+            release.set()
+            results = [first.result()] + [f.result() for f in others]
+
+        self.assertEqual(results, ["quote"] * 3)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(scheduler.stats.issued, 1)
+        self.assertEqual(scheduler.stats.coalesced, 2)
+
+    def test_serves_higher_priority_first(self):
+        scheduler = self.make_scheduler(max_concurrency=1)
+        release = threading.Event()
+        order = []
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            blocker = executor.submit(
+                scheduler.call, "blocker", lambda: release.wait(5)
+            )
+            while scheduler.stats.issued < 1:
+                time.sleep(0.001)
+            low = executor.submit(
+                scheduler.call,
+                ("overview", "TSLA"),
+                lambda: order.append("overview"),
+                Priority.FUNDAMENTALS,
+            )
+            while scheduler.stats.deferred < 1:
+                time.sleep(0.001)
+            high = executor.submit(
+                scheduler.call,
+                ("quote", "AAPL"),
+                lambda: order.append("quote"),
+                Priority.HELD_QUOTE,
+            )
+            while scheduler.stats.deferred < 2:
+                time.sleep(0.001)
+            release.set()
+            for future in (blocker, low, high):
+                future.result()
+
+        self.assertEqual(order, ["quote", "overview"])
+
+    def test_waits_for_rate_tokens(self):
+        scheduler = RequestScheduler(
+            rate=TokenBucket(1, 0.05), quota=TokenBucket(10, 60)
+        )
+        scheduler.call("a", lambda: None)
+        scheduler.call("b", lambda: None)
+        self.assertEqual(scheduler.stats.issued, 2)
+        self.assertEqual(scheduler.stats.deferred, 1)
+
+    def test_rejects_when_quota_exhausted(self):
+        scheduler = self.make_scheduler(quota=1)
+        scheduler.call("a", lambda: None)
+        with self.assertRaises(RateLimitExceeded):
+            scheduler.call("b", lambda: None)
+        stats = scheduler.log_stats()
+        self.assertEqual(stats["rejected"], 1)
+        self.assertEqual(scheduler.stats.rejected, 0)
+
+    def test_shares_errors_and_clears_in_flight(self):
+        scheduler = self.make_scheduler()
+
+        def fail():
+            raise ValueError("API error")
+
+        with self.assertRaises(ValueError):
+            scheduler.call("a", fail)
+        self.assertEqual(scheduler.call("a", lambda: 2), 2)
+
+
+class TestFinDataProviderScheduling(unittest.TestCase):
+    @patch("alpha_vantage.timeseries.TimeSeries.get_quote_endpoint")
+    def test_quote_goes_through_scheduler(self, mock_get_quote):
+        mock_get_quote.return_value = (pd.DataFrame([{"05. price": "150.0"}]), None)
+        scheduler = RequestScheduler.for_alpha_vantage(5, 25)
+        provider = FinDataProvider(api_key="test_key", scheduler=scheduler)
+
+        self.assertEqual(
+            provider.get_latest_price("aapl", priority=Priority.HELD_QUOTE), 150.0
+        )
+        self.assertEqual(scheduler.stats.issued, 1)
+
+    @patch("alpha_vantage.fundamentaldata.FundamentalData.get_company_overview")
+    def test_rejected_call_returns_none(self, mock_get_overview):
+        scheduler = RequestScheduler.for_alpha_vantage(5, 1)
+        provider = FinDataProvider(api_key="test_key", scheduler=scheduler)
+        mock_get_overview.return_value = (pd.DataFrame([{"Symbol": "AAPL"}]), None)
+
+        self.assertIsNotNone(provider.get_company_overview("AAPL"))
+        self.assertIsNone(provider.get_company_overview("TSLA"))
+        self.assertEqual(mock_get_overview.call_count, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
 import pytest
-from unittest.mock import patch
-from tradebot.clients.robinhood_client import RobinhoodClient
+from unittest.mock import MagicMock, patch
+from tradebot.clients.robinhood_client import (
+    REFRESH_MARGIN,
+    InstrumentCache,
+    RobinhoodClient,
+)
 from tradebot.configs.config import ROBINHOOD_EMAIL, ROBINHOOD_PWD
 
 
@@ -46,6 +50,201 @@ class TestRobinhoodClient(unittest.TestCase):
             client.get_portfolio_state()
 
 
+@patch("robin_stocks.robinhood.get_crypto_positions")
+@patch("robin_stocks.robinhood.get_quotes")
+@patch("robin_stocks.robinhood.get_instrument_by_url")
+@patch("robin_stocks.robinhood.get_open_stock_positions")
+@patch("robin_stocks.robinhood.load_portfolio_profile")
+@patch("robin_stocks.robinhood.load_account_profile")
+class TestPortfolioSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.client = RobinhoodClient(
+            "test@example.com",
+            "password",
+            clock=lambda: self.now,
+            instruments=InstrumentCache(),
+        )
+        self.client.authenticated = True
+        self.positions = [
+            {
+                "instrument": "https://api/instruments/aapl/",
+                "quantity": "2.00000000",
+                "average_buy_price": "100.0000",
+                "updated_at": "2025-01-01T00:00:00Z",
+            }
+        ]
+
+    def configure(self, account, profile, positions, instrument, quotes, crypto):
+        account.return_value = {"portfolio_cash": "500.00", "buying_power": "450.00"}
+        profile.return_value = {"equity": "800.00"}
+        positions.side_effect = lambda: self.positions
+        instrument.return_value = "AAPL"
+        quotes.side_effect = lambda symbols: [
+            {"symbol": symbol, "last_trade_price": "150.000000"} for symbol in symbols
+        ]
+        crypto.return_value = [
+            {"currency": {"code": "BTC"}, "quantity": "0.5"},
+            {"currency": {"code": "ETH"}, "quantity": "0.0"},
+        ]
+
+    def test_snapshot_is_typed_and_compact(self, *mocks):
+        self.configure(*mocks)
+
+        snapshot = self.client.get_portfolio_snapshot()
+        holding = snapshot.holdings["AAPL"]
+
+        self.assertEqual(
+            (holding.quantity, holding.price, holding.equity), (2, 150, 300)
+        )
+        self.assertEqual(snapshot.cash, 500.0)
+        self.assertEqual(snapshot.crypto, {"BTC": 0.5})
+        state = snapshot.to_dict()
+        self.assertEqual(state["equity"]["AAPL"]["percentage"], 37.5)
+        self.assertEqual(state["cash"]["equity"], 800.0)
+
+    def test_refresh_reuses_instruments_and_unchanged_positions(
+        self, account, profile, positions, instrument, quotes, crypto
+    ):
+        self.configure(account, profile, positions, instrument, quotes, crypto)
+        self.client.get_portfolio_snapshot()
+
+        self.now = 5.0
+        self.assertIs(
+            self.client.get_portfolio_snapshot(max_age=10),
+            self.client.get_portfolio_snapshot(max_age=10),
+        )
+        self.assertEqual(account.call_count, 1)
+
+        self.positions[0] = dict(self.positions[0], quantity="3", updated_at="later")
+        snapshot = self.client.get_portfolio_snapshot()
+
+        self.assertEqual(snapshot.holdings["AAPL"].quantity, 3)
+        self.assertEqual(account.call_count, 2)
+        instrument.assert_called_once()
+        crypto.assert_called_once()
+
+    @patch("robin_stocks.robinhood.build_holdings")
+    def test_portfolio_state_keeps_its_layout(self, build_holdings, *mocks):
+        self.configure(*mocks)
+
+        with self.assertNoLogs("tradebot", level="WARNING"):
+            state = self.client.get_portfolio_state()
+
+        self.assertEqual(set(state), {"equity", "cash", "crypto"})
+        self.assertEqual(state["equity"]["AAPL"]["equity"], 300.0)
+        build_holdings.assert_not_called()
+
+
+@patch("tradebot.clients.robinhood_client.set_login_state")
+@patch("tradebot.clients.robinhood_client.update_session")
+@patch("tradebot.clients.robinhood_client.request_post")
+@patch("robin_stocks.robinhood.login")
+class TestSessionPersistence(unittest.TestCase):
+    def setUp(self):
+        self.now = 1_000_000.0
+        self.store = MagicMock()
+        self.store.load.return_value = None
+        self.client = RobinhoodClient(
+            "test@example.com",
+            "password",
+            session_store=self.store,
+            clock=lambda: self.now,
+        )
+
+    def saved(self, expires_in):
+        return {
+            "token_type": "Bearer",
+            "access_token": "old",
+            "refresh_token": "refresh",
+            "device_token": "device",
+            "expires_at": self.now + expires_in,
+        }
+
+    def test_first_login_saves_the_session(
+        self, mock_login, mock_post, mock_update, mock_state
+    ):
+        mock_login.return_value = {
+            "token_type": "Bearer",
+            "access_token": "new",
+            "refresh_token": "refresh",
+            "expires_in": 86400,
+        }
+
+        self.client.login()
+
+        self.assertTrue(self.client.authenticated)
+        self.assertFalse(mock_login.call_args.kwargs["store_session"])
+        (session,), _ = self.store.save.call_args
+        self.assertEqual(session["access_token"], "new")
+        self.assertEqual(session["expires_at"], self.now + 86400)
+        mock_update.assert_called_with("Authorization", "Bearer new")
+
+    def test_valid_session_is_reused_without_login(
+        self, mock_login, mock_post, mock_update, mock_state
+    ):
+        self.store.load.return_value = self.saved(2 * REFRESH_MARGIN)
+
+        self.client.login()
+
+        self.assertTrue(self.client.authenticated)
+        mock_login.assert_not_called()
+        mock_post.assert_not_called()
+        mock_update.assert_called_with("Authorization", "Bearer old")
+
+    def test_expiring_session_is_refreshed(
+        self, mock_login, mock_post, mock_update, mock_state
+    ):
+        self.store.load.return_value = self.saved(REFRESH_MARGIN / 2)
+        mock_post.return_value = {
+            "token_type": "Bearer",
+            "access_token": "fresh",
+            "refresh_token": "refresh2",
+            "expires_in": 86400,
+        }
+
+        self.client.login()
+
+        mock_login.assert_not_called()
+        (_, payload), _ = mock_post.call_args
+        self.assertEqual(payload["grant_type"], "refresh_token")
+        self.assertEqual(payload["device_token"], "device")
+        (session,), _ = self.store.save.call_args
+        self.assertEqual(session["access_token"], "fresh")
+        self.assertEqual(session["device_token"], "device")
+
+        # a long-running process refreshes again before the next request
+        self.now += 86400
+        self.client.ensure_session()
+        self.assertEqual(mock_post.call_count, 2)
+
+    def test_failed_refresh_falls_back_to_login(
+        self, mock_login, mock_post, mock_update, mock_state
+    ):
+        self.store.load.return_value = self.saved(-1)
+        mock_post.return_value = None
+        mock_login.return_value = {"token_type": "Bearer", "access_token": "new"}
+
+        self.client.login()
+
+        self.store.clear.assert_called_once()
+        mock_login.assert_called_once()
+        self.assertTrue(self.client.authenticated)
+
+    @patch("robin_stocks.robinhood.logout")
+    def test_logout_keeps_the_session_unless_forgotten(
+        self, mock_logout, mock_login, mock_post, mock_update, mock_state
+    ):
+        self.store.load.return_value = self.saved(2 * REFRESH_MARGIN)
+        self.client.login()
+        self.client.logout()
+        self.store.clear.assert_not_called()
+
+        self.client.login()
+        self.client.logout(forget=True)
+        self.store.clear.assert_called_once()
+
+
 @pytest.mark.integration
 def test_robinhood_full_flow_integration():
     """
@@ -0,0 +1,40 @@
+import os
+import tempfile
+import unittest
+from tradebot.clients.session_store import SessionStore
+
+
+class TestSessionStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "rh", "robinhood.session")
+        self.key = SessionStore.generate_key()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_is_encrypted(self):
+        store = SessionStore(self.path, self.key)
+        store.save({"access_token": "secret-token"})
+
+        with open(self.path, "rb") as f:
+            self.assertNotIn(b"secret-token", f.read())
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+        self.assertEqual(
+            SessionStore(self.path, self.key).load(), {"access_token": "secret-token"}
+        )
+
+    def test_wrong_key_or_missing_file(self):
+        store = SessionStore(self.path, self.key)
+        self.assertIsNone(store.load())
+
+        store.save({"access_token": "secret-token"})
+        self.assertIsNone(SessionStore(self.path, SessionStore.generate_key()).load())
+
+        store.clear()
+        self.assertIsNone(store.load())
+        store.clear()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from tradebot.clients.throttle import ProviderLimiter
+
+
+class SlowClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+        self.name = "slow"
+
+    def fetch(self, value):
+        with self.lock:
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        time.sleep(0.02)
+        with self.lock:
+            self.in_flight -= 1
+        return value
+
+
+class TestProviderLimiter(unittest.TestCase):
+    def test_caps_in_flight_calls(self):
+        limiter = ProviderLimiter({"slow": 2})
+        client = SlowClient()
+        throttled = limiter.wrap("slow", client)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(throttled.fetch, range(8)))
+
+        self.assertEqual(results, list(range(8)))
+        self.assertEqual(client.peak, 2)
+
+    def test_clients_of_same_provider_share_limit(self):
+        limiter = ProviderLimiter({"slow": 1})
+        client = SlowClient()
+        first = limiter.wrap("slow", client)
+        second = limiter.wrap("slow", client)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            for proxy in (first, second, first, second):
+                executor.submit(proxy.fetch, 1)
+
+        self.assertEqual(client.peak, 1)
+
+    def test_passes_through_attributes(self):
+        limiter = ProviderLimiter({"slow": 1})
+        throttled = limiter.wrap("slow", SlowClient())
+        self.assertEqual(throttled.name, "slow")
+
+    def test_unknown_provider(self):
+        limiter = ProviderLimiter({"slow": 1})
+        with self.assertRaises(KeyError):
+            limiter.wrap("fast", MagicMock())
+
+    def test_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            ProviderLimiter({"slow": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
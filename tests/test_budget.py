@@ -0,0 +1,132 @@
+import dataclasses
+import os
+import tempfile
+import unittest
+from tradebot.budget import LLMBudget
+from tradebot.strategy import StockData
+
+
+class TestLLMBudget(unittest.TestCase):
+    def setUp(self):
+        self.stock_data = StockData(
+            ticker="AAPL",
+            price=150.0,
+            volume=1000000,
+            sma=150.0,
+            rsi=50.0,
+            macd=0.0,
+            pe_ratio=25.0,
+            peg_ratio=1.5,
+            roe=0.15,
+            revenue_growth=0.1,
+            eps_growth=0.2,
+            de_ratio=0.5,
+            news_articles=[],
+            tweets=[],
+            macd_hist=0.0,
+        )
+        self.flat = dataclasses.replace(self.stock_data, ticker="FLAT")
+        self.strong = dataclasses.replace(
+            self.stock_data, ticker="STRONG", rsi=25.0, price=170.0, macd_hist=1.0
+        )
+        self.held = dataclasses.replace(self.stock_data, ticker="HELD")
+
+    def test_priority_order(self):
+        budget = LLMBudget()
+        self.assertGreater(budget.priority(self.strong), budget.priority(self.flat))
+        self.assertGreater(
+            budget.priority(self.held, held=True), budget.priority(self.strong)
+        )
+
+    def test_allocates_within_call_budget(self):
+        budget = LLMBudget(max_calls=4)
+        granted, deferred = budget.allocate(
+            [self.flat, self.strong, self.held], held={"HELD"}, calls=2
+        )
+
+        self.assertEqual([s.ticker for s in granted], ["HELD", "STRONG"])
+        self.assertEqual([s.ticker for s in deferred], ["FLAT"])
+        self.assertEqual(budget.stats.calls, 4)
+
+    def test_token_budget(self):
+        budget = LLMBudget(max_tokens=2500, tokens_per_call=1000)
+        granted, _ = budget.allocate([self.flat, self.strong], held=set(), calls=1)
+        self.assertEqual(len(granted), 2)
+
+        granted, deferred = budget.allocate([self.held], held=set(), calls=1)
+        self.assertEqual((granted, deferred), ([], [self.held]))
+
+    def test_shared_requests_are_charged_once(self):
+        budget = LLMBudget(max_calls=2)
+        costs = {
+            stock_data.ticker: (0.4, 400)
+            for stock_data in (self.flat, self.strong, self.held)
+        }
+        granted, deferred = budget.allocate(
+            [self.flat, self.strong, self.held],
+            held={"HELD"},
+            costs=costs,
+            run_calls=1,
+        )
+
+        # two tickers share a batched request, plus one request for the run
+        self.assertEqual(granted, [self.held, self.strong])
+        self.assertEqual(deferred, [self.flat])
+        self.assertEqual(budget.stats.calls, 2)
+        self.assertEqual(budget.stats.tokens, 1800)
+
+    def test_defer_releases_reservations(self):
+        budget = LLMBudget(max_calls=2)
+        costs = {
+            stock_data.ticker: (0.4, 400)
+            for stock_data in (self.flat, self.strong, self.held)
+        }
+        budget.allocate(
+            [self.strong, self.held], held={"HELD"}, costs=costs, run_calls=1
+        )
+
+        budget.defer([self.strong])
+        self.assertEqual(budget.stats.calls, 2)
+        self.assertEqual(budget.stats.tokens, 1400)
+        budget.defer([self.held])
+        self.assertEqual((budget.stats.calls, budget.stats.tokens), (0, 0))
+
+        # what was released can be granted to other tickers
+        granted, _ = budget.allocate([self.flat], held=set(), calls=2)
+        self.assertEqual(granted, [self.flat])
+
+    def test_deferred_tickers_move_up_next_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "deferred.json")
+            budget = LLMBudget(max_calls=1, deferral_weight=10, path=path)
+            _, deferred = budget.allocate([self.flat, self.strong], held=set(), calls=1)
+            self.assertEqual(deferred, [self.flat])
+
+            # a new process picks the deferral up from disk
+            budget = LLMBudget(max_calls=1, deferral_weight=10, path=path)
+            granted, _ = budget.allocate([self.flat, self.strong], held=set(), calls=1)
+            self.assertEqual(granted, [self.flat])
+
+    def test_deadline(self):
+        now = [0.0]
+        budget = LLMBudget(max_seconds=60, clock=lambda: now[0])
+        budget.start()
+        self.assertFalse(budget.expired())
+
+        now[0] = 60.0
+        self.assertTrue(budget.expired())
+        granted, deferred = budget.allocate([self.flat], held=set())
+        self.assertEqual((granted, deferred), ([], [self.flat]))
+
+    def test_log_stats(self):
+        budget = LLMBudget(max_calls=2)
+        budget.allocate([self.flat, self.strong], held=set(), calls=2)
+
+        stats = budget.log_stats()
+
+        self.assertEqual(stats["granted"], 1)
+        self.assertEqual(stats["deferred"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
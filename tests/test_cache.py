@@ -0,0 +1,71 @@
+import tempfile
+import unittest
+from tradebot.cache import LRUCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_get_and_put(self):
+        cache = LRUCache(max_entries=2)
+        self.assertIsNone(cache.get("a"))
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.stats.hits, 1)
+        self.assertEqual(cache.stats.misses, 1)
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_expires_entries(self):
+        clock = FakeClock()
+        cache = LRUCache(ttl=10, clock=clock)
+        cache.put("a", 1)
+        cache.put("b", 2, ttl=100)
+
+        clock.now += 11
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get("b"), 2)
+
+    def test_persists_across_instances(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = LRUCache(directory=tmp)
+            cache.put(("overview", "AAPL"), {"PERatio": 25})
+            cache.put(("overview", "TSLA"), {"PERatio": 60})
+            cache.invalidate(("overview", "TSLA"))
+
+            reloaded = LRUCache(directory=tmp)
+            self.assertEqual(len(reloaded), 1)
+            self.assertEqual(reloaded.get(("overview", "AAPL")), {"PERatio": 25})
+            self.assertIsNone(reloaded.get(("overview", "TSLA")))
+
+    def test_reload_respects_max_entries(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            clock = FakeClock()
+            cache = LRUCache(directory=tmp, clock=clock)
+            for i in range(3):
+                clock.now += 1
+                cache.put(i, i)
+
+            reloaded = LRUCache(max_entries=2, directory=tmp)
+            self.assertNotIn(0, reloaded)
+            self.assertEqual(reloaded.get(2), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,254 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+from tradebot.clients.robinhood_client import RobinhoodClient
+from tradebot.execution import (
+    ExecutionEngine,
+    MockBroker,
+    OrderRequest,
+    OrderSide,
+    OrderState,
+    RobinhoodBroker,
+    order_requests,
+)
+from tradebot.pipeline import TickerResult
+from tradebot.risk_mgmt import TradeDecision
+from tradebot.strategy import Signal
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def buy(ticker, key=None, amount=100.0):
+    return OrderRequest(ticker, OrderSide.BUY, amount, key or f"run:{ticker}:buy")
+
+
+class TestExecutionEngine(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.broker = MockBroker(fill_delay=3.0, price=50.0, clock=self.clock)
+
+    def engine(self, **kwargs):
+        return ExecutionEngine(
+            self.broker, clock=self.clock, sleep=self.clock.sleep, **kwargs
+        )
+
+    def test_fills_are_tracked_with_batched_backoff_polling(self):
+        engine = self.engine(poll_interval=1.0)
+
+        orders = engine.execute([buy("AAPL"), buy("TSLA"), buy("MSFT")])
+
+        self.assertTrue(all(o.state is OrderState.FILLED for o in orders.values()))
+        self.assertEqual(orders["run:AAPL:buy"].filled_quantity, 2.0)
+        # polls at t=1 and t=3 (1s, then 2s later), each covering every order
+        self.assertEqual(self.broker.status_requests, 2)
+        self.assertEqual(orders["run:AAPL:buy"].fill_latency, 3.0)
+        stats = engine.metrics.snapshot()
+        self.assertEqual((stats["submitted"], stats["filled"]), (3, 3))
+        self.assertEqual(stats["status_queries"], 2)
+        self.assertEqual(stats["fill_p50"], 3.0)
+
+    def test_keys_are_placed_once(self):
+        engine = self.engine()
+        engine.execute([buy("AAPL")])
+        orders = engine.execute([buy("AAPL"), buy("AAPL", amount=500)])
+
+        self.assertEqual(len(self.broker.orders), 1)
+        self.assertEqual(orders["run:AAPL:buy"].request.amount, 100.0)
+        self.assertEqual(engine.metrics.stats.duplicates, 2)
+
+    def test_lost_reply_is_retried_without_a_duplicate(self):
+        self.broker.drop_replies = 1
+
+        orders = self.engine().execute([buy("AAPL")])
+
+        self.assertEqual(orders["run:AAPL:buy"].state, OrderState.FILLED)
+        self.assertEqual(len(self.broker.orders), 1)
+
+    def test_lost_reply_is_not_retried_without_broker_idempotency(self):
+        self.broker.drop_replies = 1
+        self.broker.idempotent_submit = False
+
+        orders = self.engine().execute([buy("AAPL")])
+
+        self.assertEqual(orders["run:AAPL:buy"].state, OrderState.UNKNOWN)
+        self.assertEqual(self.broker.status_requests, 0)
+
+    def test_rejections_and_timeouts(self):
+        self.broker.reject = {"TSLA"}
+        self.broker.fill_delay = 1000.0
+
+        orders = self.engine(timeout=10.0).execute([buy("AAPL"), buy("TSLA")])
+
+        self.assertEqual(orders["run:TSLA:buy"].state, OrderState.REJECTED)
+        self.assertEqual(orders["run:AAPL:buy"].state, OrderState.SUBMITTED)
+        self.assertLessEqual(self.clock.now, 10.0)
+
+    def test_journal_survives_restarts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "orders.json")
+            self.engine(journal_path=path).execute([buy("AAPL")])
+
+            orders = self.engine(journal_path=path).execute([buy("AAPL")])
+
+        self.assertEqual(orders["run:AAPL:buy"].state, OrderState.FILLED)
+        self.assertEqual(len(self.broker.orders), 1)
+
+    def test_open_orders_are_tracked_again_after_a_restart(self):
+        self.broker.fill_delay = 100.0
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "orders.json")
+            orders = self.engine(journal_path=path, timeout=10.0).execute([buy("AAPL")])
+            self.assertEqual(orders["run:AAPL:buy"].state, OrderState.SUBMITTED)
+
+            # the next run polls the order left open, alongside its own
+            self.clock.now = 200.0
+            self.engine(journal_path=path).execute([buy("TSLA")])
+
+            (order,) = self.engine(journal_path=path).execute([buy("AAPL")]).values()
+
+        self.assertEqual(order.state, OrderState.FILLED)
+        self.assertEqual(order.filled_quantity, 2.0)
+        self.assertEqual(order.average_price, 50.0)
+        self.assertEqual(len(self.broker.orders), 2)
+
+    def test_orders_are_journaled_before_submission(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "orders.json")
+            journaled = []
+            submit = self.broker.submit
+
+            def submit_after_reading_the_journal(request):
+                with open(path) as f:
+                    journaled.append(json.load(f)[request.key]["state"])
+                return submit(request)
+
+            with patch.object(
+                self.broker, "submit", side_effect=submit_after_reading_the_journal
+            ):
+                self.engine(journal_path=path).execute([buy("AAPL")])
+
+        self.assertEqual(journaled, ["pending"])
+
+    def test_unfinished_submissions_are_reconciled_not_resubmitted(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "orders.json")
+            # the last run died after placing AAPL and before hearing about TSLA
+            self.broker.submit(buy("AAPL"))
+            with open(path, "w") as f:
+                json.dump(
+                    {
+                        request.key: {
+                            "ticker": request.ticker,
+                            "side": "buy",
+                            "amount": request.amount,
+                            "state": "pending",
+                            "broker_id": None,
+                        }
+                        for request in (buy("AAPL"), buy("TSLA"))
+                    },
+                    f,
+                )
+            self.clock.now = 5.0
+
+            orders = self.engine(journal_path=path).execute([buy("AAPL"), buy("TSLA")])
+
+        self.assertEqual(orders["run:AAPL:buy"].state, OrderState.FILLED)
+        self.assertEqual(orders["run:AAPL:buy"].broker_id, "mock-1")
+        self.assertEqual(orders["run:TSLA:buy"].state, OrderState.UNKNOWN)
+        self.assertEqual(len(self.broker.orders), 1)
+
+
+class TestRobinhoodBroker(unittest.TestCase):
+    def setUp(self):
+        self.client = RobinhoodClient("email", "password")
+        self.client.authenticated = True
+        self.engine = ExecutionEngine(
+            RobinhoodBroker(self.client), sleep=lambda _: None
+        )
+
+    @patch("tradebot.clients.robinhood_client.rh.order_buy_fractional_by_price")
+    def test_missing_reply_leaves_the_order_unknown(self, order_buy):
+        # robin_stocks swallows timeouts, connection errors and 5xx into None
+        order_buy.return_value = None
+
+        orders = self.engine.execute([buy("AAPL")])
+
+        self.assertEqual(orders["run:AAPL:buy"].state, OrderState.UNKNOWN)
+        order_buy.assert_called_once_with("AAPL", 100.0)
+
+    @patch("tradebot.clients.robinhood_client.rh.order_buy_fractional_by_price")
+    def test_rejection_fails_the_order(self, order_buy):
+        order_buy.return_value = {"detail": "Not enough buying power."}
+
+        orders = self.engine.execute([buy("AAPL")])
+
+        self.assertEqual(orders["run:AAPL:buy"].state, OrderState.FAILED)
+        self.assertIn("buying power", orders["run:AAPL:buy"].error)
+
+    def test_find_orders_matches_recent_orders(self):
+        client = MagicMock()
+        client.get_recent_orders.return_value = [
+            {"id": "1", "side": "sell", "dollar_based_amount": {"amount": "100.00"}},
+            {"id": "2", "side": "buy", "dollar_based_amount": {"amount": "100.00"}},
+        ]
+        client.order_symbol.return_value = "AAPL"
+
+        found = RobinhoodBroker(client).find_orders(
+            [buy("AAPL"), buy("TSLA", amount=5)]
+        )
+
+        self.assertEqual(
+            {key: record["id"] for key, record in found.items()}, {"run:AAPL:buy": "2"}
+        )
+
+    def test_status_uses_the_open_orders_list(self):
+        client = MagicMock()
+        client.get_open_orders.return_value = [
+            {"id": "1", "state": "confirmed"},
+            {"id": "other", "state": "queued"},
+        ]
+        client.get_order.return_value = {"id": "2", "state": "filled"}
+
+        records = RobinhoodBroker(client).order_status(["1", "2"])
+
+        self.assertEqual(set(records), {"1", "2"})
+        client.get_order.assert_called_once_with("2")
+
+
+class TestOrderRequests(unittest.TestCase):
+    def result(self, signal, decision, size):
+        return TickerResult(
+            ticker="aapl",
+            stock_data=MagicMock(),
+            signal=signal,
+            reasoning={},
+            risk=(decision, {"position_size": size}),
+        )
+
+    def test_only_approved_sized_trades_become_orders(self):
+        results = {
+            "aapl": self.result(Signal.SELL, TradeDecision.APPROVED, 42.123),
+            "tsla": self.result(Signal.BUY, TradeDecision.VETOED, 100),
+            "msft": self.result(Signal.BUY, TradeDecision.APPROVED, 0.0),
+        }
+
+        (request,) = order_requests(results, "r1")
+
+        self.assertEqual(
+            request, OrderRequest("AAPL", OrderSide.SELL, 42.12, "r1:AAPL:sell")
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,41 +1,37 @@
+import os
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 import pandas as pd
+from tradebot.execution import MockBroker
 from tradebot.main import main
+from tradebot.prefilter import PrefilterOutcome, PrefilterResult
 from tradebot.strategy import Signal
 from tradebot.risk_mgmt import TradeDecision
 
 
 class TestMain(unittest.TestCase):
-    @patch("tradebot.main.ROBINHOOD_EMAIL", "test_email")
-    @patch("tradebot.main.ROBINHOOD_PWD", "test_pwd")
-    @patch("tradebot.main.AV_API_KEY", "test_key")
-    @patch("tradebot.main.NEWS_API_KEY", "test_key")
-    @patch("tradebot.main.TWITTER_API_KEY", "test_key")
-    @patch("tradebot.main.TWITTER_API_SECRET", "test_secret")
-    @patch("tradebot.main.TWITTER_ACCESS_TOKEN", "test_token")
-    @patch("tradebot.main.TWITTER_ACCESS_TOKEN_SECRET", "test_token_secret")
-    @patch("tradebot.main.TWITTER_BEARER_TOKEN", "test_bearer")
-    @patch("tradebot.main.setup_logger")
-    @patch("tradebot.main.RobinhoodClient")
-    @patch("tradebot.main.FinDataProvider")
-    @patch("tradebot.main.NewsDataProvider")
-    @patch("tradebot.main.TwitterDataProvider")
-    @patch("tradebot.main.StrategyEngine")
-    @patch("tradebot.main.RiskManager")
-    def test_main_e2e(
+    def configure(
         self,
+        mock_prefilter,
         mock_risk_manager,
         mock_strategy_engine,
         mock_twitter_provider,
         mock_news_provider,
         mock_fin_provider,
         mock_rh_client,
-        mock_setup_logger,
     ):
-        # Configure mocks
+        """Two tickers with a price, both decided BUY and approved."""
+        mock_prefilter.return_value.screen.return_value = PrefilterResult(
+            PrefilterOutcome.ESCALATE, 2
+        )
         mock_rh_client.return_value.get_portfolio_state.return_value = {"cash": 10000}
         mock_fin_provider.return_value.get_latest_price.return_value = 150.0
+        mock_fin_provider.return_value.get_latest_prices.return_value = (
+            {"AAPL": 150.0, "TSLA": 150.0},
+            {"GARBAGE": "No quote returned"},
+        )
         # Create a DataFrame with enough data points for indicator calculation
         historical_data = pd.DataFrame(
             {
@@ -69,24 +65,142 @@ class TestMain(unittest.TestCase):
             [MagicMock(text="Test Tweet")],
             {"result_count": 1},
         )
-        mock_strategy_engine.return_value.decide_trade.return_value = (
-            Signal.BUY,
-            {"reasoning": "Looks good"},
-        )
+        mock_strategy_engine.return_value.decide_trades.side_effect = lambda stocks: {
+            stock_data.ticker: (Signal.BUY, {"reasoning": "Looks good"})
+            for stock_data in stocks
+        }
         mock_risk_manager.return_value.assess_risk.return_value = (
             TradeDecision.APPROVED,
             {"reasoning": "Looks good"},
         )
 
+    @patch("tradebot.main.ROBINHOOD_EMAIL", "test_email")
+    @patch("tradebot.main.ROBINHOOD_PWD", "test_pwd")
+    @patch("tradebot.main.AV_API_KEY", "test_key")
+    @patch("tradebot.main.NEWS_API_KEY", "test_key")
+    @patch("tradebot.main.TWITTER_API_KEY", "test_key")
+    @patch("tradebot.main.TWITTER_API_SECRET", "test_secret")
+    @patch("tradebot.main.TWITTER_ACCESS_TOKEN", "test_token")
+    @patch("tradebot.main.TWITTER_ACCESS_TOKEN_SECRET", "test_token_secret")
+    @patch("tradebot.main.TWITTER_BEARER_TOKEN", "test_bearer")
+    @patch("tradebot.main.INDICATOR_CACHE_DIR", None)
+    @patch("tradebot.main.LLM_DEFERRED_PATH", None)
+    @patch("tradebot.main.AV_QUOTA_PATH", None)
+    @patch("tradebot.main.AV_BULK_QUOTES", True)
+    @patch("tradebot.main.setup_logger")
+    @patch("tradebot.main.RobinhoodClient")
+    @patch("tradebot.main.FinDataProvider")
+    @patch("tradebot.main.NewsDataProvider")
+    @patch("tradebot.main.TwitterDataProvider")
+    @patch("tradebot.main.StrategyEngine")
+    @patch("tradebot.main.RiskManager")
+    @patch("tradebot.main.Prefilter")
+    def test_main_e2e(
+        self,
+        mock_prefilter,
+        mock_risk_manager,
+        mock_strategy_engine,
+        mock_twitter_provider,
+        mock_news_provider,
+        mock_fin_provider,
+        mock_rh_client,
+        mock_setup_logger,
+    ):
+        self.configure(
+            mock_prefilter,
+            mock_risk_manager,
+            mock_strategy_engine,
+            mock_twitter_provider,
+            mock_news_provider,
+            mock_fin_provider,
+            mock_rh_client,
+        )
+
         # Run main
         main()
 
         # Assertions
         mock_rh_client.return_value.login.assert_called_once()
-        mock_strategy_engine.return_value.decide_trade.assert_called()
+        mock_strategy_engine.return_value.decide_trades.assert_called_once()
         mock_risk_manager.return_value.assess_risk.assert_called()
         mock_rh_client.return_value.logout.assert_called_once()
 
+    @patch("tradebot.main.ROBINHOOD_EMAIL", "test_email")
+    @patch("tradebot.main.ROBINHOOD_PWD", "test_pwd")
+    @patch("tradebot.main.AV_API_KEY", "test_key")
+    @patch("tradebot.main.NEWS_API_KEY", "test_key")
+    @patch("tradebot.main.TWITTER_API_KEY", "test_key")
+    @patch("tradebot.main.TWITTER_API_SECRET", "test_secret")
+    @patch("tradebot.main.TWITTER_ACCESS_TOKEN", "test_token")
+    @patch("tradebot.main.TWITTER_ACCESS_TOKEN_SECRET", "test_token_secret")
+    @patch("tradebot.main.TWITTER_BEARER_TOKEN", "test_bearer")
+    @patch("tradebot.main.INDICATOR_CACHE_DIR", None)
+    @patch("tradebot.main.LLM_DEFERRED_PATH", None)
+    @patch("tradebot.main.AV_QUOTA_PATH", None)
+    @patch("tradebot.main.AV_BULK_QUOTES", True)
+    @patch("tradebot.main.EXECUTION_BROKER", "mock")
+    @patch("tradebot.main.ORDER_RUN_ID", None)
+    @patch("tradebot.main.MockBroker")
+    @patch("tradebot.main.setup_logger")
+    @patch("tradebot.main.RobinhoodClient")
+    @patch("tradebot.main.FinDataProvider")
+    @patch("tradebot.main.NewsDataProvider")
+    @patch("tradebot.main.TwitterDataProvider")
+    @patch("tradebot.main.StrategyEngine")
+    @patch("tradebot.main.RiskManager")
+    @patch("tradebot.main.Prefilter")
+    def test_rerun_does_not_repeat_orders(
+        self,
+        mock_prefilter,
+        mock_risk_manager,
+        mock_strategy_engine,
+        mock_twitter_provider,
+        mock_news_provider,
+        mock_fin_provider,
+        mock_rh_client,
+        mock_setup_logger,
+        mock_broker_class,
+    ):
+        self.configure(
+            mock_prefilter,
+            mock_risk_manager,
+            mock_strategy_engine,
+            mock_twitter_provider,
+            mock_news_provider,
+            mock_fin_provider,
+            mock_rh_client,
+        )
+        mock_risk_manager.return_value.assess_risk.return_value = (
+            TradeDecision.APPROVED,
+            {"reasoning": "Looks good", "position_size": 50.0},
+        )
+        broker = MockBroker()
+        mock_broker_class.return_value = broker
+
+        # the second run starts hours after the first, on the same day
+        strftime = time.strftime
+        now = [time.struct_time((2026, 3, 2, 10, 0, 0, 0, 61, -1))]
+
+        with (
+            tempfile.TemporaryDirectory() as directory,
+            patch(
+                "tradebot.main.ORDER_JOURNAL_PATH",
+                os.path.join(directory, "orders.json"),
+            ),
+            patch(
+                "tradebot.main.time.strftime",
+                side_effect=lambda fmt, t=None: strftime(fmt, t or now[0]),
+            ),
+        ):
+            main()
+            now[0] = time.struct_time((2026, 3, 2, 15, 30, 0, 0, 61, -1))
+            main()
+
+        self.assertEqual(
+            sorted(order["request"].ticker for order in broker.orders.values()),
+            ["AAPL", "TSLA"],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
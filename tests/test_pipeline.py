@@ -0,0 +1,328 @@
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+import pandas as pd
+from tradebot.budget import LLMBudget
+from tradebot.pipeline import (
+    BUNDLE_FETCHES,
+    TickerProviders,
+    analyze_ticker,
+    fetch_ticker_bundle,
+    prescreen_prices,
+    run_pipeline,
+)
+from tradebot.prefilter import Prefilter
+from tradebot.strategy import Signal
+from tradebot.risk_mgmt import TradeDecision
+
+
+def make_providers():
+    fin = MagicMock()
+    fin.get_latest_price.return_value = 150.0
+    fin.get_historical_data.side_effect = lambda ticker: pd.DataFrame(
+        {
+            "close": [float(i) for i in range(100, 160)],
+            "volume": [1000 + i for i in range(60)],
+        }
+    )
+    fin.get_company_overview.side_effect = lambda ticker: pd.DataFrame(
+        {
+            "PERatio": [25],
+            "PEGRatio": [1.5],
+            "ReturnOnEquityTTM": [0.15],
+            "QuarterlyRevenueGrowthYOY": [0.1],
+        }
+    )
+    fin.get_balance_sheet.side_effect = lambda ticker: pd.DataFrame(
+        {"totalLiabilities": [100], "totalShareholderEquity": [200]}
+    )
+    fin.get_earnings_history.side_effect = lambda ticker: pd.DataFrame(
+        {"reportedEPS": [1.0, 1.2]},
+        index=pd.to_datetime(["2022-01-01", "2023-01-01"]),
+    )
+    news = MagicMock()
+    news.get_everything.return_value = [{"title": "Test News"}]
+    twitter = MagicMock()
+    twitter.search_tweets.return_value = (
+        [MagicMock(text="Test Tweet")],
+        {"result_count": 1},
+    )
+    strategy = MagicMock()
+    strategy.decide_trade.return_value = (Signal.BUY, {"reasoning": "Looks good"})
+    strategy.decide_trades.side_effect = lambda stocks: {
+        stock_data.ticker: strategy.decide_trade.return_value for stock_data in stocks
+    }
+    # four tickers share a batched request
+    strategy.request_costs.side_effect = lambda stocks: {
+        stock_data.ticker: (0.25, 250) for stock_data in stocks
+    }
+    risk = MagicMock()
+    risk.assess_risk.return_value = (TradeDecision.APPROVED, {"reasoning": "OK"})
+    return TickerProviders(
+        fin=fin, news=news, twitter=twitter, strategy=strategy, risk=risk
+    )
+
+
+class TestPipeline(unittest.TestCase):
+    def test_analyze_ticker(self):
+        providers = make_providers()
+        result = analyze_ticker("AAPL", providers, {"cash": 10000})
+
+        self.assertIsNotNone(result)
+        self.assertEqual(result.signal, Signal.BUY)
+        self.assertEqual(result.stock_data.price, 150.0)
+        providers.risk.assess_risk.assert_called_once()
+
+    def test_analyze_ticker_skips_without_price(self):
+        providers = make_providers()
+        providers.fin.get_latest_price.return_value = None
+
+        self.assertIsNone(analyze_ticker("AAPL", providers, {}))
+        providers.strategy.decide_trade.assert_not_called()
+
+    def test_fetch_ticker_bundle_issues_calls_together(self):
+        providers = make_providers()
+        # every call blocks until all of them have started
+        barrier = threading.Barrier(BUNDLE_FETCHES, timeout=5)
+        for mock in (
+            providers.fin.get_latest_price,
+            providers.fin.get_historical_data,
+            providers.fin.get_company_overview,
+            providers.fin.get_balance_sheet,
+            providers.fin.get_earnings_history,
+            providers.news.get_everything,
+            providers.twitter.search_tweets,
+        ):
+            inner = mock.side_effect or (lambda *a, _v=mock.return_value, **k: _v)
+
+            def wait_then_return(*args, _inner=inner, **kwargs):
+                barrier.wait()
+                return _inner(*args, **kwargs)
+
+            mock.side_effect = wait_then_return
+
+        with ThreadPoolExecutor(max_workers=BUNDLE_FETCHES) as executor:
+            bundle = fetch_ticker_bundle("AAPL", providers, executor)
+
+        self.assertEqual(bundle.price, 150.0)
+        self.assertEqual(bundle.news_articles, [{"title": "Test News"}])
+        self.assertEqual(len(bundle.tweets), 1)
+
+    def test_fetch_ticker_bundle_skips_without_history(self):
+        providers = make_providers()
+        providers.fin.get_historical_data.side_effect = lambda ticker: None
+        # hold the single worker in the next call so the rest stay queued
+        release = threading.Event()
+        providers.fin.get_company_overview.side_effect = lambda ticker: release.wait(5)
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            bundle = fetch_ticker_bundle("AAPL", providers, executor)
+            release.set()
+
+        self.assertIsNone(bundle)
+        providers.twitter.search_tweets.assert_not_called()
+
+    def test_fetch_ticker_bundle_handles_failed_media(self):
+        providers = make_providers()
+        providers.news.get_everything.return_value = None
+        providers.twitter.search_tweets.return_value = None
+
+        with ThreadPoolExecutor(max_workers=BUNDLE_FETCHES) as executor:
+            bundle = fetch_ticker_bundle("AAPL", providers, executor)
+
+        self.assertEqual(bundle.news_articles, [])
+        self.assertEqual(bundle.tweets, [])
+
+    def test_run_pipeline_isolates_failures(self):
+        providers = make_providers()
+
+        def price(ticker, **kwargs):
+            if ticker == "BAD":
+                raise RuntimeError("boom")
+            return 150.0
+
+        providers.fin.get_latest_price.side_effect = price
+
+        results = run_pipeline(["AAPL", "BAD", "TSLA"], providers, {}, max_workers=3)
+
+        self.assertEqual(set(results), {"AAPL", "TSLA"})
+        providers.strategy.decide_trades.assert_called_once()
+        (stocks,), _ = providers.strategy.decide_trades.call_args
+        self.assertEqual({stock_data.ticker for stock_data in stocks}, {"AAPL", "TSLA"})
+
+    def test_run_pipeline_skips_undecided_tickers(self):
+        providers = make_providers()
+        providers.strategy.decide_trades.side_effect = lambda stocks: {
+            "AAPL": (Signal.SELL, {"reasoning": "Overvalued"})
+        }
+
+        results = run_pipeline(["AAPL", "TSLA"], providers, {})
+
+        self.assertEqual(list(results), ["AAPL"])
+        self.assertEqual(results["AAPL"].signal, Signal.SELL)
+        providers.strategy.decide_trade.assert_not_called()
+        providers.risk.assess_risk.assert_called_once()
+
+    def test_prescreen_prices(self):
+        fin = MagicMock()
+        fin.get_latest_prices.return_value = (
+            {"AAPL": 150.0},
+            {"GARBAGE": "No quote returned"},
+        )
+        self.assertEqual(prescreen_prices(["AAPL", "GARBAGE"], fin), {"AAPL": 150.0})
+
+        fin.get_latest_prices.return_value = ({}, {"AAPL": "premium endpoint"})
+        self.assertIsNone(prescreen_prices(["AAPL"], fin))
+
+    def test_run_pipeline_uses_prescreened_prices(self):
+        providers = make_providers()
+
+        results = run_pipeline(
+            ["AAPL", "GARBAGE"], providers, {}, prices={"AAPL": 151.0}
+        )
+
+        self.assertEqual(list(results), ["AAPL"])
+        self.assertEqual(results["AAPL"].stock_data.price, 151.0)
+        providers.fin.get_latest_price.assert_not_called()
+        providers.fin.get_historical_data.assert_called_once()
+
+    def test_run_pipeline_resolves_clear_cases_locally(self):
+        providers = make_providers()
+        # strongly bullish technicals, but only AAPL passes the fundamentals
+        providers.fin.get_historical_data.side_effect = lambda ticker: pd.DataFrame(
+            {
+                "close": [100.0 + i + 0.01 * i * i for i in range(60)],
+                "volume": [1000] * 60,
+            }
+        )
+        providers.fin.get_latest_price.side_effect = lambda ticker, **kwargs: 200.0
+        overview = providers.fin.get_company_overview.side_effect
+        providers.fin.get_company_overview.side_effect = lambda ticker: (
+            overview(ticker).assign(PERatio=[80], PEGRatio=[4])
+            if ticker == "TSLA"
+            else overview(ticker)
+        )
+        providers.prefilter = Prefilter(rsi_overbought=101)
+        providers.strategy.request_costs.side_effect = lambda stocks: {
+            stock_data.ticker: (0.25, 100) for stock_data in stocks
+        }
+
+        results = run_pipeline(["AAPL", "TSLA"], providers, {})
+
+        (stocks,), _ = providers.strategy.decide_trades.call_args
+        self.assertEqual([stock_data.ticker for stock_data in stocks], ["AAPL"])
+        self.assertEqual(results["TSLA"].signal, Signal.HOLD)
+        self.assertEqual(results["TSLA"].risk[0], TradeDecision.VETOED)
+        providers.risk.assess_risk.assert_called_once()
+        # TSLA's share of the batched strategy request plus its risk request
+        self.assertEqual(providers.prefilter.stats.llm_calls_avoided, 1.25)
+
+    def test_hold_skips_risk_assessment(self):
+        providers = make_providers()
+        providers.strategy.decide_trades.side_effect = lambda stocks: {
+            "AAPL": (Signal.HOLD, {"reasoning": "Flat"}),
+            "TSLA": (Signal.BUY, {"reasoning": "Cheap"}),
+        }
+
+        results = run_pipeline(["AAPL", "TSLA"], providers, {})
+
+        self.assertIsNone(results["AAPL"].risk)
+        (_, kwargs) = providers.risk.assess_risk.call_args
+        self.assertEqual(kwargs["stock_data"].ticker, "TSLA")
+        providers.risk.assess_risk.assert_called_once()
+
+    def test_run_pipeline_combined_mode(self):
+        providers = make_providers()
+        providers.risk.decide_and_assess.side_effect = lambda stock_data, portfolio: (
+            Signal.BUY,
+            {"reasoning": "Cheap"},
+            (TradeDecision.APPROVED, {"position_size": 100.0}),
+        )
+
+        results = run_pipeline(["AAPL", "TSLA"], providers, {}, combined=True)
+
+        self.assertEqual(set(results), {"AAPL", "TSLA"})
+        self.assertEqual(results["AAPL"].risk[0], TradeDecision.APPROVED)
+        self.assertEqual(providers.risk.decide_and_assess.call_count, 2)
+        providers.strategy.decide_trades.assert_not_called()
+        providers.risk.assess_risk.assert_not_called()
+
+    def test_run_pipeline_joint_risk(self):
+        providers = make_providers()
+        providers.strategy.decide_trades.side_effect = lambda stocks: {
+            "AAPL": (Signal.HOLD, {"reasoning": "Flat"}),
+            "TSLA": (Signal.BUY, {"reasoning": "Cheap"}),
+            "MSFT": (Signal.SELL, {"reasoning": "Rich"}),
+        }
+        providers.risk.assess_portfolio.return_value = {
+            "TSLA": (TradeDecision.APPROVED, {"position_size": 50.0}),
+            "MSFT": (TradeDecision.VETOED, {"position_size": 0.0}),
+        }
+
+        results = run_pipeline(["AAPL", "TSLA", "MSFT"], providers, {}, joint_risk=True)
+
+        (candidates, _), _ = providers.risk.assess_portfolio.call_args
+        self.assertEqual(
+            sorted((stock_data.ticker, signal) for stock_data, signal in candidates),
+            [("MSFT", Signal.SELL), ("TSLA", Signal.BUY)],
+        )
+        self.assertIsNone(results["AAPL"].risk)
+        self.assertEqual(results["TSLA"].risk[0], TradeDecision.APPROVED)
+        self.assertEqual(results["MSFT"].risk[0], TradeDecision.VETOED)
+        providers.risk.assess_risk.assert_not_called()
+
+    def test_budget_defers_lower_priority_tickers(self):
+        providers = make_providers()
+        providers.budget = LLMBudget(max_calls=2)
+        portfolio = {"equity": {"TSLA": {"quantity": "1"}}}
+
+        results = run_pipeline(["AAPL", "TSLA"], providers, portfolio)
+
+        # the held position is decided on; AAPL waits for the next run
+        self.assertEqual(set(results), {"TSLA"})
+        (stocks,), _ = providers.strategy.decide_trades.call_args
+        self.assertEqual([stock_data.ticker for stock_data in stocks], ["TSLA"])
+        self.assertEqual(providers.budget.stats.deferred, 1)
+
+    def test_budget_charges_batched_strategy_requests(self):
+        providers = make_providers()
+        providers.budget = LLMBudget(max_calls=5)
+        tickers = ["AAPL", "TSLA", "MSFT", "NVDA"]
+
+        results = run_pipeline(tickers, providers, {})
+
+        # one shared strategy request and one risk request per ticker
+        self.assertEqual(set(results), set(tickers))
+        self.assertEqual(providers.budget.stats.calls, 5)
+
+        providers.budget = LLMBudget(max_calls=2)
+        results = run_pipeline(tickers, providers, {}, joint_risk=True)
+
+        self.assertEqual(set(results), set(tickers))
+        self.assertEqual(providers.budget.stats.calls, 2)
+
+    def test_budget_deadline_defers_risk_assessment(self):
+        providers = make_providers()
+        now = [0.0]
+        providers.budget = LLMBudget(max_seconds=10, clock=lambda: now[0])
+
+        def decide_trades(stocks):
+            now[0] = 11.0
+            return {
+                stock_data.ticker: (Signal.BUY, {"reasoning": "Cheap"})
+                for stock_data in stocks
+            }
+
+        providers.strategy.decide_trades.side_effect = decide_trades
+
+        self.assertEqual(run_pipeline(["AAPL"], providers, {}), {})
+        providers.risk.assess_risk.assert_not_called()
+        self.assertEqual(providers.budget.stats.deferred, 1)
+
+    def test_run_pipeline_empty(self):
+        self.assertEqual(run_pipeline([], make_providers(), {}), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import dataclasses
+import unittest
+from tradebot.prefilter import Prefilter, PrefilterOutcome
+from tradebot.strategy import StockData
+
+
+class TestPrefilter(unittest.TestCase):
+    def setUp(self):
+        self.prefilter = Prefilter()
+        self.stock_data = StockData(
+            ticker="AAPL",
+            price=150.0,
+            volume=1000000,
+            sma=150.0,
+            rsi=50.0,
+            macd=0.0,
+            pe_ratio=25.0,
+            peg_ratio=1.5,
+            roe=0.15,
+            revenue_growth=0.1,
+            eps_growth=0.2,
+            de_ratio=0.5,
+            news_articles=[],
+            tweets=[],
+            macd_hist=0.0,
+        )
+
+    def screen(self, held=False, **changes):
+        return self.prefilter.screen(
+            dataclasses.replace(self.stock_data, **changes), held=held
+        )
+
+    def test_neutral_technicals_hold(self):
+        result = self.screen(rsi=55.0, price=155.0, macd_hist=-0.2)
+        self.assertEqual(result.outcome, PrefilterOutcome.HOLD)
+        self.assertEqual(result.score, 0)
+
+    def test_bullish_setup_is_escalated(self):
+        result = self.screen(rsi=25.0, price=160.0, macd_hist=0.3)
+        self.assertEqual(result.outcome, PrefilterOutcome.ESCALATE)
+        self.assertEqual(result.score, 3)
+
+    def test_bullish_setup_with_weak_fundamentals_is_vetoed(self):
+        result = self.screen(price=160.0, macd_hist=0.3, pe_ratio=-5.0, de_ratio=3.0)
+        self.assertEqual(result.outcome, PrefilterOutcome.VETO)
+        self.assertIn("D/E 3.00", result.reasons)
+
+    def test_unreported_fundamentals_raise_no_flags(self):
+        result = self.screen(
+            price=160.0, macd_hist=0.3, pe_ratio=None, peg_ratio=float("nan")
+        )
+        self.assertEqual(result.outcome, PrefilterOutcome.ESCALATE)
+
+    def test_bearish_setup_only_matters_when_held(self):
+        bearish = dict(rsi=80.0, price=140.0, macd_hist=-0.3)
+        self.assertEqual(self.screen(**bearish).outcome, PrefilterOutcome.HOLD)
+        self.assertEqual(
+            self.screen(held=True, **bearish).outcome, PrefilterOutcome.ESCALATE
+        )
+
+    def test_stats_count_avoided_calls(self):
+        self.screen()
+        self.screen(price=160.0, macd_hist=0.3)
+        self.screen(price=160.0, macd_hist=0.3, pe_ratio=60.0, peg_ratio=3.0)
+        self.prefilter.record_avoided(1.5)
+
+        stats = self.prefilter.log_stats()
+        self.assertEqual(stats["screened"], 3)
+        self.assertEqual(stats["escalated"], 1)
+        self.assertEqual(stats["llm_calls_avoided"], 1.5)
+        self.assertEqual(self.prefilter.stats.screened, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+from unittest.mock import MagicMock
+from tradebot.prompts import (
+    build_prompt,
+    compact_articles,
+    compact_tweets,
+    estimate_tokens,
+    summarize_portfolio,
+)
+
+
+def article(title, published_at, **extra):
+    return {
+        "source": {"id": None, "name": "Wire"},
+        "title": title,
+        "description": f"About {title}",
+        "url": "https://example.com/story",
+        "urlToImage": "https://example.com/image.png",
+        "publishedAt": published_at,
+        "content": "Long body " * 50,
+        **extra,
+    }
+
+
+class TestPrompts(unittest.TestCase):
+    def test_compact_articles(self):
+        articles = [
+            article("Apple beats earnings expectations", "2024-05-01T10:00:00Z"),
+            article("Apple unveils new iPhone lineup", "2024-05-03T09:00:00Z"),
+            article("Apple beats earnings expectations again", "2024-05-02T10:00:00Z"),
+            {"title": None},
+        ]
+
+        compacted = compact_articles(articles)
+
+        self.assertEqual(
+            compacted,
+            [
+                {
+                    "title": "Apple unveils new iPhone lineup",
+                    "description": "About Apple unveils new iPhone lineup",
+                    "date": "2024-05-03",
+                },
+                {
+                    "title": "Apple beats earnings expectations again",
+                    "description": "About Apple beats earnings expectations again",
+                    "date": "2024-05-02",
+                },
+            ],
+        )
+        self.assertEqual(len(compact_articles(articles, limit=1)), 1)
+
+    def test_compact_tweets(self):
+        tweets = [
+            MagicMock(text="$AAPL to the moon https://t.co/x", created_at="2024-05-01"),
+            MagicMock(text="$AAPL to the moon", created_at="2024-05-02"),
+            MagicMock(text="Selling my $AAPL", created_at="2024-04-30"),
+        ]
+        self.assertEqual(
+            compact_tweets(tweets), ["$AAPL to the moon", "Selling my $AAPL"]
+        )
+
+    def test_summarize_portfolio(self):
+        portfolio = {
+            "equity": {
+                "AAPL": {
+                    "quantity": "2.0",
+                    "average_buy_price": "150.0",
+                    "equity": "340.0",
+                    "percentage": "12.5",
+                    "name": "Apple",
+                    "id": "abc",
+                },
+                "TSLA": {"quantity": "1.0"},
+            },
+            "cash": {"cash": "500.0", "equity": "2720.0", "user": "..."},
+            "crypto": [],
+        }
+
+        summary = summarize_portfolio(portfolio, "aapl")
+
+        self.assertEqual(summary["cash"], "500.0")
+        self.assertEqual(summary["positions"], 2)
+        self.assertEqual(summary["position"]["equity"], "340.0")
+        self.assertNotIn("name", summary["position"])
+        self.assertNotIn("position", summarize_portfolio(portfolio, "MSFT"))
+        self.assertEqual(summarize_portfolio({"cash": 10000}, "AAPL")["cash"], 10000)
+
+    def test_build_prompt_fits_budget(self):
+        articles = [{"title": f"Story {i}", "description": "x" * 200} for i in range(5)]
+        tweets = [f"tweet {i}" for i in range(5)]
+
+        def render(articles, tweets):
+            return f"Data\nNews: {articles}\nTweets: {tweets}"
+
+        full = build_prompt(render, articles, tweets, max_tokens=10000)
+        self.assertEqual((full.articles, full.tweets), (5, 5))
+
+        prompt = build_prompt(render, articles, tweets, max_tokens=200)
+        self.assertLessEqual(prompt.tokens, 200)
+        self.assertEqual(prompt.tokens, estimate_tokens(prompt.text))
+        self.assertIn("Story 0", prompt.text)
+        self.assertNotIn("Story 4", prompt.text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,20 @@
+import os
+import tempfile
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
-from tradebot.risk_mgmt import RiskManager, TradeDecision
-from tradebot.strategy import StockData
+import numpy as np
+import pandas as pd
+from tradebot.risk_mgmt import (
+    CombinedDecision,
+    RiskDecision,
+    RiskLimits,
+    RiskManager,
+    TradeDecision,
+)
+from tradebot.strategy import Signal, StockData
 from tradebot.clients.robinhood_client import RobinhoodClient
-from tradebot.configs.config import MAX_DAILY_TRADES
+from tradebot.configs.config import MAX_DAILY_TRADES, MAX_POSITION_SIZE
 
 
 class TestRiskManager(unittest.TestCase):
@@ -31,7 +42,11 @@ class TestRiskManager(unittest.TestCase):
     @patch("google.genai.client.Client")
     def test_assess_risk_approved(self, mock_genai_client):
         mock_response = MagicMock()
-        mock_response.parsed = {"decision": "APPROVED", "reasoning": "Looks good"}
+        mock_response.parsed = {
+            "decision": "APPROVED",
+            "reasoning": "Looks good",
+            "position_size": 50.0,
+        }
         mock_genai_client.models.generate_content.return_value = mock_response
         self.manager.llm_client = mock_genai_client
 
@@ -42,6 +57,43 @@ class TestRiskManager(unittest.TestCase):
         self.assertEqual(decision, TradeDecision.APPROVED)
         self.assertEqual(self.manager.daily_trades, 1)
 
+    def test_assess_risk_without_position_size_is_rejected(self):
+        self.manager.llm_client = MagicMock()
+        self.manager.llm_client.models.generate_content.return_value.parsed = {
+            "decision": "APPROVED",
+            "reasoning": "Looks good",
+        }
+
+        decision, result = self.manager.assess_risk(
+            self.mock_stock_data, self.mock_portfolio
+        )
+
+        self.assertEqual(decision, TradeDecision.VETOED)
+        self.assertEqual(result["position_size"], 0.0)
+        self.assertEqual(self.manager.daily_trades, 0)
+        prompt = self.manager.llm_client.models.generate_content.call_args.kwargs[
+            "contents"
+        ]
+        self.assertIn("'APPROVED' or 'REJECTED'", prompt)
+
+    def test_assess_risk_reads_the_parsed_schema(self):
+        self.manager.llm_client = MagicMock()
+        self.manager.llm_client.models.generate_content.return_value.parsed = (
+            RiskDecision(
+                decision=TradeDecision.APPROVED,
+                reasoning="Looks good",
+                position_size=50.0,
+            )
+        )
+
+        decision, result = self.manager.assess_risk(
+            self.mock_stock_data, self.mock_portfolio
+        )
+
+        self.assertEqual(decision, TradeDecision.APPROVED)
+        self.assertEqual(result["reasoning"], "Looks good")
+        self.assertEqual(result["position_size"], 50.0)
+
     def test_assess_risk_max_trades_exceeded(self):
         self.manager.daily_trades = MAX_DAILY_TRADES
         decision, result = self.manager.assess_risk(
@@ -50,6 +102,361 @@ class TestRiskManager(unittest.TestCase):
         self.assertEqual(decision, TradeDecision.VETOED)
         self.assertEqual(result["reasoning"], "Exceeded max daily number of trades.")
 
+    def test_daily_trades_carry_over_between_processes_until_the_next_day(self):
+        today = ["2026-10-16"]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "daily_trades.json")
+            manager = RiskManager(
+                self.mock_rh_client, trades_path=path, today=lambda: today[0]
+            )
+            manager.daily_trades = MAX_DAILY_TRADES
+
+            restarted = RiskManager(
+                self.mock_rh_client, trades_path=path, today=lambda: today[0]
+            )
+            decision, _ = restarted.assess_risk(
+                self.mock_stock_data, self.mock_portfolio
+            )
+            self.assertEqual(decision, TradeDecision.VETOED)
+
+            today[0] = "2026-10-19"
+            restarted = RiskManager(
+                self.mock_rh_client, trades_path=path, today=lambda: today[0]
+            )
+            self.assertEqual(restarted.daily_trades, 0)
+            self.assertTrue(restarted.can_trade())
+
+    def test_concurrent_assessments_share_the_daily_limit(self):
+        self.manager.daily_trades = MAX_DAILY_TRADES - 1
+        asked, answer = threading.Event(), threading.Event()
+
+        def generate(**kwargs):
+            asked.set()
+            answer.wait(5)
+            response = MagicMock()
+            response.parsed = {"decision": "APPROVED", "position_size": 50}
+            return response
+
+        self.manager.llm_client = MagicMock()
+        self.manager.llm_client.models.generate_content.side_effect = generate
+        results = []
+        first = threading.Thread(
+            target=lambda: results.append(
+                self.manager.assess_risk(self.mock_stock_data, self.mock_portfolio)
+            )
+        )
+        first.start()
+        self.assertTrue(asked.wait(5))
+
+        # the last trade of the day is reserved by the request in flight
+        decision, _ = self.manager.assess_risk(
+            self.mock_stock_data, self.mock_portfolio
+        )
+        answer.set()
+        first.join(5)
+
+        self.assertEqual(decision, TradeDecision.VETOED)
+        self.assertEqual(results[0][0], TradeDecision.APPROVED)
+        self.assertEqual(self.manager.daily_trades, MAX_DAILY_TRADES)
+
+    def test_rejections_and_failures_release_the_reservation(self):
+        self.manager.llm_client = MagicMock()
+        generate = self.manager.llm_client.models.generate_content
+        generate.return_value.parsed = {"decision": "REJECTED", "reasoning": "No"}
+        self.manager.assess_risk(self.mock_stock_data, self.mock_portfolio)
+
+        generate.side_effect = ValueError("boom")
+        self.assertIsNone(
+            self.manager.assess_risk(self.mock_stock_data, self.mock_portfolio)
+        )
+        self.assertEqual(self.manager.daily_trades, 0)
+
+
+def make_stock(ticker):
+    return StockData(
+        ticker=ticker,
+        price=100.0,
+        volume=1000,
+        sma=100.0,
+        rsi=50.0,
+        macd=0.0,
+        pe_ratio=20.0,
+        peg_ratio=1.0,
+        roe=0.1,
+        revenue_growth=0.1,
+        eps_growth=0.1,
+        de_ratio=0.5,
+        news_articles=[],
+        tweets=[],
+    )
+
+
+class TestLocalRisk(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        dates = pd.bdate_range("2024-01-01", periods=260)
+        market = rng.normal(0, 0.01, 260)
+        self.history = {
+            "AAPL": market + rng.normal(0, 0.01, 260),
+            "MSFT": market,
+            "WILD": rng.normal(0, 0.08, 260),
+        }
+        self.history = {
+            ticker: pd.DataFrame({"close": 100 * np.cumprod(1 + returns)}, index=dates)
+            for ticker, returns in self.history.items()
+        }
+        self.manager = RiskManager(
+            MagicMock(spec=RobinhoodClient), history=self.history.get
+        )
+        self.manager.llm_client = MagicMock()
+        self.generate = self.manager.llm_client.models.generate_content
+        self.generate.return_value.parsed = {
+            "decision": "APPROVED",
+            "reasoning": "Fine",
+            "position_size": 1000,
+        }
+        self.portfolio = {
+            "cash": {"cash": "5000", "equity": "10000"},
+            "equity": {"MSFT": {"quantity": "10", "equity": "5000"}},
+        }
+
+    def stock(self, ticker):
+        return make_stock(ticker)
+
+    def test_metrics_and_size_cap(self):
+        local = self.manager.local_risk(self.stock("AAPL"), self.portfolio, Signal.BUY)
+
+        self.assertAlmostEqual(local.correlation, 0.7, delta=0.1)
+        self.assertAlmostEqual(local.volatility, 0.22, delta=0.05)
+        self.assertLessEqual(local.max_size, MAX_POSITION_SIZE)
+        self.assertEqual(local.vetoes, [])
+
+    def test_hard_limits_veto_without_the_model(self):
+        self.manager.limits = RiskLimits(max_correlation=0.5)
+
+        for ticker in ("AAPL", "WILD"):
+            decision, result = self.manager.assess_risk(
+                self.stock(ticker), self.portfolio, Signal.BUY
+            )
+            self.assertEqual(decision, TradeDecision.VETOED)
+            self.assertIn("Vetoed by risk limits", result["reasoning"])
+        self.generate.assert_not_called()
+
+    def test_nothing_to_sell(self):
+        decision, result = self.manager.assess_risk(
+            self.stock("AAPL"), self.portfolio, Signal.SELL
+        )
+        self.assertEqual(decision, TradeDecision.VETOED)
+        self.generate.assert_not_called()
+
+    def test_model_gets_numbers_and_size_is_capped(self):
+        decision, result = self.manager.assess_risk(
+            self.stock("AAPL"), self.portfolio, Signal.BUY
+        )
+
+        self.assertEqual(decision, TradeDecision.APPROVED)
+        self.assertEqual(result["position_size"], MAX_POSITION_SIZE)
+        contents = self.generate.call_args.kwargs["contents"]
+        self.assertIn("Annualized volatility", contents)
+        self.assertIn("Correlation with holdings", contents)
+        self.assertNotIn("PE Ratio", contents)
+
+    def test_portfolio_share_is_enforced(self):
+        portfolio = {
+            "cash": {"cash": "100", "equity": "1000"},
+            "equity": {"AAPL": {"quantity": "1", "equity": "160"}},
+        }
+        local = self.manager.local_risk(self.stock("AAPL"), portfolio, Signal.BUY)
+        # 17% of $1000 is $170, $160 of which is already held
+        self.assertEqual(local.max_size, 10.0)
+
+
+class TestPortfolioRisk(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        dates = pd.bdate_range("2024-01-01", periods=260)
+        market = rng.normal(0, 0.01, 260)
+        history = {
+            "AAPL": market + rng.normal(0, 0.01, 260),
+            "MSFT": market,
+            "TSLA": rng.normal(0, 0.01, 260),
+            "WILD": rng.normal(0, 0.08, 260),
+        }
+        history = {
+            ticker: pd.DataFrame({"close": 100 * np.cumprod(1 + returns)}, index=dates)
+            for ticker, returns in history.items()
+        }
+        history["AAPL2"] = history["AAPL"] * 1.01
+        self.manager = RiskManager(MagicMock(spec=RobinhoodClient), history=history.get)
+        self.manager.llm_client = MagicMock()
+        self.generate = self.manager.llm_client.models.generate_content
+        self.portfolio = {
+            "cash": {"cash": "200", "equity": "10000"},
+            "equity": {"MSFT": {"quantity": "10", "equity": "5000"}},
+        }
+
+        def answer(model, contents, config):
+            self.generate.return_value.parsed = [
+                {
+                    "ticker": ticker,
+                    "decision": "APPROVED",
+                    "reasoning": "Fine",
+                    "position_size": 1000,
+                }
+                for ticker in ("AAPL", "TSLA", "MSFT")
+                if f"Ticker: {ticker}" in contents
+            ]
+            return self.generate.return_value
+
+        self.generate.side_effect = answer
+
+    def test_one_request_with_shared_limits(self):
+        results = self.manager.assess_portfolio(
+            [
+                (make_stock("AAPL"), Signal.BUY),
+                (make_stock("AAPL2"), Signal.BUY),
+                (make_stock("TSLA"), Signal.BUY),
+                (make_stock("MSFT"), Signal.SELL),
+                (make_stock("WILD"), Signal.HOLD),
+            ],
+            self.portfolio,
+        )
+
+        self.generate.assert_called_once()
+        self.assertNotIn("WILD", results)
+        # AAPL2 moves with AAPL, which is bought first
+        decision, result = results["AAPL2"]
+        self.assertEqual(decision, TradeDecision.VETOED)
+        self.assertIn("also bought this run", result["reasoning"])
+        # both purchases together fit in the $200 of buying power
+        sizes = {ticker: results[ticker][1]["position_size"] for ticker in results}
+        self.assertEqual(results["AAPL"][0], TradeDecision.APPROVED)
+        self.assertLessEqual(sizes["AAPL"] + sizes["TSLA"], 200.0)
+        self.assertAlmostEqual(sizes["AAPL"], sizes["TSLA"], delta=0.01)
+        self.assertEqual(sizes["MSFT"], MAX_POSITION_SIZE)
+        self.assertEqual(self.manager.daily_trades, 3)
+
+    def test_run_var_limit_scales_purchases(self):
+        self.portfolio["cash"]["cash"] = "5000"
+        self.manager.limits = RiskLimits(max_run_var=0.02)
+
+        results = self.manager.assess_portfolio(
+            [(make_stock("AAPL"), Signal.BUY), (make_stock("TSLA"), Signal.BUY)],
+            self.portfolio,
+        )
+
+        sizes = [results[ticker][1]["position_size"] for ticker in ("AAPL", "TSLA")]
+        self.assertLess(sum(sizes), 2 * MAX_POSITION_SIZE)
+        self.assertGreater(min(sizes), 0.0)
+
+    def test_daily_limit_and_model_failure(self):
+        self.manager.daily_trades = MAX_DAILY_TRADES - 1
+        self.generate.side_effect = ValueError("boom")
+
+        results = self.manager.assess_portfolio(
+            [(make_stock("AAPL"), Signal.BUY), (make_stock("TSLA"), Signal.BUY)],
+            self.portfolio,
+        )
+
+        self.assertIsNone(results["AAPL"])
+        self.assertEqual(results["TSLA"][0], TradeDecision.VETOED)
+        self.assertIn("max daily number of trades", results["TSLA"][1]["reasoning"])
+
+    def test_nothing_left_for_the_model(self):
+        results = self.manager.assess_portfolio(
+            [(make_stock("WILD"), Signal.BUY)], self.portfolio
+        )
+        self.assertEqual(results["WILD"][0], TradeDecision.VETOED)
+        self.generate.assert_not_called()
+
+
+class TestCombinedDecision(unittest.TestCase):
+    def setUp(self):
+        self.manager = RiskManager(MagicMock(spec=RobinhoodClient))
+        self.manager.llm_client = MagicMock()
+        self.stock_data = StockData(
+            ticker="AAPL",
+            price=150.0,
+            volume=1000000,
+            sma=145.0,
+            rsi=60.0,
+            macd=1.5,
+            pe_ratio=25.0,
+            peg_ratio=1.5,
+            roe=0.15,
+            revenue_growth=0.1,
+            eps_growth=0.2,
+            de_ratio=0.5,
+            news_articles=[],
+            tweets=[],
+        )
+
+    def answer(self, **parsed):
+        generate = self.manager.llm_client.models.generate_content
+        generate.return_value.parsed = parsed
+        return generate
+
+    def test_approved_trade_in_one_request(self):
+        generate = self.answer(
+            signal="BUY", reasoning="Strong", decision="APPROVED", position_size=500
+        )
+
+        signal, answer, (decision, risk) = self.manager.decide_and_assess(
+            self.stock_data, {"cash": 10000}
+        )
+
+        self.assertEqual(signal, Signal.BUY)
+        self.assertEqual(decision, TradeDecision.APPROVED)
+        self.assertEqual(risk["position_size"], MAX_POSITION_SIZE)
+        self.assertEqual(self.manager.daily_trades, 1)
+        generate.assert_called_once()
+
+    def test_parsed_schema_instance(self):
+        # the SDK parses into the response schema, not a dict
+        generate = self.manager.llm_client.models.generate_content
+        generate.return_value.parsed = CombinedDecision(
+            signal=Signal.SELL,
+            reasoning="Rich",
+            confidence="High",
+            decision=TradeDecision.APPROVED,
+            position_size=50.0,
+        )
+
+        signal, answer, (decision, risk) = self.manager.decide_and_assess(
+            self.stock_data, {"equity": {"AAPL": {"equity": "1000"}}}
+        )
+
+        self.assertEqual(signal, Signal.SELL)
+        self.assertEqual(answer["reasoning"], "Rich")
+        self.assertEqual(decision, TradeDecision.APPROVED)
+        self.assertEqual(risk["position_size"], 50.0)
+
+    def test_hold_has_no_risk_decision(self):
+        self.answer(signal="HOLD", reasoning="Flat", decision="APPROVED")
+
+        signal, _, risk = self.manager.decide_and_assess(self.stock_data, {})
+
+        self.assertEqual(signal, Signal.HOLD)
+        self.assertIsNone(risk)
+        self.assertEqual(self.manager.daily_trades, 0)
+
+    def test_rejected_and_failed_requests(self):
+        self.answer(signal="SELL", decision="REJECTED", position_size=50)
+        _, _, (decision, _) = self.manager.decide_and_assess(self.stock_data, {})
+        self.assertEqual(decision, TradeDecision.VETOED)
+
+        self.answer(signal="maybe")
+        self.assertIsNone(self.manager.decide_and_assess(self.stock_data, {}))
+
+    def test_daily_limit_skips_the_model(self):
+        self.manager.daily_trades = MAX_DAILY_TRADES
+
+        signal, _, (decision, _) = self.manager.decide_and_assess(self.stock_data, {})
+
+        self.assertEqual(signal, Signal.HOLD)
+        self.assertEqual(decision, TradeDecision.VETOED)
+        self.manager.llm_client.models.generate_content.assert_not_called()
+
 
 if __name__ == "__main__":
     unittest.main()
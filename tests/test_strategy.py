@@ -1,6 +1,19 @@
+import dataclasses
+import json
+import tempfile
+import typing
 import unittest
+from types import SimpleNamespace
 from unittest.mock import patch, MagicMock
-from tradebot.strategy import StrategyEngine, StockData, Signal
+from google.genai.types import GenerateContentResponse
+from tradebot.clients.context_cache import ContextCache
+from tradebot.configs.config import (
+    LLM_CONTEXT_CACHE_TTL,
+    LLM_CONTEXT_MEDIA_ITEMS,
+    LLM_CONTEXT_PROMPT_TOKENS,
+    LLM_PROMPT_TOKENS,
+)
+from tradebot.strategy import DecisionCache, StrategyEngine, StockData, Signal
 
 
 class TestStrategyEngine(unittest.TestCase):
@@ -39,6 +52,44 @@ class TestStrategyEngine(unittest.TestCase):
         self.assertEqual(signal, Signal.BUY)
         self.assertEqual(answer["reasoning"], "Looks good")
 
+    def test_decide_trade_accepts_what_the_batch_path_accepts(self):
+        self.engine.llm_client = MagicMock()
+        generate = self.engine.llm_client.models.generate_content
+        for parsed, expected in (
+            ({"signal": Signal.SELL}, Signal.SELL),
+            (SimpleNamespace(signal="hold", reasoning="Flat"), Signal.HOLD),
+        ):
+            generate.return_value.parsed = parsed
+            signal, _ = self.engine.decide_trade(self.mock_stock_data)
+            self.assertEqual(signal, expected)
+
+        generate.return_value.parsed = {"signal": "maybe"}
+        with self.assertRaises(ValueError):
+            self.engine.decide_trade(self.mock_stock_data)
+
+    def test_decide_trade_parses_the_sdk_reply(self):
+        def generate_content(model, contents, config):
+            # the model answers in the requested schema, which the SDK parses
+            answer = {"signal": -1, "reasoning": "Overbought", "confidence": 0.7}
+            if typing.get_origin(config.response_schema) is list:
+                answer = [answer]
+            return GenerateContentResponse._from_response(
+                response={
+                    "candidates": [
+                        {"content": {"parts": [{"text": json.dumps(answer)}]}}
+                    ]
+                },
+                kwargs={"config": {"response_schema": config.response_schema}},
+            )
+
+        self.engine.llm_client = MagicMock()
+        self.engine.llm_client.models.generate_content.side_effect = generate_content
+
+        signal, answer = self.engine.decide_trade(self.mock_stock_data)
+
+        self.assertEqual(signal, Signal.SELL)
+        self.assertEqual(answer.reasoning, "Overbought")
+
     def test_decide_trade_unknown_strategy(self):
         with self.assertRaises(ValueError):
             self.engine.decide_trade(self.mock_stock_data, strategy="unknown")
@@ -50,5 +101,269 @@ class TestStrategyEngine(unittest.TestCase):
         self.assertIn("'PE Ratio': 25.0", prompt)
 
 
+class TestDecisionCache(unittest.TestCase):
+    def setUp(self):
+        self.stock_data = StockData(
+            ticker="AAPL",
+            price=150.0,
+            volume=1000000,
+            sma=145.0,
+            rsi=60.0,
+            macd=1.5,
+            pe_ratio=25.0,
+            peg_ratio=1.5,
+            roe=0.15,
+            revenue_growth=0.1,
+            eps_growth=0.2,
+            de_ratio=0.5,
+            news_articles=[{"title": "Test News"}],
+            tweets=[MagicMock(text="Test Tweet")],
+        )
+        self.llm_client = MagicMock()
+        self.llm_client.models.generate_content.return_value.parsed = {
+            "signal": "SELL",
+            "reasoning": "Overbought",
+            "confidence": "Medium",
+        }
+
+    def make_engine(self, cache):
+        engine = StrategyEngine(decision_cache=cache)
+        engine.llm_client = self.llm_client
+        return engine
+
+    def test_repeat_call_is_served_from_cache(self):
+        engine = self.make_engine(DecisionCache())
+        first = engine.decide_trade(self.stock_data)
+        nudged = dataclasses.replace(self.stock_data, price=150.01, rsi=59.99)
+        second = engine.decide_trade(nudged)
+
+        self.assertEqual(first, second)
+        self.assertEqual(second[0], Signal.SELL)
+        self.llm_client.models.generate_content.assert_called_once()
+        self.assertEqual(engine.decision_cache.stats.hits, 1)
+
+    def test_changed_inputs_miss(self):
+        cache = DecisionCache(tolerances={"rsi": 0.001})
+        base = cache.key(self.stock_data, "basic_analysis", "gemini-2.5-flash")
+
+        for changed in (
+            dataclasses.replace(self.stock_data, rsi=60.5),
+            dataclasses.replace(self.stock_data, price=165.0),
+            dataclasses.replace(self.stock_data, news_articles=[{"title": "Other"}]),
+        ):
+            self.assertNotEqual(
+                cache.key(changed, "basic_analysis", "gemini-2.5-flash"), base
+            )
+        self.assertNotEqual(
+            cache.key(self.stock_data, "other", "gemini-2.5-flash"), base
+        )
+        self.assertNotEqual(cache.key(self.stock_data, "basic_analysis", "pro"), base)
+
+    def test_expiry_and_persistence(self):
+        clock = MagicMock(return_value=1000.0)
+        with tempfile.TemporaryDirectory() as directory:
+            self.make_engine(
+                DecisionCache(directory, ttl=60, clock=clock)
+            ).decide_trade(self.stock_data)
+
+            engine = self.make_engine(DecisionCache(directory, ttl=60, clock=clock))
+            self.assertEqual(engine.decide_trade(self.stock_data)[0], Signal.SELL)
+            self.assertEqual(self.llm_client.models.generate_content.call_count, 1)
+
+            clock.return_value = 1100.0
+            engine.decide_trade(self.stock_data)
+            self.assertEqual(self.llm_client.models.generate_content.call_count, 2)
+
+    def test_context_cache_sends_only_changes(self):
+        engine = self.make_engine(None)
+        engine.context_cache = ContextCache(min_tokens=10)
+        self.llm_client.caches.create.return_value.name = "cachedContents/aapl"
+        generate = self.llm_client.models.generate_content
+
+        engine.decide_trade(self.stock_data)
+        engine.decide_trade(dataclasses.replace(self.stock_data, rsi=65.0))
+
+        self.llm_client.caches.create.assert_called_once()
+        config = generate.call_args.kwargs["config"]
+        self.assertEqual(config.cached_content, "cachedContents/aapl")
+        self.assertIsNone(config.system_instruction)
+        self.assertIn("'Technicals RSI': 65.0", generate.call_args.kwargs["contents"])
+        self.assertNotIn("PE Ratio", generate.call_args.kwargs["contents"])
+        self.assertGreater(engine.context_cache.stats.tokens_saved, 0)
+
+    def test_context_cache_engages_with_the_shipped_settings(self):
+        # a day of coverage: distinct headlines with NewsAPI-sized descriptions
+        topics = [
+            "earnings", "iphone", "services", "china", "buyback", "antitrust",
+            "vision", "supplier", "dividend", "analyst", "chips", "streaming",
+            "tariffs", "wearables", "lawsuit", "india", "payments", "ai",
+            "retail", "guidance",
+        ]  # fmt: skip
+        stock_data = dataclasses.replace(
+            self.stock_data,
+            news_articles=[
+                {
+                    "title": f"Apple {topic} update moves shares {i}",
+                    "description": f"Analysts weigh what the {topic} news means "
+                    "for margins, revenue growth and the outlook for the next "
+                    "quarters as investors reassess the valuation of the stock.",
+                    "publishedAt": f"2026-10-18T{i:02d}:00:00Z",
+                }
+                for i, topic in enumerate(topics)
+            ],
+            tweets=[
+                f"$AAPL {topic} headline just hit, watching how the stock reacts "
+                "into the close given where it sits against the moving averages"
+                for topic in topics
+            ],
+        )
+        self.llm_client.caches.create.return_value.name = "cachedContents/aapl"
+
+        engine = StrategyEngine(
+            max_prompt_tokens=LLM_PROMPT_TOKENS,
+            context_cache=ContextCache(ttl=LLM_CONTEXT_CACHE_TTL),
+        )
+        engine.llm_client = self.llm_client
+        engine.decide_trade(stock_data)
+        # under the plain prompt budget the prompt is too small to cache
+        self.llm_client.caches.create.assert_not_called()
+
+        engine = StrategyEngine(
+            max_prompt_tokens=LLM_CONTEXT_PROMPT_TOKENS,
+            media_items=LLM_CONTEXT_MEDIA_ITEMS,
+            context_cache=ContextCache(ttl=LLM_CONTEXT_CACHE_TTL),
+        )
+        engine.llm_client = self.llm_client
+        engine.decide_trade(stock_data)
+        engine.decide_trade(dataclasses.replace(stock_data, rsi=65.0))
+
+        self.llm_client.caches.create.assert_called_once()
+        self.assertEqual(engine.context_cache.stats.created, 1)
+        self.assertEqual(engine.context_cache.stats.reused, 1)
+        self.assertGreater(engine.context_cache.stats.tokens_saved, 1000)
+
+
+class TestDecideTrades(unittest.TestCase):
+    def setUp(self):
+        self.stocks = [
+            StockData(
+                ticker=ticker,
+                price=150.0,
+                volume=1000000,
+                sma=145.0,
+                rsi=60.0,
+                macd=1.5,
+                pe_ratio=25.0,
+                peg_ratio=1.5,
+                roe=0.15,
+                revenue_growth=0.1,
+                eps_growth=0.2,
+                de_ratio=0.5,
+                news_articles=[{"title": f"{ticker} News"}],
+                tweets=[],
+            )
+            for ticker in ("AAPL", "TSLA", "MSFT", "NVDA")
+        ]
+        self.engine = StrategyEngine()
+        self.engine.llm_client = MagicMock()
+        self.generate = self.engine.llm_client.models.generate_content
+
+    def respond(self, batch_answers):
+        """Answer batched prompts with `batch_answers` and single prompts with HOLD."""
+
+        def generate_content(model, contents, config):
+            response = MagicMock()
+            if "several stocks" in contents:
+                response.parsed = batch_answers(contents)
+            else:
+                response.parsed = {"signal": "HOLD", "reasoning": "Retried"}
+            return response
+
+        self.generate.side_effect = generate_content
+
+    def test_one_request_for_all_tickers(self):
+        self.respond(
+            lambda contents: [
+                {"ticker": stock.ticker, "signal": "BUY", "reasoning": "Batched"}
+                for stock in self.stocks
+            ]
+        )
+
+        decisions = self.engine.decide_trades(self.stocks)
+
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(set(decisions), {"AAPL", "TSLA", "MSFT", "NVDA"})
+        self.assertEqual(decisions["TSLA"][0], Signal.BUY)
+
+    def test_missing_and_malformed_tickers_are_retried(self):
+        self.respond(
+            lambda contents: [
+                {"ticker": "AAPL", "signal": "SELL", "reasoning": "Batched"},
+                {"ticker": "TSLA", "signal": None},
+                {"ticker": "UNKNOWN", "signal": "BUY"},
+            ]
+        )
+
+        decisions = self.engine.decide_trades(self.stocks)
+
+        self.assertEqual(decisions["AAPL"][0], Signal.SELL)
+        for ticker in ("TSLA", "MSFT", "NVDA"):
+            self.assertEqual(
+                decisions[ticker],
+                (Signal.HOLD, {"signal": "HOLD", "reasoning": "Retried"}),
+            )
+        self.assertEqual(self.generate.call_count, 4)
+
+    def test_token_budget_splits_batches(self):
+        # room for about two tickers per request
+        self.engine.batch_tokens = 400
+        self.respond(
+            lambda contents: [
+                {"ticker": stock.ticker, "signal": "BUY"}
+                for stock in self.stocks
+                if f"Ticker: {stock.ticker}" in contents
+            ]
+        )
+
+        decisions = self.engine.decide_trades(self.stocks)
+
+        self.assertEqual(len(decisions), 4)
+        self.assertEqual(self.generate.call_count, 2)
+        for call in self.generate.call_args_list:
+            self.assertIn("several stocks", call.kwargs["contents"])
+
+    def test_cached_tickers_skip_the_model(self):
+        self.engine.decision_cache = DecisionCache()
+        self.respond(
+            lambda contents: [
+                {"ticker": stock.ticker, "signal": "BUY"} for stock in self.stocks
+            ]
+        )
+        self.engine.decide_trades(self.stocks)
+
+        decisions = self.engine.decide_trades(self.stocks)
+
+        self.assertEqual(len(decisions), 4)
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(self.engine.decide_trade(self.stocks[0])[0], Signal.BUY)
+        self.assertEqual(self.generate.call_count, 1)
+
+    def test_request_costs_share_batches_and_skip_cached_tickers(self):
+        self.engine.decision_cache = DecisionCache()
+        self.respond(lambda contents: [{"ticker": "AAPL", "signal": "BUY"}])
+        self.engine.decide_trades(self.stocks[:1])
+
+        costs = self.engine.request_costs(self.stocks)
+
+        self.assertEqual(costs["AAPL"], (0.0, 0))
+        for ticker in ("TSLA", "MSFT", "NVDA"):
+            calls, tokens = costs[ticker]
+            self.assertGreater(calls, 0)
+            self.assertLess(calls, 0.5)
+            self.assertGreater(tokens, 0)
+        self.assertEqual(self.generate.call_count, 1)
+        self.assertEqual(self.engine.decision_cache.stats.hits, 0)
+
+
 if __name__ == "__main__":
     unittest.main()
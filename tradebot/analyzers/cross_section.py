@@ -0,0 +1,199 @@
+import logging
+import math
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+# Error tolerated when an exponential average is started from a truncated
+# history instead of the full one
+_EMA_TOLERANCE = 1e-12
+
+
+def _as_matrix(close) -> np.ndarray:
+    close = np.asarray(close, dtype=np.float64)
+    if close.ndim == 1:
+        close = close[:, np.newaxis]
+    if close.ndim != 2:
+        raise ValueError(f"Expected a (time x ticker) array, got shape {close.shape}")
+    return close
+
+
+def _ewm(values: np.ndarray, alpha: float, seed_length: Optional[int]) -> np.ndarray:
+    """
+    Column-wise exponential average with adjust=False semantics.
+
+    With `seed_length` the average starts from the SMA of the first
+    `seed_length` valid values (pandas_ta `ema`), otherwise from the first valid
+    value (pandas_ta `rma`). NaNs before a column's first value are its missing
+    history; NaNs after it are skipped without advancing the average.
+    """
+    steps, width = values.shape
+    out = np.full(values.shape, np.nan)
+    seen = np.zeros(width, dtype=np.int64)
+    total = np.zeros(width)
+    current = np.full(width, np.nan)
+    ready = seed_length or 1
+
+    for t in range(steps):
+        x = values[t]
+        valid = ~np.isnan(x)
+        seen += valid
+        if seed_length:
+            seeding = valid & (seen <= seed_length)
+            total[seeding] += x[seeding]
+            seeded = valid & (seen == seed_length)
+            current[seeded] = total[seeded] / seed_length
+        else:
+            seeded = valid & (seen == 1)
+            current[seeded] = x[seeded]
+        step = valid & (seen > ready)
+        current[step] = alpha * x[step] + (1 - alpha) * current[step]
+        out[t] = np.where(valid & (seen >= ready), current, np.nan)
+    return out
+
+
+def batch_sma(close, period: int = 20) -> np.ndarray:
+    """
+    Simple moving average of every column of a (time x ticker) array.
+
+    Args:
+        close: (time x ticker) closing prices, NaN where a ticker has no bar.
+        period (int): The SMA period.
+
+    Returns:
+        np.ndarray: (time x ticker) SMA, NaN until a column has `period` bars.
+    """
+    close = _as_matrix(close)
+    valid = ~np.isnan(close)
+    sums = np.vstack(
+        [np.zeros(close.shape[1]), np.cumsum(np.where(valid, close, 0), axis=0)]
+    )
+    counts = np.vstack([np.zeros(close.shape[1]), np.cumsum(valid, axis=0)])
+
+    out = np.full(close.shape, np.nan)
+    if len(close) < period:
+        return out
+    window_sum = sums[period:] - sums[:-period]
+    window_count = counts[period:] - counts[:-period]
+    out[period - 1 :] = np.where(window_count == period, window_sum / period, np.nan)
+    return out
+
+
+def batch_rsi(close, period: int = 14) -> np.ndarray:
+    """
+    Wilder RSI of every column of a (time x ticker) array, NaN until a column
+    has `period + 1` bars.
+    """
+    close = _as_matrix(close)
+    change = np.full(close.shape, np.nan)
+    change[1:] = close[1:] - close[:-1]
+
+    gain = _ewm(
+        np.where(change > 0, change, np.where(np.isnan(change), np.nan, 0.0)),
+        1.0 / period,
+        None,
+    )
+    loss = _ewm(
+        np.where(change < 0, -change, np.where(np.isnan(change), np.nan, 0.0)),
+        1.0 / period,
+        None,
+    )
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rsi = 100 * gain / (gain + loss)
+
+    bars = np.cumsum(~np.isnan(close), axis=0)
+    return np.where(bars >= period + 1, rsi, np.nan)
+
+
+def batch_macd(
+    close, fast: int = 12, slow: int = 26, signal: int = 9
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    MACD of every column of a (time x ticker) array.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: (macd, histogram, signal) arrays.
+    """
+    if slow < fast:
+        fast, slow = slow, fast
+    close = _as_matrix(close)
+    macd = _ewm(close, 2.0 / (fast + 1), fast) - _ewm(close, 2.0 / (slow + 1), slow)
+    signal_line = _ewm(macd, 2.0 / (signal + 1), signal)
+    return macd, macd - signal_line, signal_line
+
+
+def warmup_bars(
+    sma_period: int = 50,
+    rsi_period: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+) -> int:
+    """
+    Number of trailing bars after which the exponential averages used by RSI
+    and MACD no longer depend (within 1e-12) on where they were started.
+    """
+
+    def decay_bars(alpha: float) -> int:
+        return math.ceil(math.log(_EMA_TOLERANCE) / math.log(1 - alpha))
+
+    slow = max(macd_fast, macd_slow)
+    return max(
+        sma_period,
+        rsi_period + 1 + decay_bars(1.0 / rsi_period),
+        slow
+        + macd_signal
+        + decay_bars(2.0 / (slow + 1))
+        + decay_bars(2.0 / (macd_signal + 1)),
+    )
+
+
+def latest_indicator_table(
+    close,
+    tickers: List[str],
+    sma_period: int = 50,
+    rsi_period: int = 14,
+    macd_fast: int = 12,
+    macd_slow: int = 26,
+    macd_signal: int = 9,
+) -> pd.DataFrame:
+    """
+    Latest SMA, RSI and MACD for every ticker of a (time x ticker) close array
+    in one vectorized pass.
+
+    Only the trailing `warmup_bars` rows are processed; tickers with shorter
+    histories are handled exactly through their leading NaNs.
+
+    Args:
+        close: (time x ticker) closing prices, e.g. `PricePanel.matrix("close")`.
+        tickers (List[str]): Column labels of `close`.
+
+    Returns:
+        pd.DataFrame: One row per ticker with sma, rsi, macd, macd_hist and
+            macd_signal columns (NaN where a ticker lacks enough history).
+    """
+    close = np.asarray(close)
+    if close.ndim != 2 or close.shape[1] != len(tickers):
+        raise ValueError(
+            f"Expected a (time x {len(tickers)}) close array, got {close.shape}"
+        )
+    tail = _as_matrix(
+        close[-warmup_bars(sma_period, rsi_period, macd_fast, macd_slow, macd_signal) :]
+    )
+
+    macd, histogram, signal_line = batch_macd(tail, macd_fast, macd_slow, macd_signal)
+    table = pd.DataFrame(
+        {
+            "sma": batch_sma(tail, sma_period)[-1],
+            "rsi": batch_rsi(tail, rsi_period)[-1],
+            "macd": macd[-1],
+            "macd_hist": histogram[-1],
+            "macd_signal": signal_line[-1],
+        },
+        index=pd.Index(tickers, name="ticker"),
+    )
+    return table
@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from tradebot.clients.ohlcv_store import OHLCVStore
+
+
+logger = logging.getLogger(__name__)
+
+PRICE_FIELDS = ("open", "high", "low", "close")
+FIELDS = PRICE_FIELDS + ("volume",)
+
+
+class PricePanel:
+    """
+    Daily OHLCV for many tickers aligned on one date axis.
+
+    Each field is stored as its own `.npy` file holding a (ticker x date) array:
+    prices as float32 (NaN where a ticker has no bar) and volume as int64 (0
+    where a ticker has no bar). Opening a panel memory-maps the files read-only,
+    so any number of processes can share the same pages without copying.
+
+    A ticker's history is contiguous in memory, and `matrix(field)` returns the
+    transposed (date x ticker) view used for cross-sectional work.
+    """
+
+    def __init__(self, directory: str, tickers: List[str], dates: np.ndarray, arrays):
+        self.directory = directory
+        self.tickers = tickers
+        self.dates = pd.DatetimeIndex(dates.astype("datetime64[ns]"), name="date")
+        self._arrays: Dict[str, np.ndarray] = arrays
+        self._positions = {ticker: i for i, ticker in enumerate(tickers)}
+
+    def __len__(self) -> int:
+        return len(self.tickers)
+
+    def __contains__(self, ticker: str) -> bool:
+        return ticker.upper() in self._positions
+
+    @classmethod
+    def build(cls, directory: str, frames: Dict[str, pd.DataFrame]) -> "PricePanel":
+        """
+        Write a panel from per-ticker OHLCV frames and open it.
+
+        Args:
+            directory (str): Where the panel files are written.
+            frames (Dict[str, pd.DataFrame]): Frames indexed by date with
+                open/high/low/close/volume columns, keyed by ticker.
+
+        Returns:
+            PricePanel: The newly written panel, memory-mapped read-only.
+        """
+        os.makedirs(directory, exist_ok=True)
+        tickers = [ticker.upper() for ticker in frames]
+        dates = np.unique(
+            np.concatenate(
+                [
+                    pd.DatetimeIndex(frame.index).values.astype("datetime64[D]")
+                    for frame in frames.values()
+                ]
+                or [np.array([], dtype="datetime64[D]")]
+            )
+        )
+        shape = (len(tickers), len(dates))
+
+        for field in FIELDS:
+            is_volume = field == "volume"
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".npy.tmp")
+            os.close(fd)
+            array = np.lib.format.open_memmap(
+                tmp_path,
+                mode="w+",
+                dtype=np.int64 if is_volume else np.float32,
+                shape=shape,
+            )
+            array[:] = 0 if is_volume else np.nan
+            for i, frame in enumerate(frames.values()):
+                frame_dates = pd.DatetimeIndex(frame.index).values.astype(
+                    "datetime64[D]"
+                )
+                columns = np.searchsorted(dates, frame_dates)
+                values = frame[field].to_numpy()
+                if is_volume:
+                    values = np.nan_to_num(values).astype(np.int64)
+                array[i, columns] = values
+            array.flush()
+            del array
+            os.replace(tmp_path, os.path.join(directory, f"{field}.npy"))
+
+        np.save(os.path.join(directory, "dates.npy"), dates)
+        # metadata is written last; it's what `open` validates against
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump({"tickers": tickers, "shape": list(shape)}, f)
+
+        logger.info(f"Built price panel of {shape[0]} tickers x {shape[1]} dates")
+        return cls.open(directory)
+
+    @classmethod
+    def from_store(
+        cls, directory: str, store: OHLCVStore, tickers: List[str]
+    ) -> "PricePanel":
+        """Build a panel from the cached daily bars of `tickers`."""
+        frames = {}
+        for ticker in tickers:
+            frame = store.read(ticker)
+            if frame is None:
+                logger.warning(f"No cached history for {ticker}, leaving it out")
+                continue
+            frames[ticker] = frame
+        return cls.build(directory, frames)
+
+    @classmethod
+    def open(cls, directory: str) -> "PricePanel":
+        with open(os.path.join(directory, "meta.json")) as f:
+            meta = json.load(f)
+        shape = tuple(meta["shape"])
+        arrays = {
+            field: np.load(os.path.join(directory, f"{field}.npy"), mmap_mode="r")
+            for field in FIELDS
+        }
+        dates = np.load(os.path.join(directory, "dates.npy"))
+        for field, array in arrays.items():
+            if array.shape != shape:
+                raise ValueError(
+                    f"Panel field {field} has shape {array.shape}, expected {shape}"
+                )
+        if len(dates) != shape[1]:
+            raise ValueError("Panel dates do not match the stored arrays")
+        return cls(directory, meta["tickers"], dates, arrays)
+
+    def matrix(self, field: str) -> np.ndarray:
+        """(date x ticker) view of one field across the whole panel."""
+        return self._arrays[field].T
+
+    def frame(
+        self, ticker: str, start: Optional[pd.Timestamp] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Per-ticker OHLCV frame, usable with the `tradebot.analyzers.technical`
+        functions. Dates before the ticker's first bar (and any gaps) are dropped.
+
+        Args:
+            ticker (str): The ticker symbol.
+            start (Optional[pd.Timestamp]): Earliest date to include.
+
+        Returns:
+            Optional[pd.DataFrame]: The ticker's bars, or None if it is not in the panel.
+        """
+        position = self._positions.get(ticker.upper())
+        if position is None:
+            return None
+
+        first = 0 if start is None else int(self.dates.searchsorted(start))
+        rows = {field: self._arrays[field][position, first:] for field in FIELDS}
+        valid = ~np.isnan(rows["close"])
+        if not valid.all():
+            rows = {field: values[valid] for field, values in rows.items()}
+            index = self.dates[first:][valid]
+        else:
+            index = self.dates[first:]
+        return pd.DataFrame(rows, index=index)
@@ -0,0 +1,130 @@
+import logging
+import math
+from statistics import NormalDist
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+TRADING_DAYS = 252
+# Fewest daily returns a volatility, VaR or correlation is computed from
+MIN_OBSERVATIONS = 20
+
+
+def returns_matrix(
+    closes: Dict[str, pd.Series], lookback: int = TRADING_DAYS
+) -> pd.DataFrame:
+    """
+    Daily simple returns of several tickers on a shared date index.
+
+    Args:
+        closes (Dict[str, pd.Series]): Closing prices indexed by date, by ticker.
+        lookback (int): Number of most recent dates to keep.
+
+    Returns:
+        pd.DataFrame: (date x ticker) returns, NaN where a ticker has no bar on
+            that date or the day before.
+    """
+    closes = {ticker: series for ticker, series in closes.items() if series is not None}
+    if not closes:
+        return pd.DataFrame()
+    frame = pd.concat(closes, axis=1).sort_index().tail(lookback + 1)
+    returns = frame / frame.shift(1) - 1
+    return returns.iloc[1:]
+
+
+def _as_matrix(returns) -> np.ndarray:
+    returns = np.asarray(returns, dtype=np.float64)
+    if returns.ndim == 1:
+        returns = returns[:, np.newaxis]
+    return returns
+
+
+def realized_volatility(returns, periods_per_year: int = TRADING_DAYS) -> np.ndarray:
+    """
+    Annualized volatility of every column of a (time x ticker) returns array.
+
+    Returns:
+        np.ndarray: One value per column, NaN for columns with fewer than
+            `MIN_OBSERVATIONS` returns.
+    """
+    returns = _as_matrix(returns)
+    counts = np.sum(~np.isnan(returns), axis=0)
+    out = np.full(returns.shape[1], np.nan)
+    enough = counts >= MIN_OBSERVATIONS
+    if enough.any():
+        out[enough] = np.nanstd(returns[:, enough], axis=0, ddof=1) * math.sqrt(
+            periods_per_year
+        )
+    return out
+
+
+def historical_var(returns, confidence: float = 0.95) -> np.ndarray:
+    """
+    One-day historical value at risk of every column of a returns array, as a
+    positive fraction of the position (0 when the worst quantile is a gain).
+
+    Returns:
+        np.ndarray: One value per column, NaN for columns with fewer than
+            `MIN_OBSERVATIONS` returns.
+    """
+    returns = _as_matrix(returns)
+    counts = np.sum(~np.isnan(returns), axis=0)
+    out = np.full(returns.shape[1], np.nan)
+    enough = counts >= MIN_OBSERVATIONS
+    if enough.any():
+        quantile = np.nanquantile(returns[:, enough], 1 - confidence, axis=0)
+        out[enough] = np.maximum(-quantile, 0.0)
+    return out
+
+
+def portfolio_correlation(candidate, holdings, weights: List[float]) -> Optional[float]:
+    """
+    Correlation of a candidate's returns with the weighted returns of the
+    current holdings, over the dates where all of them have a return.
+
+    Args:
+        candidate: (time,) returns of the candidate.
+        holdings: (time x holding) returns of the holdings on the same dates.
+        weights (List[float]): Weight of each holding (e.g. its market value).
+
+    Returns:
+        Optional[float]: The correlation, or None without enough overlapping
+            history or holdings.
+    """
+    series = np.asarray(candidate, dtype=np.float64)
+    matrix = _as_matrix(holdings)
+    shares = np.asarray(weights, dtype=np.float64)
+    if matrix.shape[1] == 0 or shares.sum() <= 0:
+        return None
+    complete = ~np.isnan(series) & ~np.isnan(matrix).any(axis=1)
+    if complete.sum() < MIN_OBSERVATIONS:
+        return None
+    portfolio = matrix[complete] @ (shares / shares.sum())
+    series = series[complete]
+    if np.std(series) == 0 or np.std(portfolio) == 0:
+        return None
+    return float(np.corrcoef(series, portfolio)[0, 1])
+
+
+def covariance(returns: pd.DataFrame) -> np.ndarray:
+    """
+    Covariance matrix of daily returns, from pairwise overlapping dates. Pairs
+    with fewer than `MIN_OBSERVATIONS` common returns are treated as
+    uncorrelated (0); a ticker without enough history has variance 0.
+    """
+    cov = returns.cov(min_periods=MIN_OBSERVATIONS).to_numpy()
+    return np.nan_to_num(cov, nan=0.0)
+
+
+def parametric_var(exposures, cov: np.ndarray, confidence: float = 0.95) -> float:
+    """
+    One-day variance-covariance VaR, in dollars, of holding `exposures`
+    (dollars per ticker, negative for sales) with return covariance `cov`.
+    """
+    exposures = np.asarray(exposures, dtype=np.float64)
+    variance = float(exposures @ cov @ exposures)
+    return NormalDist().inv_cdf(confidence) * math.sqrt(max(variance, 0.0))
@@ -0,0 +1,260 @@
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+
+class _EMA:
+    """
+    EMA seeded with the SMA of the first `length` values, matching
+    `pandas_ta.ema` (presma=True, adjust=False).
+    """
+
+    def __init__(self, length: int):
+        self.length = length
+        self.alpha = 2.0 / (length + 1)
+        self.count = 0
+        self.total = 0.0
+        self.value: Optional[float] = None
+
+    def state(self):
+        return self.count, self.total, self.value
+
+    def restore(self, state) -> None:
+        self.count, self.total, self.value = state
+
+    def update(self, x: float) -> Optional[float]:
+        self.count += 1
+        if self.count < self.length:
+            self.total += x
+        elif self.value is None:
+            # seeded with the simple average of the first `length` values
+            self.value = (self.total + x) / self.length
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class _RMA:
+    """
+    Wilder's moving average, matching `pandas_ta.rma`: an EMA with
+    alpha = 1 / length, started from the first value (adjust=False).
+    """
+
+    def __init__(self, length: int):
+        self.alpha = 1.0 / length
+        self.value: Optional[float] = None
+
+    def update(self, x: float) -> float:
+        if self.value is None:
+            self.value = x
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+
+class StreamingSMA:
+    def __init__(self, period: int = 20):
+        self.period = period
+        self._window: deque = deque(maxlen=period)
+        self._total = 0.0
+
+    @property
+    def value(self) -> Optional[float]:
+        if len(self._window) < self.period:
+            return None
+        return self._total / self.period
+
+    def update(self, close: float, new_bar: bool = True) -> Optional[float]:
+        if not new_bar and self._window:
+            self._total += close - self._window[-1]
+            self._window[-1] = close
+            return self.value
+
+        if len(self._window) == self.period:
+            self._total -= self._window[0]
+        self._window.append(close)
+        self._total += close
+        return self.value
+
+
+class StreamingRSI:
+    """Wilder RSI, matching `pandas_ta.rsi` (without TA-Lib)."""
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.count = 0
+        self._last_close: Optional[float] = None
+        self._gain = _RMA(period)
+        self._loss = _RMA(period)
+        self._prev = None
+
+    def _state(self):
+        return self.count, self._last_close, self._gain.value, self._loss.value
+
+    def _restore(self, state) -> None:
+        self.count, self._last_close, self._gain.value, self._loss.value = state
+
+    @property
+    def value(self) -> Optional[float]:
+        # pandas_ta needs period + 1 closes before it returns anything
+        gain, loss = self._gain.value, self._loss.value
+        if self.count < self.period + 1 or gain is None or loss is None:
+            return None
+        total = gain + loss
+        if total == 0:
+            return math.nan
+        return 100 * gain / total
+
+    def update(self, close: float, new_bar: bool = True) -> Optional[float]:
+        if new_bar or self._prev is None:
+            self._prev = self._state()
+        else:
+            self._restore(self._prev)
+
+        if self._last_close is not None:
+            change = close - self._last_close
+            self._gain.update(max(change, 0.0))
+            self._loss.update(max(-change, 0.0))
+        self._last_close = close
+        self.count += 1
+        return self.value
+
+
+class StreamingMACD:
+    """MACD line, signal and histogram, matching `pandas_ta.macd` (without TA-Lib)."""
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        if slow < fast:
+            fast, slow = slow, fast
+        self.fast = _EMA(fast)
+        self.slow = _EMA(slow)
+        self.signal = _EMA(signal)
+        self.count = 0
+        self.macd: Optional[float] = None
+        self._prev = None
+
+    def _state(self):
+        return (
+            self.count,
+            self.macd,
+            self.fast.state(),
+            self.slow.state(),
+            self.signal.state(),
+        )
+
+    def _restore(self, state) -> None:
+        self.count, self.macd, fast, slow, signal = state
+        self.fast.restore(fast)
+        self.slow.restore(slow)
+        self.signal.restore(signal)
+
+    @property
+    def value(self) -> Optional[tuple]:
+        """(macd, histogram, signal), or None until the signal line is seeded."""
+        # pandas_ta needs slow + signal - 1 closes before it returns anything
+        signal = self.signal.value
+        if signal is None or self.macd is None:
+            return None
+        return self.macd, self.macd - signal, signal
+
+    def update(self, close: float, new_bar: bool = True) -> Optional[tuple]:
+        if new_bar or self._prev is None:
+            self._prev = self._state()
+        else:
+            self._restore(self._prev)
+
+        self.count += 1
+        fast = self.fast.update(close)
+        slow = self.slow.update(close)
+        if fast is not None and slow is not None:
+            self.macd = fast - slow
+            self.signal.update(self.macd)
+        return self.value
+
+
+@dataclass
+class IndicatorValues:
+    sma: Optional[float] = None
+    rsi: Optional[float] = None
+    macd: Optional[float] = None
+    macd_hist: Optional[float] = None
+    macd_signal: Optional[float] = None
+
+
+class IndicatorEngine:
+    """
+    Incremental SMA, RSI and MACD for one ticker.
+
+    Seed it once from history, then call `update` with each new close. Every
+    update is O(1); passing `new_bar=False` revises the latest bar instead of
+    appending one, e.g. for intraday quotes on the current session.
+    """
+
+    def __init__(
+        self,
+        sma_period: int = 50,
+        rsi_period: int = 14,
+        macd_fast: int = 12,
+        macd_slow: int = 26,
+        macd_signal: int = 9,
+    ):
+        self.sma = StreamingSMA(sma_period)
+        self.rsi = StreamingRSI(rsi_period)
+        self.macd = StreamingMACD(macd_fast, macd_slow, macd_signal)
+        self.last_timestamp: Optional[pd.Timestamp] = None
+
+    @classmethod
+    def from_history(cls, data: pd.DataFrame, **params) -> "IndicatorEngine":
+        """
+        Build an engine seeded with the `close` column of `data` (sorted by date).
+
+        Args:
+            data (pd.DataFrame): Historical bars with a `close` column.
+            **params: Indicator periods passed to the constructor.
+
+        Returns:
+            IndicatorEngine: An engine whose values match the last bar of `data`.
+        """
+        engine = cls(**params)
+        if data is None or "close" not in data.columns:
+            logger.warning("No data available or no close column found in data")
+            return engine
+
+        closes = data["close"].sort_index()
+        for close in closes.to_numpy(dtype=float):
+            engine.update(close)
+        if len(closes):
+            engine.last_timestamp = closes.index[-1]
+        return engine
+
+    @property
+    def values(self) -> IndicatorValues:
+        macd = self.macd.value
+        return IndicatorValues(
+            sma=self.sma.value,
+            rsi=self.rsi.value,
+            macd=macd[0] if macd else None,
+            macd_hist=macd[1] if macd else None,
+            macd_signal=macd[2] if macd else None,
+        )
+
+    def update(
+        self,
+        close: float,
+        timestamp: Optional[pd.Timestamp] = None,
+        new_bar: bool = True,
+    ) -> IndicatorValues:
+        close = float(close)
+        self.sma.update(close, new_bar)
+        self.rsi.update(close, new_bar)
+        self.macd.update(close, new_bar)
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        return self.values
@@ -1,11 +1,18 @@
 import logging
-from typing import Optional
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Optional
 import pandas as pd
 import pandas_ta as ta
 
+from tradebot.analyzers.cross_section import warmup_bars
+from tradebot.analyzers.streaming import IndicatorEngine, IndicatorValues
+from tradebot.cache import CacheStats, LRUCache
+
 
 logger = logging.getLogger(__name__)
 
+_MISSING = object()
+
 
 def get_latest_indicator(data: pd.Series):
     if data is None or data.empty:
@@ -55,10 +62,114 @@ def calculate_macd(
         return None
 
     try:
-        data.sort_index(inplace=True)
-        macd = ta.macd(data["close"], fast=fast, slow=slow, signal=signal)
+        close = data["close"].sort_index()
+        macd = ta.macd(close, fast=fast, slow=slow, signal=signal)
         return macd
 
     except Exception as e:
         logger.error(f"Failed to calculate MACD: {e}")
         return None
+
+
+@dataclass(frozen=True)
+class IndicatorSpec:
+    sma_period: int = 50
+    rsi_period: int = 14
+    macd_fast: int = 12
+    macd_slow: int = 26
+    macd_signal: int = 9
+
+    @property
+    def window(self) -> int:
+        """Trailing bars needed to reproduce the full-history latest values."""
+        return warmup_bars(**asdict(self))
+
+
+def latest_indicators(
+    data: pd.DataFrame, spec: IndicatorSpec = IndicatorSpec()
+) -> Optional[IndicatorValues]:
+    """
+    Latest SMA, RSI and MACD of `data` in one pass over its trailing bars.
+
+    Only the last `spec.window` closes are read, so the cost depends on the
+    indicator periods rather than on the length of the history. The input is
+    neither modified nor re-sorted in place.
+
+    Args:
+        data (pd.DataFrame): Historical bars with a `close` column.
+        spec (IndicatorSpec): Indicator periods.
+
+    Returns:
+        Optional[IndicatorValues]: The latest values (None for an indicator
+            without enough history), or None if there is no data.
+    """
+    if data is None or "close" not in data.columns or data.empty:
+        logger.warning("No data available or no close column found in data")
+        return None
+
+    closes = data["close"]
+    if not closes.index.is_monotonic_increasing:
+        closes = closes.sort_index()
+
+    engine = IndicatorEngine(**asdict(spec))
+    for close in closes.iloc[-spec.window :].to_numpy(dtype=float):
+        engine.update(close)
+    return engine.values
+
+
+class IndicatorCache:
+    """
+    Memoizes indicator results per ticker.
+
+    Entries are keyed by (ticker, last bar timestamp, last close, indicator,
+    params), so a rerun on unchanged history is served from the cache while a
+    new or revised bar triggers a recomputation. With `directory` set, results
+    are also kept on disk for later runs.
+    """
+
+    def __init__(self, max_entries: int = 4096, directory: Optional[str] = None):
+        self._cache = LRUCache(max_entries=max_entries, directory=directory)
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def compute(
+        self, ticker: str, data: pd.DataFrame, indicator: Callable, **params
+    ) -> Any:
+        """
+        Return `indicator(data, **params)`, computing it only on a cache miss.
+
+        Args:
+            ticker (str): The ticker `data` belongs to.
+            data (pd.DataFrame): Historical bars with a `close` column.
+            indicator (Callable): One of the functions in this module, e.g.
+                `calculate_rsi` or `latest_indicators`.
+            **params: Keyword arguments passed on to `indicator`.
+
+        Returns:
+            Any: The indicator result.
+        """
+        if data is None or "close" not in data.columns or data.empty:
+            return indicator(data, **params)
+
+        closes = data["close"]
+        if not closes.index.is_monotonic_increasing:
+            closes = closes.sort_index()
+        key = (
+            ticker.upper(),
+            closes.index[-1],
+            float(closes.iloc[-1]),
+            indicator.__name__,
+            tuple(sorted(params.items())),
+        )
+        result = self._cache.get(key, _MISSING)
+        if result is _MISSING:
+            result = indicator(data, **params)
+            self._cache.put(key, result)
+        return result
+
+    def log_stats(self, name: str = "Indicator cache") -> CacheStats:
+        stats = self.stats
+        logger.info(f"{name}: {stats.hits} hits, {stats.misses} misses")
+        return stats
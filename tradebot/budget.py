@@ -0,0 +1,285 @@
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from tradebot.strategy import StockData
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BudgetStats:
+    candidates: int = 0
+    granted: int = 0
+    deferred: int = 0
+    calls: int = 0
+    tokens: int = 0
+
+
+def _value(value) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _whole(calls: float) -> int:
+    """Round a (possibly fractional) number of requests up, ignoring float noise."""
+    return math.ceil(round(calls, 6))
+
+
+class LLMBudget:
+    """
+    Per-run budget of model requests, prompt tokens and wall-clock seconds.
+
+    Candidate tickers are ranked by `priority` and granted in that order while
+    their worst-case cost (by default `calls` requests of about
+    `tokens_per_call` tokens each) fits in what is left of `max_calls` and
+    `max_tokens`. Tickers that do not fit, or that are still waiting when `max_seconds` have passed since
+    `start`, are deferred: they rank higher in the next run, so a large
+    watchlist is covered over several runs instead of making one run slower
+    and more expensive. With `path` set the deferrals survive restarts.
+
+    A limit of None is not enforced.
+    """
+
+    def __init__(
+        self,
+        max_calls: Optional[int] = None,
+        max_tokens: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+        tokens_per_call: int = 1000,
+        held_weight: float = 3.0,
+        deferral_weight: float = 1.0,
+        path: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_calls = max_calls
+        self.max_tokens = max_tokens
+        self.max_seconds = max_seconds
+        self.tokens_per_call = tokens_per_call
+        self.held_weight = held_weight
+        self.deferral_weight = deferral_weight
+        self.path = path
+        self.stats = BudgetStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._started = clock()
+        # exact (possibly fractional) requests reserved this run, and the
+        # (requests, tokens) reserved per granted ticker and for the whole run
+        self._calls = 0.0
+        self._reserved: Dict[str, Tuple[float, int]] = {}
+        self._run_reserved: Tuple[float, int] = (0.0, 0)
+        # ticker -> number of consecutive runs it has been deferred
+        self._deferred: Dict[str, int] = self._load()
+
+    def start(self) -> None:
+        """Begin a run: reset the spend and the wall-clock deadline."""
+        with self._lock:
+            self._started = self._clock()
+            self.stats = BudgetStats()
+            self._calls = 0.0
+            self._reserved = {}
+            self._run_reserved = (0.0, 0)
+
+    def expired(self) -> bool:
+        """Whether the run has used up its `max_seconds`."""
+        if self.max_seconds is None:
+            return False
+        return self._clock() - self._started >= self.max_seconds
+
+    def priority(self, stock_data: StockData, held: bool = False) -> float:
+        """
+        Cheap estimate of how much a model decision on the ticker is worth.
+
+        Held positions come first (`held_weight`), then signal strength: RSI
+        distance from neutral, price distance from its SMA and the MACD
+        histogram relative to price (each worth up to 1). Every run the ticker
+        has been deferred adds `deferral_weight`, so nothing waits forever.
+        """
+        score = self.held_weight if held else 0.0
+        price, sma = _value(stock_data.price), _value(stock_data.sma)
+        rsi, macd_hist = _value(stock_data.rsi), _value(stock_data.macd_hist)
+        if rsi is not None:
+            score += min(abs(rsi - 50) / 50, 1.0)
+        if price and sma:
+            score += min(abs(price / sma - 1) / 0.1, 1.0)
+        if price and macd_hist is not None:
+            score += min(abs(macd_hist) / price * 100, 1.0)
+        with self._lock:
+            cycles = self._deferred.get(stock_data.ticker.upper(), 0)
+        return score + self.deferral_weight * cycles
+
+    def allocate(
+        self,
+        stocks: List[StockData],
+        held: Set[str],
+        calls: int = 2,
+        costs: Optional[Dict[str, Tuple[float, int]]] = None,
+        run_calls: int = 0,
+    ) -> Tuple[List[StockData], List[StockData]]:
+        """
+        Split candidates into those decided on this run and those deferred.
+
+        Args:
+            stocks (List[StockData]): The tickers that need the models.
+            held (Set[str]): Upper-case tickers held in the portfolio.
+            calls (int): Worst-case model requests per ticker.
+            costs (Optional[Dict[str, Tuple[float, int]]]): Worst-case (model
+                requests, prompt tokens) per ticker, in place of `calls`.
+                Requests may be fractional for tickers sharing batched requests;
+                the run is charged their sum rounded up.
+            run_calls (int): Requests made once for the whole run if any ticker
+                is granted (e.g. a joint risk assessment).
+
+        Returns:
+            Tuple[List[StockData], List[StockData]]: The granted tickers, highest
+                priority first, and the deferred ones.
+        """
+        ranked = sorted(
+            stocks,
+            key=lambda stock_data: (
+                -self.priority(stock_data, stock_data.ticker.upper() in held),
+                stock_data.ticker,
+            ),
+        )
+        granted: List[StockData] = []
+        deferred: List[StockData] = []
+        expired = self.expired()
+        # shared requests are charged with the first granted ticker
+        spent_calls, spent_tokens = 0.0, 0
+        run_cost = (float(run_calls), run_calls * self.tokens_per_call)
+        with self._lock:
+            self.stats.candidates += len(stocks)
+            for stock_data in ranked:
+                cost = (costs or {}).get(
+                    stock_data.ticker, (calls, calls * self.tokens_per_call)
+                )
+                ticker_calls, tokens = cost
+                if not granted:
+                    ticker_calls += run_cost[0]
+                    tokens += run_cost[1]
+                fits = (
+                    not expired
+                    and (
+                        self.max_calls is None
+                        or _whole(self._calls + spent_calls + ticker_calls)
+                        <= self.max_calls
+                    )
+                    and (
+                        self.max_tokens is None
+                        or self.stats.tokens + spent_tokens + tokens <= self.max_tokens
+                    )
+                )
+                if fits:
+                    spent_calls += ticker_calls
+                    spent_tokens += tokens
+                    granted.append(stock_data)
+                    self._reserved[stock_data.ticker.upper()] = cost
+                else:
+                    deferred.append(stock_data)
+            if granted:
+                self._run_reserved = (
+                    self._run_reserved[0] + run_cost[0],
+                    self._run_reserved[1] + run_cost[1],
+                )
+            self._calls += spent_calls
+            self.stats.calls = _whole(self._calls)
+            self.stats.tokens += spent_tokens
+        self._record(granted, deferred)
+        if deferred:
+            logger.info(
+                f"LLM budget: deferring {len(deferred)} tickers to the next run: "
+                f"{', '.join(stock_data.ticker for stock_data in deferred)}"
+            )
+        return granted, deferred
+
+    def defer(self, stocks: List[StockData]) -> None:
+        """
+        Defer granted tickers that could not be processed in time, releasing
+        what was reserved for them (and for the whole run once no granted
+        ticker is left).
+        """
+        if not stocks:
+            return
+        with self._lock:
+            self.stats.granted -= len(stocks)
+            released = [
+                self._reserved.pop(stock_data.ticker.upper(), (0.0, 0))
+                for stock_data in stocks
+            ]
+            if not self._reserved:
+                released.append(self._run_reserved)
+                self._run_reserved = (0.0, 0)
+            self._calls = max(self._calls - sum(c for c, _ in released), 0.0)
+            self.stats.calls = _whole(self._calls)
+            self.stats.tokens -= sum(tokens for _, tokens in released)
+        self._record([], stocks)
+        logger.info(
+            f"LLM budget: out of time, deferring "
+            f"{', '.join(stock_data.ticker for stock_data in stocks)}"
+        )
+
+    def _record(self, granted: List[StockData], deferred: List[StockData]) -> None:
+        with self._lock:
+            self.stats.granted += len(granted)
+            self.stats.deferred += len(deferred)
+            for stock_data in granted:
+                self._deferred.pop(stock_data.ticker.upper(), None)
+            for stock_data in deferred:
+                ticker = stock_data.ticker.upper()
+                self._deferred[ticker] = self._deferred.get(ticker, 0) + 1
+            snapshot = dict(self._deferred)
+        self._save(snapshot)
+
+    def _load(self) -> Dict[str, int]:
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return {str(k): int(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable deferred tickers {self.path}: {e}")
+            return {}
+
+    def _save(self, deferred: Dict[str, int]) -> None:
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(deferred, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save deferred tickers to {self.path}: {e}")
+
+    def log_stats(self, name: str = "LLM budget") -> Dict[str, int]:
+        with self._lock:
+            stats = asdict(self.stats)
+        limits = ", ".join(
+            f"{label} {limit}"
+            for label, limit in (
+                ("calls", self.max_calls),
+                ("tokens", self.max_tokens),
+                ("seconds", self.max_seconds),
+            )
+            if limit is not None
+        )
+        logger.info(
+            f"{name}: {stats['granted']}/{stats['candidates']} tickers granted, "
+            f"{stats['deferred']} deferred; reserved {stats['calls']} calls and "
+            f"~{stats['tokens']} tokens (limits: {limits or 'none'})"
+        )
+        return stats
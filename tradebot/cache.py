@@ -0,0 +1,181 @@
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+_NOT_LOADED = object()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+
+@dataclass
+class _Entry:
+    stored_at: float
+    expires_at: Optional[float]
+    value: Any = _NOT_LOADED
+
+
+class LRUCache:
+    """
+    Thread-safe LRU cache with optional expiry and optional persistence.
+
+    When `directory` is set, every entry is also written to its own pickle file
+    there, so the cache survives process restarts. Entry headers are read on
+    start-up; values are only unpickled the first time they are requested.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: Optional[float] = None,
+        directory: Optional[str] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.stats = CacheStats()
+        self._clock = clock
+        self._lock = threading.RLock()
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        if directory is not None:
+            self._load_index(directory)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry is not None and not self._expired(entry)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.misses += 1
+                return default
+            if self._expired(entry):
+                self._remove(key)
+                self.stats.misses += 1
+                return default
+            if entry.value is _NOT_LOADED:
+                entry.value = self._read_value(key)
+                if entry.value is _NOT_LOADED:
+                    self._remove(key)
+                    self.stats.misses += 1
+                    return default
+            self._entries.move_to_end(key)
+            self.stats.hits += 1
+            return entry.value
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store `value` under `key`. `ttl` overrides the cache-wide expiry for
+        this entry only.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        now = self._clock()
+        entry = _Entry(
+            stored_at=now,
+            expires_at=None if ttl is None else now + ttl,
+            value=value,
+        )
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._write(key, entry)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.stats.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove(key)
+
+    def _expired(self, entry: _Entry) -> bool:
+        return entry.expires_at is not None and self._clock() >= entry.expires_at
+
+    def _remove(self, key: Hashable) -> None:
+        del self._entries[key]
+        if self.directory is not None:
+            try:
+                os.unlink(self._path(self.directory, key))
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def _path(directory: str, key: Hashable) -> str:
+        digest = hashlib.sha1(repr(key).encode()).hexdigest()
+        return os.path.join(directory, f"{digest}.pkl")
+
+    def _write(self, key: Hashable, entry: _Entry) -> None:
+        if self.directory is None:
+            return
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".pkl.tmp")
+            with os.fdopen(fd, "wb") as f:
+                # header first so the index can be rebuilt without the value
+                pickle.dump((key, entry.stored_at, entry.expires_at), f)
+                pickle.dump(entry.value, f)
+            os.replace(tmp_path, self._path(self.directory, key))
+        except Exception as e:
+            logger.warning(f"Failed to persist cache entry {key}: {e}")
+
+    def _read_value(self, key: Hashable) -> Any:
+        if self.directory is None:
+            return _NOT_LOADED
+        try:
+            with open(self._path(self.directory, key), "rb") as f:
+                pickle.load(f)
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load cache entry {key}: {e}")
+            return _NOT_LOADED
+
+    def _load_index(self, directory: str) -> None:
+        if not os.path.isdir(directory):
+            return
+        headers = []
+        for name in os.listdir(directory):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, "rb") as f:
+                    key, stored_at, expires_at = pickle.load(f)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable cache file {path}: {e}")
+                continue
+            headers.append((stored_at, key, expires_at))
+
+        # oldest first, so the most recently stored entries are evicted last
+        for stored_at, key, expires_at in sorted(headers, key=lambda h: h[0]):
+            self._entries[key] = _Entry(stored_at=stored_at, expires_at=expires_at)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
@@ -0,0 +1,254 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+from google.genai.types import CreateCachedContentConfig
+
+from tradebot.prompts import estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ContextStats:
+    created: int = 0
+    reused: int = 0
+    fallbacks: int = 0
+    tokens_saved: int = 0
+
+
+@dataclass
+class _Context:
+    name: str
+    fingerprint: str
+    expires_at: float
+    state: Dict[str, Any]
+    articles: List[str] = field(default_factory=list)
+    tweets: List[str] = field(default_factory=list)
+
+
+@dataclass
+class ContextPrompt:
+    """What to send: `contents`, against `cached_content` when it is set."""
+
+    contents: str
+    cached_content: Optional[str] = None
+    tokens_saved: int = 0
+
+
+class ContextCache:
+    """
+    Per-ticker Gemini context caches with delta prompts.
+
+    The first prompt for a key (e.g. "strategy:AAPL") is stored server-side as
+    cached content together with the system instruction. Later prompts for the
+    same key send only the values, headlines and tweets that changed since
+    then. A new context is created when the static inputs (template,
+    fundamentals, model) change, when it expires, or when the delta grows past
+    `max_delta_share` of the full prompt.
+
+    Prompts below `min_tokens` cannot be cached by the API and are sent in full,
+    as is everything when creating a context fails; caching is then not retried
+    for `retry_after` seconds. Full prompts keep their static text first, so the
+    API's implicit prefix caching still applies to them.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60 * 60,
+        min_tokens: int = 1024,
+        max_delta_share: float = 0.5,
+        retry_after: float = 15 * 60,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.max_delta_share = max_delta_share
+        self.retry_after = retry_after
+        self.stats = ContextStats()
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._contexts: Dict[str, _Context] = {}
+        self._disabled_until = 0.0
+
+    def prompt(
+        self,
+        client: Any,
+        model: str,
+        system_instruction: List[str],
+        key: str,
+        static: Dict[str, Any],
+        state: Dict[str, Any],
+        articles: List[dict],
+        tweets: List[str],
+        full_prompt: str,
+    ) -> ContextPrompt:
+        """
+        Decide whether to send `full_prompt` or a delta against a cached context.
+
+        Args:
+            client (Any): The `genai.Client` used to create cached content.
+            model (str): The model the prompt is for.
+            system_instruction (List[str]): Stored with the cached content.
+            key (str): Identifies the context, e.g. "strategy:AAPL".
+            static (Dict[str, Any]): Inputs that invalidate the context when
+                they change (template, fundamentals, ...).
+            state (Dict[str, Any]): Values that are sent again when they change.
+            articles (List[dict]): Compacted news articles in `full_prompt`.
+            tweets (List[str]): Compacted tweets in `full_prompt`.
+            full_prompt (str): The complete prompt.
+
+        Returns:
+            ContextPrompt: The contents to send and the cached content to use.
+        """
+        fingerprint = hashlib.sha256(
+            json.dumps(
+                {"model": model, "system": system_instruction, "static": static},
+                sort_keys=True,
+                default=str,
+            ).encode()
+        ).hexdigest()
+        titles = [article.get("title", "") for article in articles]
+        full_tokens = estimate_tokens(full_prompt)
+        now = self._clock()
+
+        with self._lock:
+            context = self._contexts.get(key)
+        if (
+            context is not None
+            and context.fingerprint == fingerprint
+            and now < context.expires_at
+        ):
+            delta = self._delta(context, state, articles, titles, tweets)
+            delta_tokens = estimate_tokens(delta)
+            if delta_tokens <= full_tokens * self.max_delta_share:
+                return ContextPrompt(delta, context.name, full_tokens - delta_tokens)
+
+        if full_tokens < self.min_tokens or now < self._disabled_until:
+            return ContextPrompt(full_prompt)
+
+        try:
+            cached = client.caches.create(
+                model=model,
+                config=CreateCachedContentConfig(
+                    system_instruction=system_instruction,
+                    contents=[full_prompt],
+                    ttl=f"{int(self.ttl)}s",
+                ),
+            )
+        except Exception as e:
+            logger.warning(
+                f"Context caching unavailable ({e}), sending full prompts for "
+                f"the next {self.retry_after:.0f}s"
+            )
+            with self._lock:
+                self._disabled_until = now + self.retry_after
+            return ContextPrompt(full_prompt)
+
+        with self._lock:
+            self._contexts[key] = _Context(
+                name=cached.name,
+                fingerprint=fingerprint,
+                # leave a margin so the context is not used just as it expires
+                expires_at=now + self.ttl * 0.9,
+                state=dict(state),
+                articles=titles,
+                tweets=list(tweets),
+            )
+            self.stats.created += 1
+        return ContextPrompt(
+            "Decide based on the data above, in the requested format.", cached.name
+        )
+
+    def generate(
+        self,
+        send: Callable[[str, Optional[str]], Any],
+        key: str,
+        full_prompt: str,
+        **context: Any,
+    ) -> Any:
+        """
+        Send the prompt chosen by `prompt` through `send(contents, cached_content)`.
+
+        If a request against a cached context fails (e.g. the context expired
+        on the server), the context is dropped and the full prompt is sent.
+
+        Args:
+            send (Callable[[str, Optional[str]], Any]): Makes the model request.
+            key (str): Identifies the context, e.g. "strategy:AAPL".
+            full_prompt (str): The complete prompt.
+            **context: The remaining arguments of `prompt`.
+
+        Returns:
+            Any: What `send` returned.
+        """
+        prompt = self.prompt(key=key, full_prompt=full_prompt, **context)
+        if prompt.cached_content is not None:
+            try:
+                result = send(prompt.contents, prompt.cached_content)
+            except Exception as e:
+                logger.warning(
+                    f"Request against cached context for {key} failed ({e}), "
+                    "sending the full prompt"
+                )
+                self.invalidate(key)
+            else:
+                if prompt.tokens_saved:
+                    with self._lock:
+                        self.stats.reused += 1
+                        self.stats.tokens_saved += prompt.tokens_saved
+                return result
+
+        with self._lock:
+            self.stats.fallbacks += 1
+        return send(full_prompt, None)
+
+    def invalidate(self, key: str) -> None:
+        """Forget the context for `key`, e.g. after the API rejected it."""
+        with self._lock:
+            self._contexts.pop(key, None)
+
+    @staticmethod
+    def _delta(
+        context: _Context,
+        state: Dict[str, Any],
+        articles: List[dict],
+        titles: List[str],
+        tweets: List[str],
+    ) -> str:
+        changed = {
+            name: value
+            for name, value in state.items()
+            if context.state.get(name) != value
+        }
+        new_articles = [
+            article
+            for article, title in zip(articles, titles)
+            if title not in context.articles
+        ]
+        new_tweets = [tweet for tweet in tweets if tweet not in context.tweets]
+        return (
+            "Updates since the data above:\n"
+            f"Changed values: {changed or 'none'}\n"
+            f"New news articles: {new_articles or 'none'}\n"
+            f"New tweets: {new_tweets or 'none'}\n"
+            "Decide based on the data above and these updates, in the requested format."
+        )
+
+    def reset_stats(self) -> ContextStats:
+        with self._lock:
+            stats, self.stats = self.stats, ContextStats()
+        return stats
+
+    def log_stats(self, name: str = "Context cache") -> Dict[str, int]:
+        stats = asdict(self.reset_stats())
+        logger.info(
+            f"{name}: {stats['created']} contexts created, {stats['reused']} reused, "
+            f"{stats['fallbacks']} full prompts; ~{stats['tokens_saved']} input tokens saved"
+        )
+        return stats
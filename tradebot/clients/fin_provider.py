@@ -1,21 +1,145 @@
 import logging
+import time
 import pandas as pd
-from typing import Optional, Literal
+import requests
+from typing import Dict, List, Optional, Literal, Tuple
 from alpha_vantage.fundamentaldata import FundamentalData
 from alpha_vantage.timeseries import TimeSeries
 
+from tradebot.cache import LRUCache
+from tradebot.clients.ohlcv_store import OHLCVStore
+from tradebot.clients.rate_limiter import Priority, RequestScheduler
+
 
 logger = logging.getLogger(__name__)
 
+HistorySpan = Literal["month", "year", "5year", "full"]
+
+AV_BASE_URL = "https://www.alphavantage.co/query"
+# maximum number of symbols accepted by one REALTIME_BULK_QUOTES request
+BULK_QUOTE_LIMIT = 100
+
+
+def _span_start(last_date: pd.Timestamp, span: HistorySpan) -> Optional[pd.Timestamp]:
+    if span == "month":
+        return last_date - pd.DateOffset(months=1)
+    elif span == "year":
+        return last_date - pd.DateOffset(years=1)
+    elif span == "5year":
+        return last_date - pd.DateOffset(years=5)
+    return None
+
+
+class FundamentalsCache:
+    """
+    Cache for company overview, balance sheet and earnings frames.
+
+    Entries expire after `ttl` seconds. Earnings are rechecked every
+    `recheck_ttl` seconds once the quarter after the latest reported one has
+    ended, and when the earnings index shows a new fiscal quarter the cached
+    overview and balance sheet for that ticker are dropped.
+    """
+
+    KINDS = ("overview", "balance_sheet", "earnings")
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: float = 7 * 24 * 60 * 60,
+        recheck_ttl: float = 24 * 60 * 60,
+        max_entries: int = 1024,
+        clock=time.time,
+    ):
+        self.ttl = ttl
+        self.recheck_ttl = recheck_ttl
+        self._clock = clock
+        self._cache = LRUCache(
+            max_entries=max_entries, ttl=ttl, directory=directory, clock=clock
+        )
+
+    @property
+    def stats(self):
+        return self._cache.stats
+
+    def get(self, ticker: str, kind: str) -> Optional[pd.DataFrame]:
+        return self._cache.get((kind, ticker.upper()))
+
+    def put(self, ticker: str, kind: str, frame: pd.DataFrame) -> None:
+        if kind not in self.KINDS:
+            raise ValueError(f"Unknown fundamentals kind: {kind}")
+        ticker = ticker.upper()
+        if kind != "earnings":
+            self._cache.put((kind, ticker), frame)
+            return
+
+        latest_quarter = pd.Timestamp(frame.index.max())
+        known_quarter = self._cache.get(("latest_quarter", ticker))
+        if known_quarter is not None and latest_quarter > known_quarter:
+            logger.info(
+                f"New fiscal quarter {latest_quarter.date()} reported for {ticker}, "
+                "invalidating cached fundamentals"
+            )
+            self._cache.invalidate(("overview", ticker))
+            self._cache.invalidate(("balance_sheet", ticker))
+
+        self._cache.put(("latest_quarter", ticker), latest_quarter, ttl=float("inf"))
+        self._cache.put(
+            ("earnings", ticker), frame, ttl=self._earnings_ttl(latest_quarter)
+        )
+
+    def _earnings_ttl(self, latest_quarter: pd.Timestamp) -> float:
+        next_quarter_end = latest_quarter + pd.DateOffset(months=3)
+        until_quarter_end = next_quarter_end.timestamp() - self._clock()
+        if until_quarter_end <= 0:
+            # the next report is due, look for it more often
+            return self.recheck_ttl
+        return min(self.ttl, max(until_quarter_end, self.recheck_ttl))
+
 
 class FinDataProvider:
-    def __init__(self, api_key):
+    def __init__(
+        self,
+        api_key,
+        ohlcv_store: Optional[OHLCVStore] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        fundamentals_cache: Optional[FundamentalsCache] = None,
+        base_url: str = AV_BASE_URL,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
         self.av_fund = FundamentalData(key=api_key, output_format="pandas")
         self.av_ts = TimeSeries(key=api_key, output_format="pandas")
+        self.ohlcv_store = ohlcv_store
+        self.scheduler = scheduler
+        self.fundamentals_cache = fundamentals_cache
+        # why bulk quotes are unavailable to this API key, once the API said so
+        self._bulk_unavailable: Optional[str] = None
 
-    def get_latest_price(self, ticker: str) -> Optional[float]:
+    def _call(self, endpoint: str, ticker: str, fn, priority: Priority):
+        """Route an Alpha Vantage request through the shared scheduler, if any."""
+        if self.scheduler is None:
+            return fn()
+        return self.scheduler.call((endpoint, ticker.upper()), fn, priority)
+
+    def _cached_fundamentals(self, ticker: str, kind: str) -> Optional[pd.DataFrame]:
+        if self.fundamentals_cache is None:
+            return None
+        return self.fundamentals_cache.get(ticker, kind)
+
+    def _cache_fundamentals(self, ticker: str, kind: str, frame: pd.DataFrame) -> None:
+        if self.fundamentals_cache is not None:
+            self.fundamentals_cache.put(ticker, kind, frame)
+
+    def get_latest_price(
+        self, ticker: str, priority: Priority = Priority.QUOTE
+    ) -> Optional[float]:
         try:
-            quote = self.av_ts.get_quote_endpoint(ticker.upper())[0]
+            quote = self._call(
+                "quote",
+                ticker,
+                lambda: self.av_ts.get_quote_endpoint(ticker.upper()),
+                priority,
+            )[0]
 
             if quote is None or quote.empty:
                 logger.warning(f"No price data found for ticker: {ticker.upper()}")
@@ -29,54 +153,220 @@ class FinDataProvider:
             logger.error(f"Failed to get latest price for {ticker}: {e}")
             return None
 
+    def _fetch_bulk_quotes(self, symbols: List[str]) -> dict:
+        response = requests.get(
+            self.base_url,
+            params={
+                "function": "REALTIME_BULK_QUOTES",
+                "symbol": ",".join(symbols),
+                "apikey": self.api_key,
+            },
+            timeout=30,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def get_latest_prices(
+        self, tickers: List[str], priority: Priority = Priority.QUOTE
+    ) -> Tuple[Dict[str, float], Dict[str, str]]:
+        """
+        Get the latest price for many tickers using the bulk quote endpoint,
+        `BULK_QUOTE_LIMIT` symbols per request.
+
+        The endpoint is premium-only: once it is refused as such, no further
+        bulk requests are made (each would spend a call of the daily quota)
+        and every ticker is reported as unpriced.
+
+        Args:
+            tickers (List[str]): The ticker symbols to quote.
+            priority (Priority): Scheduling priority of the requests.
+
+        Returns:
+            Tuple[Dict[str, float], Dict[str, str]]: Prices keyed by ticker, and an
+                error message for every ticker that could not be priced.
+        """
+        symbols = list(dict.fromkeys(ticker.upper() for ticker in tickers))
+        prices: Dict[str, float] = {}
+        errors: Dict[str, str] = {}
+
+        for start in range(0, len(symbols), BULK_QUOTE_LIMIT):
+            chunk = symbols[start : start + BULK_QUOTE_LIMIT]
+            if self._bulk_unavailable is not None:
+                errors.update({symbol: self._bulk_unavailable for symbol in chunk})
+                continue
+            try:
+                payload = self._call(
+                    "bulk_quote",
+                    ",".join(chunk),
+                    lambda: self._fetch_bulk_quotes(chunk),
+                    priority,
+                )
+                # Alpha Vantage reports errors and rate limiting in the body
+                message = (
+                    payload.get("Error Message")
+                    or payload.get("Information")
+                    or payload.get("Note")
+                )
+                if message:
+                    raise ValueError(message)
+                quotes = payload.get("data") or []
+            except Exception as e:
+                logger.error(f"Failed to get bulk quotes for {len(chunk)} tickers: {e}")
+                errors.update({symbol: str(e) for symbol in chunk})
+                if "premium" in str(e).lower():
+                    self._bulk_unavailable = str(e)
+                continue
+
+            for quote in quotes:
+                symbol = str(quote.get("symbol", "")).upper()
+                if symbol not in chunk:
+                    continue
+                try:
+                    prices[symbol] = float(quote["close"])
+                except (KeyError, TypeError, ValueError):
+                    errors[symbol] = f"Unparseable quote: {quote}"
+
+            for symbol in chunk:
+                if symbol not in prices and symbol not in errors:
+                    errors[symbol] = "No quote returned"
+
+        logger.info(f"Got bulk prices for {len(prices)}/{len(symbols)} tickers")
+        return prices, errors
+
+    def _fetch_daily(
+        self,
+        ticker: str,
+        outputsize: Literal["compact", "full"],
+        priority: Priority = Priority.HISTORY,
+    ) -> Optional[pd.DataFrame]:
+        raw_historical = self._call(
+            f"daily_{outputsize}",
+            ticker,
+            lambda: self.av_ts.get_daily(ticker, outputsize),
+            priority,
+        )[0]
+
+        if raw_historical is None or raw_historical.empty:
+            return None
+
+        # the raw frame may be shared with coalesced callers, so don't mutate it
+        raw_historical = raw_historical.sort_index()
+
+        # rename columns: "1. open" ... "5. volume" -> "open" ... "volume"
+        raw_historical.columns = [col.split()[-1] for col in raw_historical.columns]
+        return raw_historical
+
+    def _refresh_ohlcv_store(
+        self, store: OHLCVStore, ticker: str, priority: Priority
+    ) -> None:
+        """
+        Bring the cached bars for a ticker up to date. Only the compact (latest
+        ~100 bars) output is requested once the ticker has been loaded; the full
+        history is downloaded on the first load or if the cache fell too far behind.
+        """
+        last_date = store.last_date(ticker)
+
+        if last_date is not None:
+            try:
+                recent = self._fetch_daily(ticker, "compact", priority)
+            except Exception as e:
+                # e.g. an Alpha Vantage rate limit; the cached bars still serve
+                logger.warning(f"Top-up of {ticker.upper()} history failed: {e}")
+                recent = None
+            if recent is None:
+                logger.warning(
+                    f"Could not top up cached history for {ticker.upper()}, "
+                    f"serving bars up to {last_date.date()}"
+                )
+                return
+            if recent.index.min() <= last_date:
+                store.append(ticker, recent)
+                return
+            logger.info(f"Cached history for {ticker.upper()} is stale, reloading")
+            try:
+                full = self._fetch_daily(ticker, "full", priority)
+            except Exception as e:
+                logger.warning(
+                    f"Could not reload history for {ticker.upper()} ({e}), "
+                    f"serving bars up to {last_date.date()}"
+                )
+                return
+        else:
+            full = self._fetch_daily(ticker, "full", priority)
+        if full is not None:
+            store.write(ticker, full)
+
     def get_historical_data(
-        self, ticker: str, span: Literal["month", "year", "5year", "full"] = "full"
+        self,
+        ticker: str,
+        span: HistorySpan = "full",
+        priority: Priority = Priority.HISTORY,
     ) -> Optional[pd.DataFrame]:
         try:
-            raw_historical = self.av_ts.get_daily(ticker, "full")[0]
+            store = self.ohlcv_store
+            if store is not None:
+                self._refresh_ohlcv_store(store, ticker, priority)
+                last_date = store.last_date(ticker)
+                if last_date is None:
+                    logger.warning(f"No historical data found for {ticker.upper()}")
+                    return None
+                return store.read(ticker, _span_start(last_date, span))
+
+            raw_historical = self._fetch_daily(ticker, "full", priority)
 
-            if raw_historical is None or raw_historical.empty:
+            if raw_historical is None:
                 logger.warning(f"No historical data found for {ticker.upper()}")
                 return None
 
-            raw_historical.sort_index(inplace=True)
-
-            # rename columns: "1. open" ... "5. volume" -> "open" ... "volume"
-            raw_historical.columns = [col.split()[-1] for col in raw_historical.columns]
-
-            if span == "full":
+            start_date = _span_start(raw_historical.index.max(), span)
+            if start_date is None:
                 return raw_historical
-
-            start_date = raw_historical.index.max()
-            if span == "month":
-                end_date = start_date - pd.DateOffset(months=1)
-            elif span == "year":
-                end_date = start_date - pd.DateOffset(years=1)
-            elif span == "5year":
-                end_date = start_date - pd.DateOffset(years=5)
-            return raw_historical[raw_historical.index >= end_date]
+            return raw_historical[raw_historical.index >= start_date]
 
         except Exception as e:
             logger.error(f"Failed to get historical data for {ticker}: {e}")
             return None
 
-    def get_company_overview(self, ticker: str) -> Optional[pd.DataFrame]:
+    def get_company_overview(
+        self, ticker: str, priority: Priority = Priority.FUNDAMENTALS
+    ) -> Optional[pd.DataFrame]:
+        cached = self._cached_fundamentals(ticker, "overview")
+        if cached is not None:
+            return cached
+
         try:
-            response = self.av_fund.get_company_overview(ticker)[0]
+            response = self._call(
+                "overview",
+                ticker,
+                lambda: self.av_fund.get_company_overview(ticker),
+                priority,
+            )[0]
 
             if response is None or response.empty:
                 logger.warning(f"No overview data found for ticker: {ticker.upper()}")
                 return None
 
+            self._cache_fundamentals(ticker, "overview", response)
             return response
 
         except Exception as e:
             logger.error(f"Error fetching company overview for {ticker}: {e}")
             return None
 
-    def get_balance_sheet(self, ticker: str) -> Optional[pd.DataFrame]:
+    def get_balance_sheet(
+        self, ticker: str, priority: Priority = Priority.FUNDAMENTALS
+    ) -> Optional[pd.DataFrame]:
+        cached = self._cached_fundamentals(ticker, "balance_sheet")
+        if cached is not None:
+            return cached
+
         try:
-            balance_sheet = self.av_fund.get_balance_sheet_quarterly(ticker)[0]
+            balance_sheet = self._call(
+                "balance_sheet",
+                ticker,
+                lambda: self.av_fund.get_balance_sheet_quarterly(ticker),
+                priority,
+            )[0]
 
             if balance_sheet is None or balance_sheet.empty:
                 logger.warning(
@@ -86,15 +376,27 @@ class FinDataProvider:
 
             balance_sheet = balance_sheet.set_index("fiscalDateEnding")
             balance_sheet.index = pd.to_datetime(balance_sheet.index)
+            self._cache_fundamentals(ticker, "balance_sheet", balance_sheet)
             return balance_sheet
 
         except Exception as e:
             logger.error(f"Error fetching balance sheet for {ticker}: {e}")
             return None
 
-    def get_earnings_history(self, ticker: str) -> Optional[pd.DataFrame]:
+    def get_earnings_history(
+        self, ticker: str, priority: Priority = Priority.FUNDAMENTALS
+    ) -> Optional[pd.DataFrame]:
+        cached = self._cached_fundamentals(ticker, "earnings")
+        if cached is not None:
+            return cached
+
         try:
-            earnings = self.av_fund.get_earnings_quarterly(ticker)[0]
+            earnings = self._call(
+                "earnings",
+                ticker,
+                lambda: self.av_fund.get_earnings_quarterly(ticker),
+                priority,
+            )[0]
 
             if earnings is None or earnings.empty:
                 logger.warning(
@@ -104,6 +406,7 @@ class FinDataProvider:
 
             earnings = earnings.set_index("fiscalDateEnding")
             earnings.index = pd.to_datetime(earnings.index)
+            self._cache_fundamentals(ticker, "earnings", earnings)
             return earnings
 
         except Exception as e:
@@ -0,0 +1,267 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Generic, Optional, TypeVar
+
+from google.genai.errors import APIError
+
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes worth retrying
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class LLMTimeout(TimeoutError):
+    """Raised when a model call does not complete before its deadline."""
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, APIError):
+        return error.code in TRANSIENT_STATUS_CODES
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+@dataclass
+class LLMStats:
+    calls: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    retries: int = 0
+    hedged: int = 0
+    hedge_wins: int = 0
+
+
+StatsT = TypeVar("StatsT")
+
+
+class MetricsWindow(Generic[StatsT]):
+    """Outcome counters (a stats dataclass) plus a sliding window of latencies."""
+
+    def __init__(self, stats: StatsT, window: int = 500):
+        self.stats = stats
+        self._latencies: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self.stats, outcome, getattr(self.stats, outcome) + 1)
+
+    def observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+
+    def samples(self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile `q` (0-1) of the window, or None if it is empty."""
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(vars(self.stats))
+        for q in (0.5, 0.95, 0.99):
+            stats[f"p{int(q * 100)}"] = self.percentile(q)
+        return stats
+
+
+class LLMMetrics(MetricsWindow[LLMStats]):
+    """Call outcomes plus a sliding window of successful call latencies."""
+
+    def __init__(self, window: int = 500):
+        super().__init__(LLMStats(), window)
+
+    def log_stats(self, name: str = "LLM") -> Dict[str, Any]:
+        stats = self.snapshot()
+
+        def fmt(latency: Optional[float]) -> str:
+            return "n/a" if latency is None else f"{latency:.2f}s"
+
+        logger.info(
+            f"{name}: {stats['calls']} calls, {stats['succeeded']} succeeded, "
+            f"{stats['failed']} failed ({stats['timed_out']} timed out), "
+            f"{stats['retries']} retries, {stats['hedged']} hedged "
+            f"({stats['hedge_wins']} won), latency p50 {fmt(stats['p50'])}, "
+            f"p95 {fmt(stats['p95'])}, p99 {fmt(stats['p99'])}"
+        )
+        return stats
+
+
+class LLMInvoker:
+    """
+    Runs blocking model calls (e.g. `client.models.generate_content`) with:
+
+    - a bounded pool of `max_concurrency` worker threads shared by all callers,
+    - a `timeout` deadline per call, covering retries and time spent queued,
+    - up to `retries` retries of transient errors, with jittered exponential
+      backoff starting at `backoff` seconds,
+    - optional hedging: once `hedge_min_samples` latencies have been observed,
+      a call still running after the `hedge_percentile` latency is duplicated
+      and whichever reply arrives first is used. Calls are only hedged while a
+      worker is idle, so hedges never queue behind a saturated pool.
+
+    `acall` is the coroutine; `call` runs it to completion from synchronous code.
+    A call that misses its deadline is abandoned but keeps its worker until it
+    returns, so `fn` should enforce a timeout of its own (see `GeminiBackend`).
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 4,
+        timeout: float = 60.0,
+        retries: int = 2,
+        backoff: float = 1.0,
+        hedge_percentile: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        metrics: Optional[LLMMetrics] = None,
+    ):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.metrics = metrics or LLMMetrics()
+        self.max_concurrency = max_concurrency
+        # calls submitted to the pool that have not returned yet
+        self._outstanding = 0
+        self._outstanding_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="llm"
+        )
+
+    def call(self, fn: Callable[..., Any], **kwargs) -> Any:
+        """Synchronous wrapper around `acall`."""
+        return asyncio.run(self.acall(fn, **kwargs))
+
+    async def acall(self, fn: Callable[..., Any], **kwargs) -> Any:
+        """
+        Call `fn(**kwargs)` on the worker pool.
+
+        Args:
+            fn (Callable[..., Any]): The blocking model call.
+            **kwargs: Arguments passed on to `fn`.
+
+        Returns:
+            Any: What `fn` returned.
+
+        Raises:
+            LLMTimeout: If no reply arrived before the deadline.
+        """
+        self.metrics.count("calls")
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            try:
+                result = await self._attempt(fn, kwargs, deadline)
+            except LLMTimeout:
+                self.metrics.count("timed_out")
+                self.metrics.count("failed")
+                raise
+            except Exception as e:
+                delay = self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+                if (
+                    not is_transient(e)
+                    or attempt >= self.retries
+                    or time.monotonic() + delay >= deadline
+                ):
+                    self.metrics.count("failed")
+                    raise
+                attempt += 1
+                self.metrics.count("retries")
+                logger.warning(
+                    f"Transient LLM error ({e}), retry {attempt}/{self.retries} "
+                    f"in {delay:.1f}s"
+                )
+                await asyncio.sleep(delay)
+                continue
+            self.metrics.count("succeeded")
+            return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if self.hedge_percentile is None:
+            return None
+        if self.metrics.samples() < self.hedge_min_samples:
+            return None
+        return self.metrics.percentile(self.hedge_percentile)
+
+    def _idle_worker(self) -> bool:
+        with self._outstanding_lock:
+            return self._outstanding < self.max_concurrency
+
+    async def _attempt(
+        self, fn: Callable[..., Any], kwargs: Dict[str, Any], deadline: float
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+
+        def timed():
+            try:
+                start = time.monotonic()
+                result = fn(**kwargs)
+                self.metrics.observe(time.monotonic() - start)
+                return result
+            finally:
+                with self._outstanding_lock:
+                    self._outstanding -= 1
+
+        def submit() -> asyncio.Future:
+            with self._outstanding_lock:
+                self._outstanding += 1
+            future = self._executor.submit(timed)
+
+            def cancelled(future: Future) -> None:
+                # a call cancelled before it started never runs `timed`
+                if future.cancelled():
+                    with self._outstanding_lock:
+                        self._outstanding -= 1
+
+            future.add_done_callback(cancelled)
+            return asyncio.wrap_future(future, loop=loop)
+
+        primary = submit()
+        pending = {primary}
+        hedge_delay = self._hedge_delay()
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=max(0.0, min(hedge_delay, deadline - time.monotonic())),
+                )
+                if not done and time.monotonic() < deadline and self._idle_worker():
+                    self.metrics.count("hedged")
+                    pending.add(submit())
+
+            error: Optional[BaseException] = None
+            while pending:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                done, pending = await asyncio.wait(
+                    pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.exception() is None:
+                        if future is not primary:
+                            self.metrics.count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+            if error is not None and not pending:
+                raise error
+            raise LLMTimeout(f"LLM call did not complete within {self.timeout}s")
+        finally:
+            # losing or abandoned requests finish in the background
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,281 @@
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+import typing
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields, is_dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from google import genai
+from google.genai.types import GenerateContentConfig, HttpOptions
+
+from tradebot.clients.llm import MetricsWindow
+from tradebot.prompts import estimate_tokens
+
+
+logger = logging.getLogger(__name__)
+
+_TICKER = re.compile(r"Ticker'?:\s*'?([A-Za-z.\-]+)")
+
+
+@dataclass
+class BackendStats:
+    requests: int = 0
+    errors: int = 0
+    parse_failures: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+@dataclass
+class ModelResponse:
+    """A backend reply; `parsed` is None when the reply did not parse."""
+
+    text: str
+    parsed: Any
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class BackendMetrics(MetricsWindow[BackendStats]):
+    """Request outcomes, token counts and request latencies of a backend."""
+
+    def __init__(self, window: int = 500):
+        super().__init__(BackendStats(), window)
+
+    def add_tokens(self, input_tokens: int, output_tokens: int) -> None:
+        with self._lock:
+            self.stats.input_tokens += input_tokens
+            self.stats.output_tokens += output_tokens
+
+    def log_stats(self, name: str = "Model backend") -> Dict[str, Any]:
+        stats = self.snapshot()
+
+        def fmt(latency: Optional[float]) -> str:
+            return "n/a" if latency is None else f"{latency:.2f}s"
+
+        logger.info(
+            f"{name}: {stats['requests']} requests, {stats['errors']} errors, "
+            f"{stats['parse_failures']} parse failures, {stats['input_tokens']} "
+            f"input / {stats['output_tokens']} output tokens, latency p50 "
+            f"{fmt(stats['p50'])}, p95 {fmt(stats['p95'])}, p99 {fmt(stats['p99'])}"
+        )
+        return stats
+
+
+class ModelBackend(ABC):
+    """
+    A model that answers `generate_content` style requests.
+
+    `generate` records every request's latency, token counts, errors and
+    replies that did not parse in `metrics`; callers that reject a parsed
+    reply report it through `parse_failure`. `client` exposes the request
+    surface of `genai.Client` (`models.generate_content`, `caches.create`).
+    """
+
+    def __init__(self, metrics: Optional[BackendMetrics] = None):
+        self.metrics = metrics or BackendMetrics()
+
+    @property
+    @abstractmethod
+    def client(self) -> Any: ...
+
+    @abstractmethod
+    def _generate(self, model: str, contents: Any, config: Any) -> ModelResponse: ...
+
+    def generate(self, model: str, contents: Any, config: Any = None) -> ModelResponse:
+        self.metrics.count("requests")
+        start = time.monotonic()
+        try:
+            response = self._generate(model, contents, config)
+        except Exception:
+            self.metrics.count("errors")
+            raise
+        self.metrics.observe(time.monotonic() - start)
+        self.metrics.add_tokens(response.input_tokens, response.output_tokens)
+        if response.parsed is None:
+            self.metrics.count("parse_failures")
+        return response
+
+    def parse_failure(self) -> None:
+        self.metrics.count("parse_failures")
+
+
+def _token_count(value: Any) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def _with_timeout(config: Any, timeout: float) -> Any:
+    """`config` with an HTTP timeout of `timeout` seconds, unless it sets one."""
+    options = getattr(config, "http_options", None) or HttpOptions()
+    if options.timeout is not None:
+        return config
+    options = options.model_copy(update={"timeout": math.ceil(timeout * 1000)})
+    if config is None:
+        return GenerateContentConfig(http_options=options)
+    return config.model_copy(update={"http_options": options})
+
+
+class GeminiBackend(ModelBackend):
+    """
+    Gemini through the `google-genai` SDK.
+
+    With a `timeout` (seconds) every request is abandoned at the HTTP level
+    once it runs that long, so a stalled request frees its worker thread
+    instead of holding it after the caller has given up.
+    """
+
+    def __init__(
+        self,
+        client: Optional[Any] = None,
+        metrics: Optional[BackendMetrics] = None,
+        timeout: Optional[float] = None,
+    ):
+        super().__init__(metrics)
+        self.timeout = timeout
+        if client is None:
+            # the client-wide timeout also covers requests such as caches.create
+            client = genai.Client(
+                http_options=(
+                    HttpOptions(timeout=math.ceil(timeout * 1000))
+                    if timeout is not None
+                    else None
+                )
+            )
+        self._client = client
+
+    @property
+    def client(self) -> Any:
+        return self._client
+
+    def _generate(self, model: str, contents: Any, config: Any) -> ModelResponse:
+        if self.timeout is not None:
+            config = _with_timeout(config, self.timeout)
+        response = self._client.models.generate_content(
+            model=model, contents=contents, config=config
+        )
+        usage = getattr(response, "usage_metadata", None)
+        text = getattr(response, "text", None)
+        return ModelResponse(
+            text=text if isinstance(text, str) else "",
+            parsed=response.parsed,
+            input_tokens=_token_count(getattr(usage, "prompt_token_count", None)),
+            output_tokens=_token_count(getattr(usage, "candidates_token_count", None)),
+        )
+
+
+def _schema_fields(schema: Any) -> List[str]:
+    if is_dataclass(schema):
+        return [field.name for field in fields(schema)]
+    return list(getattr(schema, "__annotations__", {}))
+
+
+class StubBackend(ModelBackend):
+    """
+    Deterministic offline stand-in for the model, for tests and benchmarks.
+
+    Replies are built from the request's `response_schema`: one object (or,
+    for a list schema, one per "Ticker: X" in the prompt) with the fields in
+    `answers` filled in. The signal is derived from a hash of the ticker and
+    `seed`, so the same prompt always gets the same answer. `responder`, when
+    given, replaces all of that and returns the parsed reply for
+    `(model, contents, config)` (None simulates a reply that does not parse).
+
+    Every request sleeps for `latency` seconds, plus up to `jitter` more
+    (also derived from the prompt), and a deterministic `failure_rate` share
+    of requests raise `ConnectionError`, so throughput can be measured without a network.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        answers: Optional[Dict[str, Any]] = None,
+        responder: Optional[Callable[[str, Any, Any], Any]] = None,
+        metrics: Optional[BackendMetrics] = None,
+    ):
+        super().__init__(metrics)
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.seed = seed
+        self.answers = {
+            "reasoning": "Stub reply",
+            "confidence": "Medium",
+            "decision": "APPROVED",
+            "position_size": 100.0,
+            **(answers or {}),
+        }
+        self.responder = responder
+        self.caches_created = 0
+        self._requests = 0
+        self._lock = threading.Lock()
+        self._client = SimpleNamespace(
+            models=SimpleNamespace(generate_content=self._generate_content),
+            caches=SimpleNamespace(create=self._create_cache),
+        )
+
+    @property
+    def client(self) -> Any:
+        return self._client
+
+    def _fraction(self, *parts: Any) -> float:
+        digest = hashlib.sha256(repr((self.seed,) + parts).encode()).digest()
+        return int.from_bytes(digest[:8], "big") / 2**64
+
+    def _answer(self, schema: Any, ticker: Optional[str]) -> Dict[str, Any]:
+        answer = {}
+        for name in _schema_fields(schema) or ["signal", "reasoning"]:
+            if name == "ticker":
+                answer[name] = ticker
+            elif name == "signal":
+                answer[name] = ("BUY", "SELL", "HOLD")[
+                    int(self._fraction("signal", ticker) * 3)
+                ]
+            elif name in self.answers:
+                answer[name] = self.answers[name]
+        return answer
+
+    def _generate(self, model: str, contents: Any, config: Any) -> ModelResponse:
+        text_in = str(contents)
+        delay = self.latency + self.jitter * self._fraction("latency", text_in)
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            self._requests += 1
+            request = self._requests
+        if self.failure_rate and self._fraction("fail", request) < self.failure_rate:
+            raise ConnectionError("Stub backend: simulated failure")
+
+        if self.responder is not None:
+            parsed = self.responder(model, contents, config)
+        else:
+            schema = getattr(config, "response_schema", None)
+            tickers = list(dict.fromkeys(_TICKER.findall(text_in))) or [None]
+            if typing.get_origin(schema) is list:
+                (item,) = typing.get_args(schema)
+                parsed = [self._answer(item, ticker) for ticker in tickers]
+            else:
+                parsed = self._answer(schema, tickers[0])
+        text = json.dumps(parsed, default=str)
+        return ModelResponse(
+            text=text,
+            parsed=parsed,
+            input_tokens=estimate_tokens(text_in),
+            output_tokens=estimate_tokens(text),
+        )
+
+    def _generate_content(self, model: str, contents: Any, config: Any = None) -> Any:
+        return self.generate(model=model, contents=contents, config=config)
+
+    def _create_cache(self, model: str, config: Any = None) -> Any:
+        with self._lock:
+            self.caches_created += 1
+            return SimpleNamespace(name=f"cachedContents/stub-{self.caches_created}")
@@ -0,0 +1,131 @@
+import logging
+import os
+import tempfile
+import threading
+from collections import defaultdict
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+logger = logging.getLogger(__name__)
+
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+
+BAR_DTYPE = np.dtype(
+    [
+        ("date", "datetime64[D]"),
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("volume", "i8"),
+    ]
+)
+
+
+class OHLCVStore:
+    """
+    On-disk store of daily OHLCV bars, one `.npy` file per ticker.
+
+    Bars are kept sorted by date. Reads memory-map the file and only the rows
+    at or after the requested start date are copied into the returned frame.
+    Writes go to a temporary file that atomically replaces the old one, so
+    concurrent readers always see a complete file.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._locks: defaultdict = defaultdict(threading.Lock)
+
+    def _path(self, ticker: str) -> str:
+        return os.path.join(self.directory, f"{ticker.upper()}.npy")
+
+    def _load(self, ticker: str) -> Optional[np.ndarray]:
+        try:
+            bars = np.load(self._path(ticker), mmap_mode="r")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable OHLCV cache for {ticker}: {e}")
+            return None
+        if bars.dtype != BAR_DTYPE or len(bars) == 0:
+            return None
+        return bars
+
+    def last_date(self, ticker: str) -> Optional[pd.Timestamp]:
+        bars = self._load(ticker)
+        if bars is None:
+            return None
+        return pd.Timestamp(bars["date"][-1])
+
+    def read(
+        self, ticker: str, start: Optional[pd.Timestamp] = None
+    ) -> Optional[pd.DataFrame]:
+        """
+        Read the cached bars for a ticker.
+
+        Args:
+            ticker (str): The ticker symbol.
+            start (Optional[pd.Timestamp]): Earliest date to return. All bars are
+                returned when omitted.
+
+        Returns:
+            Optional[pd.DataFrame]: Bars indexed by date with open/high/low/close/volume
+                columns, or None if the ticker is not cached.
+        """
+        bars = self._load(ticker)
+        if bars is None:
+            return None
+
+        first = 0
+        if start is not None:
+            first = int(np.searchsorted(bars["date"], np.datetime64(start.date(), "D")))
+        window = bars[first:]
+
+        frame = pd.DataFrame(
+            {col: np.array(window[col]) for col in OHLCV_COLUMNS},
+            index=pd.DatetimeIndex(
+                window["date"].astype("datetime64[ns]"), name="date"
+            ),
+        )
+        return frame
+
+    def write(self, ticker: str, frame: pd.DataFrame) -> None:
+        """Replace the cached bars for a ticker with `frame`."""
+        with self._locks[ticker.upper()]:
+            self._save(ticker, self._to_bars(frame))
+
+    def append(self, ticker: str, frame: pd.DataFrame) -> None:
+        """
+        Merge newer bars into the cache. Bars in `frame` replace cached bars for
+        the same dates, so a partial bar for the current session is refreshed.
+        """
+        with self._locks[ticker.upper()]:
+            new_bars = self._to_bars(frame)
+            cached = self._load(ticker)
+            if cached is not None and len(new_bars):
+                keep = cached[cached["date"] < new_bars["date"][0]]
+                new_bars = np.concatenate([keep, new_bars])
+            self._save(ticker, new_bars)
+
+    def _save(self, ticker: str, bars: np.ndarray) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy.tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.save(f, bars)
+            os.replace(tmp_path, self._path(ticker))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @staticmethod
+    def _to_bars(frame: pd.DataFrame) -> np.ndarray:
+        frame = frame.sort_index()
+        bars = np.empty(len(frame), dtype=BAR_DTYPE)
+        bars["date"] = pd.DatetimeIndex(frame.index).values.astype("datetime64[D]")
+        for col in OHLCV_COLUMNS:
+            bars[col] = frame[col].to_numpy()
+        return bars
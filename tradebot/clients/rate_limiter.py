@@ -0,0 +1,288 @@
+import heapq
+import itertools
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta, timezone
+from enum import IntEnum
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+
+    HELD_QUOTE = 0
+    QUOTE = 1
+    HISTORY = 2
+    FUNDAMENTALS = 3
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a call cannot be made without breaking the provider's quota."""
+
+
+class TokenBucket:
+    """
+    Token bucket holding up to `capacity` tokens, refilled continuously so that
+    `capacity` tokens become available every `period` seconds.
+    """
+
+    def __init__(
+        self,
+        capacity: int,
+        period: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if capacity < 1 or period <= 0:
+            raise ValueError("Token bucket needs a positive capacity and period")
+        self.capacity = capacity
+        self.period = period
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        rate = self.capacity / self.period
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * rate)
+        self._updated = now
+
+    def wait_time(self) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self._refill()
+        if self._tokens >= 1:
+            return 0.0
+        return (1 - self._tokens) * self.period / self.capacity
+
+    def consume(self) -> None:
+        self._refill()
+        self._tokens -= 1
+
+
+def _utc_now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class DailyQuota:
+    """
+    At most `limit` calls per UTC calendar day.
+
+    With `path` the day's usage is saved after every call (atomically, like
+    the other caches), so a bot that runs as a fresh process on a schedule
+    still stops at the daily limit; without it the count only covers the
+    current process.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        path: Optional[str] = None,
+        now: Callable[[], datetime] = _utc_now,
+    ):
+        if limit < 1:
+            raise ValueError("Daily quota needs a positive limit")
+        self.limit = limit
+        self.path = path
+        self._now = now
+        self._day, self._used = self._load()
+
+    def _roll(self) -> None:
+        today = self._now().date().isoformat()
+        if today != self._day:
+            self._day, self._used = today, 0
+
+    def wait_time(self) -> float:
+        """Seconds until a call is allowed (0 if one is allowed now)."""
+        self._roll()
+        if self._used < self.limit:
+            return 0.0
+        now = self._now()
+        midnight = datetime.combine(
+            now.date() + timedelta(days=1), datetime.min.time(), now.tzinfo
+        )
+        return max((midnight - now).total_seconds(), 1.0)
+
+    def consume(self) -> None:
+        self._roll()
+        self._used += 1
+        self._save()
+
+    def _load(self) -> Tuple[str, int]:
+        today = self._now().date().isoformat()
+        if self.path is None or not os.path.exists(self.path):
+            return today, 0
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+            return str(saved["date"]), int(saved["used"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable quota usage {self.path}: {e}")
+            return today, 0
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"date": self._day, "used": self._used}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save quota usage to {self.path}: {e}")
+
+
+@dataclass
+class SchedulerStats:
+    issued: int = 0
+    coalesced: int = 0
+    deferred: int = 0
+    rejected: int = 0
+
+
+class RequestScheduler:
+    """
+    Shared gate in front of a rate-limited API.
+
+    - `rate` is a short-window bucket (e.g. calls per minute): callers wait for it.
+    - `quota` is a long-window bucket or a `DailyQuota`: once it is empty,
+      calls fail fast with RateLimitExceeded instead of waiting for hours.
+    - At most `max_concurrency` calls run at once.
+    - Waiting calls are served in priority order, then first come first served.
+    - Identical calls (same key) that overlap are merged into one request.
+    """
+
+    def __init__(self, rate: TokenBucket, quota: Any, max_concurrency: int = 1):
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.rate = rate
+        self.quota = quota
+        self.max_concurrency = max_concurrency
+        self.stats = SchedulerStats()
+        self._cond = threading.Condition()
+        self._waiting: List[Tuple[int, int]] = []
+        self._seq = itertools.count()
+        self._running = 0
+        self._in_flight: Dict[Hashable, Future] = {}
+
+    @classmethod
+    def for_alpha_vantage(
+        cls,
+        calls_per_minute: int,
+        calls_per_day: int,
+        max_concurrency: int = 1,
+        quota_path: Optional[str] = None,
+    ) -> "RequestScheduler":
+        """
+        Scheduler for Alpha Vantage's per-minute and per-day limits. The daily
+        usage is kept in `quota_path` so it carries over between runs; without
+        it only the calls of this process count.
+        """
+        return cls(
+            rate=TokenBucket(calls_per_minute, 60),
+            quota=DailyQuota(calls_per_day, quota_path),
+            max_concurrency=max_concurrency,
+        )
+
+    def call(
+        self,
+        key: Hashable,
+        fn: Callable[[], Any],
+        priority: Priority = Priority.FUNDAMENTALS,
+    ) -> Any:
+        """
+        Run `fn` once a slot and a token are available, or share the result of
+        an identical call already in flight.
+
+        Args:
+            key (Hashable): Identifies the request, e.g. (endpoint, ticker).
+            fn (Callable[[], Any]): Performs the request.
+            priority (Priority): Scheduling priority of the request.
+
+        Returns:
+            Any: The result of `fn`.
+        """
+        with self._cond:
+            shared = self._in_flight.get(key)
+            if shared is None:
+                future: Future = Future()
+                self._in_flight[key] = future
+            else:
+                self.stats.coalesced += 1
+
+        if shared is not None:
+            return shared.result()
+
+        try:
+            self._acquire(key, priority)
+            try:
+                result = fn()
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    self._cond.notify_all()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._cond:
+                del self._in_flight[key]
+
+    def _acquire(self, key: Hashable, priority: Priority) -> None:
+        ticket = (int(priority), next(self._seq))
+        deferred = False
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    timeout = None
+                    if (
+                        self._waiting[0] == ticket
+                        and self._running < self.max_concurrency
+                    ):
+                        if self.quota.wait_time() > 0:
+                            self.stats.rejected += 1
+                            logger.warning(f"Request quota exhausted, rejecting {key}")
+                            raise RateLimitExceeded(
+                                f"Request quota exhausted for {key}"
+                            )
+                        timeout = self.rate.wait_time()
+                        if timeout == 0:
+                            self.rate.consume()
+                            self.quota.consume()
+                            self._running += 1
+                            self.stats.issued += 1
+                            return
+                    if not deferred:
+                        deferred = True
+                        self.stats.deferred += 1
+                    self._cond.wait(timeout)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+
+    def reset_stats(self) -> SchedulerStats:
+        """Return the counters collected so far and start a new set."""
+        with self._cond:
+            stats, self.stats = self.stats, SchedulerStats()
+        return stats
+
+    def log_stats(self, name: str = "Request scheduler") -> Dict[str, int]:
+        stats = asdict(self.reset_stats())
+        logger.info(
+            f"{name}: {stats['issued']} calls issued, {stats['coalesced']} coalesced, "
+            f"{stats['deferred']} deferred, {stats['rejected']} rejected"
+        )
+        return stats
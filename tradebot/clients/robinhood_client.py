@@ -1,32 +1,281 @@
+import json
 import logging
-from ast import literal_eval
+import math
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import robin_stocks.robinhood as rh
+from robin_stocks.robinhood.helper import request_post, set_login_state, update_session
+from robin_stocks.robinhood.urls import login_url
+
+from tradebot.clients.session_store import SessionStore
 
 
 logger = logging.getLogger(__name__)
 
+# OAuth client id of the Robinhood web app (the one robin_stocks logs in with)
+CLIENT_ID = "c82SH0WZOsabOXGP2sxqcj34FxkvfnWRZBKlBjFS"
+# Lifetime requested for new access tokens
+SESSION_SECONDS = 24 * 60 * 60
+# Saved sessions are refreshed when they have less than this left
+REFRESH_MARGIN = 60 * 60  # seconds
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+@dataclass(frozen=True)
+class Holding:
+    ticker: str
+    quantity: float
+    average_buy_price: Optional[float] = None
+    price: Optional[float] = None
+
+    @property
+    def equity(self) -> Optional[float]:
+        return None if self.price is None else self.quantity * self.price
+
+
+@dataclass
+class PortfolioSnapshot:
+    """Balances and holdings of the account at `taken_at` (epoch seconds)."""
+
+    cash: Optional[float]
+    buying_power: Optional[float]
+    total_equity: Optional[float]
+    holdings: Dict[str, Holding] = field(default_factory=dict)
+    # crypto currency code -> quantity
+    crypto: Dict[str, float] = field(default_factory=dict)
+    taken_at: float = 0.0
+
+    def to_dict(self) -> Dict:
+        """The `{"equity", "cash", "crypto"}` layout of `get_portfolio_state`."""
+        equity = {}
+        for ticker, holding in self.holdings.items():
+            value = holding.equity
+            equity[ticker] = {
+                "price": holding.price,
+                "quantity": holding.quantity,
+                "average_buy_price": holding.average_buy_price,
+                "equity": value,
+                "percentage": (
+                    round(value / self.total_equity * 100, 2)
+                    if value is not None and self.total_equity
+                    else None
+                ),
+            }
+        return {
+            "equity": equity,
+            "cash": {
+                "cash": self.cash,
+                "equity": self.total_equity,
+                "buying_power": self.buying_power,
+            },
+            "crypto": [
+                {"currency": code, "quantity": quantity}
+                for code, quantity in self.crypto.items()
+            ],
+        }
+
+
+class InstrumentCache:
+    """
+    Instrument URL -> ticker. Instruments do not change, so entries are kept
+    for good (in a JSON file when `path` is given) and each instrument is
+    looked up at most once.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        self._symbols: Dict[str, str] = self._load()
+
+    def symbol(self, url: str) -> Optional[str]:
+        with self._lock:
+            if url in self._symbols:
+                return self._symbols[url]
+        symbol = rh.get_instrument_by_url(url, info="symbol")
+        if not symbol:
+            return None
+        with self._lock:
+            self._symbols[url] = symbol
+            snapshot = dict(self._symbols)
+        self._save(snapshot)
+        return symbol
+
+    def _load(self) -> Dict[str, str]:
+        if self.path is None or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return {str(k): str(v) for k, v in json.load(f).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning(f"Ignoring unreadable instrument cache {self.path}: {e}")
+            return {}
+
+    def _save(self, symbols: Dict[str, str]) -> None:
+        if self.path is None:
+            return
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump(symbols, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save instrument cache to {self.path}: {e}")
+
 
 class RobinhoodClient:
-    def __init__(self, email: str, password: str):
+    def __init__(
+        self,
+        email: str,
+        password: str,
+        session_store: Optional[SessionStore] = None,
+        session_seconds: int = SESSION_SECONDS,
+        clock: Callable[[], float] = time.time,
+        instruments: Optional[InstrumentCache] = None,
+    ):
         self.email = email
         self.password = password
         self.authenticated = False
+        # with a store, the session survives restarts and is refreshed with
+        # its refresh token instead of a new (app-approved) login
+        self.session_store = session_store
+        self.session_seconds = session_seconds
+        self._clock = clock
+        self._session: Optional[Dict] = None
+        self.instruments = instruments or InstrumentCache()
+        self._snapshot: Optional[PortfolioSnapshot] = None
+        # instrument URL -> (updated_at, holding) from the last refresh
+        self._positions: Dict[str, Tuple[Any, Holding]] = {}
+        self._snapshot_lock = threading.Lock()
 
     def login(self):
+        if self.session_store is not None and self._resume():
+            return
         logger.info("Attempting to log into Robinhood...")
         logger.warning(
             "MANUAL ACTION REQUIRED: Please approve the login request on your Robinhood app."
         )
         try:
-            rh.login(username=self.email, password=self.password)
+            if self.session_store is None:
+                rh.login(username=self.email, password=self.password)
+            else:
+                # the session is kept encrypted by the store, not in
+                # robin_stocks' plain pickle file
+                data = rh.login(
+                    username=self.email,
+                    password=self.password,
+                    expiresIn=self.session_seconds,
+                    store_session=False,
+                )
+                if not data or "access_token" not in data:
+                    raise Exception("Robinhood did not return an access token.")
+                self._save_session(data)
             self.authenticated = True
             logger.info("Successfully logged in to Robinhood after verification.")
         except Exception as e:
             logger.error(f"Failed to log in to Robinhood: {e}")
             raise
 
-    def logout(self):
+    def _expiring(self, session: Dict) -> bool:
+        try:
+            expires_at = float(session["expires_at"])
+        except (KeyError, TypeError, ValueError):
+            return True
+        return expires_at - self._clock() < REFRESH_MARGIN
+
+    def _resume(self) -> bool:
+        """Reuse the saved session, refreshing it if it is about to expire."""
+        if self.session_store is None:
+            return False
+        session = self.session_store.load()
+        if not session or "access_token" not in session:
+            return False
+        if self._expiring(session):
+            session = self._refresh(session)
+            if session is None:
+                return False
+        self._apply(session)
+        self.authenticated = True
+        logger.info("Resumed saved Robinhood session.")
+        return True
+
+    def _refresh(self, session: Dict) -> Optional[Dict]:
+        if not session.get("refresh_token"):
+            return None
+        payload = {
+            "client_id": CLIENT_ID,
+            "expires_in": self.session_seconds,
+            "grant_type": "refresh_token",
+            "refresh_token": session["refresh_token"],
+            "scope": "internal",
+        }
+        if session.get("device_token"):
+            payload["device_token"] = session["device_token"]
+        try:
+            data = request_post(login_url(), payload)
+        except Exception as e:
+            data = None
+            logger.warning(f"Could not refresh the Robinhood session: {e}")
+        if not data or "access_token" not in data:
+            logger.warning("Saved Robinhood session expired, logging in again.")
+            if self.session_store is not None:
+                self.session_store.clear()
+            return None
+        logger.info("Refreshed the Robinhood session.")
+        return self._save_session(data, device_token=session.get("device_token"))
+
+    def _save_session(self, data: Dict, device_token: Optional[str] = None) -> Dict:
+        expires_in = data.get("expires_in") or self.session_seconds
+        session = {
+            "token_type": data.get("token_type", "Bearer"),
+            "access_token": data["access_token"],
+            "refresh_token": data.get("refresh_token"),
+            "device_token": data.get("device_token") or device_token,
+            "expires_at": self._clock() + float(expires_in),
+        }
+        if self.session_store is not None:
+            self.session_store.save(session)
+        self._apply(session)
+        return session
+
+    def _apply(self, session: Dict) -> None:
+        update_session(
+            "Authorization", f"{session['token_type']} {session['access_token']}"
+        )
+        set_login_state(True)
+        self._session = session
+
+    def ensure_session(self):
+        """
+        Refresh a saved session that is about to expire, so long-running
+        processes keep a valid token. No-op without a session store.
+        """
+        if self._session is None or not self._expiring(self._session):
+            return
+        session = self._refresh(self._session)
+        if session is None:
+            self.authenticated = False
+            self._session = None
+            self.login()
+
+    def logout(self, forget: bool = False):
+        """
+        End the session in this process. The saved session (if any) is kept
+        for the next run unless `forget` is set.
+        """
         if not self.authenticated:
             logger.error("User is not logged in.")
             raise Exception("User is not logged in.")
@@ -34,33 +283,151 @@ class RobinhoodClient:
         try:
             rh.logout()
             self.authenticated = False
+            self._session = None
+            if forget and self.session_store is not None:
+                self.session_store.clear()
             logger.info("Successfully logged out of Robinhood.")
         except Exception as e:
             logger.error(f"Failed to log out of Robinhood: {e}")
             raise
 
-    def get_portfolio_state(self):
+    def get_portfolio_snapshot(
+        self, max_age: float = 0.0, full: bool = False
+    ) -> PortfolioSnapshot:
+        """
+        The account's balances and holdings.
+
+        A refresh makes four requests: account and portfolio balances, the
+        open positions (in bulk) and one quote request for every held ticker.
+        Instrument tickers come from the permanent instrument cache, positions
+        whose `updated_at` has not changed are reused as they are, and crypto
+        positions (which the bot does not trade) are only fetched on the first
+        or a `full` refresh.
+
+        Args:
+            max_age (float): Return the last snapshot if it is at most this many
+                seconds old.
+            full (bool): Refresh everything, including crypto positions.
+
+        Returns:
+            PortfolioSnapshot: The current portfolio.
+        """
+        self._require_login()
+        with self._snapshot_lock:
+            previous = self._snapshot
+            if (
+                previous is not None
+                and not full
+                and self._clock() - previous.taken_at <= max_age
+            ):
+                return previous
+
+            account = rh.load_account_profile() or {}
+            profile = rh.load_portfolio_profile() or {}
+            positions: Dict[str, Tuple[str, Holding]] = {}
+            for position in rh.get_open_stock_positions() or []:
+                url = position.get("instrument")
+                known = self._positions.get(url)
+                if known is not None and known[0] == position.get("updated_at"):
+                    positions[url] = known
+                    continue
+                ticker = position.get("symbol") or self.instruments.symbol(url)
+                quantity = _float(position.get("quantity"))
+                if not ticker or not quantity:
+                    logger.warning(f"Skipping unreadable position {url}")
+                    continue
+                holding = Holding(
+                    ticker=ticker.upper(),
+                    quantity=quantity,
+                    average_buy_price=_float(position.get("average_buy_price")),
+                )
+                positions[url] = (position.get("updated_at"), holding)
+            self._positions = positions
+
+            holdings = {holding.ticker: holding for _, holding in positions.values()}
+            prices = {
+                quote["symbol"].upper(): _float(quote.get("last_trade_price"))
+                for quote in (rh.get_quotes(list(holdings)) if holdings else [])
+                if quote and quote.get("symbol")
+            }
+            holdings = {
+                ticker: replace(holding, price=prices.get(ticker))
+                for ticker, holding in holdings.items()
+            }
+
+            if previous is None or full:
+                crypto = {
+                    position["currency"]["code"]: quantity
+                    for position in rh.get_crypto_positions() or []
+                    if (quantity := _float(position.get("quantity")))
+                }
+            else:
+                crypto = previous.crypto
+
+            self._snapshot = PortfolioSnapshot(
+                cash=_float(account.get("portfolio_cash", account.get("cash"))),
+                buying_power=_float(account.get("buying_power")),
+                total_equity=_float(profile.get("equity")),
+                holdings=holdings,
+                crypto=crypto,
+                taken_at=self._clock(),
+            )
+            return self._snapshot
+
+    def _require_login(self) -> None:
         if not self.authenticated:
             logger.error("User is not logged in.")
             raise Exception("User is not logged in.")
+        self.ensure_session()
 
-        try:
-            portfolio = {
-                "equity": rh.build_holdings(),
-                "cash": rh.build_user_profile(),
-                "crypto": [],
-            }
+    def submit_order(self, ticker: str, side: str, amount: float) -> Dict:
+        """
+        Place a fractional market order for `amount` dollars of `ticker`.
 
-            crypto_positions = rh.get_crypto_positions()
-            print(f"crypto positions: {crypto_positions}")
-            for position in crypto_positions:
-                print(position)
-                if literal_eval(position["quantity"]) > 0:
-                    portfolio["crypto"].append(position)
+        Args:
+            ticker (str): The ticker symbol.
+            side (str): "buy" or "sell".
+            amount (float): Order size in dollars.
 
-            logger.info(f"User Portfolio: {portfolio}")
-            return portfolio
+        Returns:
+            Dict: Robinhood's order record (`id`, `state`, ...).
+        """
+        self._require_login()
+        if side == "buy":
+            return rh.order_buy_fractional_by_price(ticker, amount)
+        if side == "sell":
+            return rh.order_sell_fractional_by_price(ticker, amount)
+        raise ValueError(f"Unknown order side: {side}")
 
+    def get_order(self, order_id: str) -> Dict:
+        self._require_login()
+        return rh.get_stock_order_info(order_id)
+
+    def get_open_orders(self) -> List[Dict]:
+        self._require_login()
+        return rh.get_all_open_stock_orders()
+
+    def get_recent_orders(self, since: str) -> List[Dict]:
+        """Stock orders (open or not) created or updated since `since`, a
+        YYYY-MM-DD date."""
+        self._require_login()
+        return rh.get_all_stock_orders(start_date=since)
+
+    def order_symbol(self, record: Dict) -> Optional[str]:
+        """The ticker of an order record."""
+        return record.get("symbol") or self.instruments.symbol(record["instrument"])
+
+    def get_portfolio_state(self) -> Dict:
+        """The current portfolio, in the dict layout used by the prompts and
+        risk checks (see `PortfolioSnapshot.to_dict`)."""
+        try:
+            snapshot = self.get_portfolio_snapshot()
         except Exception as e:
             logger.error(f"Failed to get user portfolio: {e}")
             raise
+        logger.info(
+            f"Portfolio: {len(snapshot.holdings)} holdings, cash "
+            f"{snapshot.cash}, total equity {snapshot.total_equity}"
+        )
+        logger.debug(f"Holdings: {snapshot.holdings}")
+        return snapshot.to_dict()
@@ -0,0 +1,65 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """
+    A login session (OAuth tokens) kept on disk encrypted with a Fernet key.
+
+    The file is written to a temporary file that atomically replaces the old
+    one and is only readable by the owner. A file that cannot be decrypted
+    with `key` (e.g. after the key was rotated) is treated as missing.
+    """
+
+    def __init__(self, path: str, key: str):
+        self.path = path
+        self._fernet = Fernet(key)
+
+    @staticmethod
+    def generate_key() -> str:
+        """A new random key, to be kept in the environment (not next to the file)."""
+        return Fernet.generate_key().decode()
+
+    def load(self) -> Optional[Dict]:
+        try:
+            with open(self.path, "rb") as f:
+                token = f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read saved session {self.path}: {e}")
+            return None
+        try:
+            session = json.loads(self._fernet.decrypt(token))
+        except (InvalidToken, ValueError) as e:
+            logger.warning(f"Ignoring unreadable saved session {self.path}: {e!r}")
+            return None
+        return session if isinstance(session, dict) else None
+
+    def save(self, session: Dict) -> None:
+        directory = os.path.dirname(self.path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".session.tmp")
+            # mkstemp files are already private (0600) on POSIX
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._fernet.encrypt(json.dumps(session).encode()))
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Could not save session to {self.path}: {e}")
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Could not remove saved session {self.path}: {e}")
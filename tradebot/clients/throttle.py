@@ -0,0 +1,50 @@
+import functools
+import threading
+from typing import Any, Dict
+
+
+class ThrottledClient:
+    """
+    Proxy around a provider client that caps how many of its calls may be in
+    flight at once. Every callable attribute is wrapped so the call acquires the
+    provider's semaphore; plain attributes are passed through untouched.
+    """
+
+    def __init__(self, client: Any, semaphore: threading.BoundedSemaphore):
+        self._client = client
+        self._semaphore = semaphore
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def throttled(*args, **kwargs):
+            with self._semaphore:
+                return attr(*args, **kwargs)
+
+        return throttled
+
+
+class ProviderLimiter:
+    """
+    Holds one semaphore per external provider so that every client talking to
+    the same provider shares a single concurrency cap.
+    """
+
+    def __init__(self, limits: Dict[str, int]):
+        for provider, limit in limits.items():
+            if limit < 1:
+                raise ValueError(
+                    f"Concurrency limit for {provider} must be at least 1, got {limit}"
+                )
+        self._semaphores = {
+            provider: threading.BoundedSemaphore(limit)
+            for provider, limit in limits.items()
+        }
+
+    def wrap(self, provider: str, client: Any) -> ThrottledClient:
+        if provider not in self._semaphores:
+            raise KeyError(f"No concurrency limit configured for {provider}")
+        return ThrottledClient(client, self._semaphores[provider])
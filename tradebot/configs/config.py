@@ -16,9 +16,116 @@ TWITTER_ACCESS_TOKEN_SECRET = os.getenv("TWITTER_ACCESS_TOKEN_SECRET")
 TWITTER_BEARER_TOKEN = os.getenv("TWITTER_BEARER_TOKEN")
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
+# Local caches (market data, fundamentals, ...) live under this directory
+CACHE_DIR = os.getenv("TRADEBOT_CACHE_DIR", ".tradebot_cache")
+# Fernet key (see SessionStore.generate_key) encrypting the Robinhood session
+# kept between runs. Without it every run logs in again and waits for the
+# login to be approved in the Robinhood app.
+ROBINHOOD_SESSION_KEY = os.getenv("ROBINHOOD_SESSION_KEY")
+ROBINHOOD_SESSION_PATH = os.path.join(CACHE_DIR, "robinhood.session")
+ROBINHOOD_INSTRUMENTS_PATH = os.path.join(CACHE_DIR, "robinhood_instruments.json")
+# Log out at shutdown (the saved session is kept for the next run either way)
+ROBINHOOD_LOGOUT = (
+    os.getenv("TRADEBOT_ROBINHOOD_LOGOUT", "0" if ROBINHOOD_SESSION_KEY else "1") == "1"
+)
+OHLCV_CACHE_DIR = os.path.join(CACHE_DIR, "ohlcv")
+FUNDAMENTALS_CACHE_DIR = os.path.join(CACHE_DIR, "fundamentals")
+FUNDAMENTALS_CACHE_TTL = 7 * 24 * 60 * 60  # seconds
+FUNDAMENTALS_CACHE_SIZE = 1024
+INDICATOR_CACHE_DIR = os.path.join(CACHE_DIR, "indicators")
+INDICATOR_CACHE_SIZE = 4096
+DECISION_CACHE_DIR = os.path.join(CACHE_DIR, "decisions")
+DECISION_CACHE_TTL = 12 * 60 * 60  # seconds
+DECISION_CACHE_SIZE = 1024
+
+# Estimated prompt tokens packed into one batched strategy request
+STRATEGY_BATCH_TOKENS = 8000
+
+# Gemini calls: worker pool size, deadline per call (seconds, also the HTTP
+# timeout of each request), retries of transient errors, and the latency
+# percentile after which a call is hedged (None disables hedging)
+LLM_MAX_CONCURRENCY = 4
+LLM_TIMEOUT = 60.0
+LLM_RETRIES = 2
+LLM_HEDGE_PERCENTILE = 0.95
+# Estimated token budget of a single-ticker strategy or risk prompt
+LLM_PROMPT_TOKENS = 1000
+# Model backend: "gemini", or "stub" for a deterministic offline stand-in
+# answering after LLM_STUB_LATENCY seconds (for load tests and benchmarks)
+LLM_BACKEND = os.getenv("TRADEBOT_LLM_BACKEND", "gemini")
+LLM_MODEL = os.getenv("TRADEBOT_LLM_MODEL", "gemini-2.5-flash")
+LLM_STUB_LATENCY = float(os.getenv("TRADEBOT_LLM_STUB_LATENCY", "0.5"))
+# Ask for the trading signal and the risk assessment in one request per
+# ticker instead of batched strategy requests followed by risk requests
+COMBINED_DECISIONS = os.getenv("TRADEBOT_COMBINED_DECISIONS", "0") == "1"
+# Risk-assess all of a run's trades together (one model request, shared
+# sizing and limits) instead of one risk request per trade
+JOINT_RISK = os.getenv("TRADEBOT_JOINT_RISK", "0") == "1"
+# Keep a Gemini context cache per ticker and only send what changed since it
+# was created. The API only caches prompts of 1024 tokens or more, which the
+# LLM_PROMPT_TOKENS budget never reaches, so with the context cache on the
+# single-ticker prompts get a larger budget and more articles and tweets. The
+# full prompt is then paid once per TTL and later requests only send updates.
+LLM_CONTEXT_CACHE = os.getenv("TRADEBOT_LLM_CONTEXT_CACHE", "0") == "1"
+LLM_CONTEXT_CACHE_TTL = 60 * 60  # seconds
+LLM_CONTEXT_PROMPT_TOKENS = 4096
+LLM_CONTEXT_MEDIA_ITEMS = 20
+# Per-run LLM budget: worst-case model requests, prompt tokens and seconds
+# (None disables a limit). Tickers that do not fit are deferred to the next run.
+LLM_RUN_CALLS = int(os.getenv("TRADEBOT_LLM_RUN_CALLS", "40"))
+LLM_RUN_TOKENS = None
+LLM_RUN_SECONDS = 10 * 60
+LLM_DEFERRED_PATH = os.path.join(CACHE_DIR, "deferred_tickers.json")
+
 MAX_POSITION_SIZE = 150
 MAX_DAILY_TRADES = 6
+# Trades approved today (New York trading date), shared by every run of the bot
+DAILY_TRADES_PATH = os.path.join(CACHE_DIR, "daily_trades.json")
 MAX_PORTFOLIO_SHARE = 17
+# Local risk engine: daily returns used, VaR confidence, and hard limits on
+# annualized volatility, correlation with the current holdings and one-day
+# VaR of a position (percent of total equity); smaller trades are vetoed
+RISK_LOOKBACK_DAYS = 252
+RISK_VAR_CONFIDENCE = 0.95
+MAX_VOLATILITY = 0.8
+MAX_HOLDINGS_CORRELATION = 0.9
+MAX_POSITION_VAR = 0.5
+MIN_POSITION_SIZE = 1.0
+# One-day VaR of all the trades approved in one run (percent of total equity)
+MAX_RUN_VAR = 1.0
+# Place orders for approved trades ("robinhood"), simulate them ("mock") or
+# only log the decisions (anything else; the default)
+EXECUTION_BROKER = os.getenv("TRADEBOT_EXECUTION_BROKER", "none")
+ORDER_WORKERS = 4
+ORDER_TIMEOUT = 60  # seconds to wait for fills
+ORDER_JOURNAL_PATH = os.path.join(CACHE_DIR, "orders.json")
+# Orders are keyed by run id, ticker and side, and each key is placed once.
+# The run id defaults to the trading date, so re-running the bot on the same
+# day does not repeat its trades; set TRADEBOT_RUN_ID to trade again.
+ORDER_RUN_ID = os.getenv("TRADEBOT_RUN_ID")
+
+WATCHLIST = ["AAPL", "TSLA", "GARBAGE"]
+
+# Number of tickers processed concurrently in a single run
+MAX_TICKER_WORKERS = 8
+
+# Alpha Vantage request budget (defaults match the free tier)
+AV_CALLS_PER_MINUTE = int(os.getenv("AV_CALLS_PER_MINUTE", "5"))
+AV_CALLS_PER_DAY = int(os.getenv("AV_CALLS_PER_DAY", "25"))
+# Alpha Vantage calls made today, shared by every run of the bot
+AV_QUOTA_PATH = os.path.join(CACHE_DIR, "alpha_vantage_quota.json")
+# Price the watchlist with REALTIME_BULK_QUOTES before fetching anything
+# else. The endpoint needs a premium Alpha Vantage plan.
+AV_BULK_QUOTES = os.getenv("AV_BULK_QUOTES", "0") == "1"
+
+# Maximum number of in-flight requests per external provider
+PROVIDER_CONCURRENCY = {
+    "alpha_vantage": 2,
+    "newsapi": 4,
+    "twitter": 2,
+    "gemini": 4,
+    "robinhood": 1,
+}
 
 if not ROBINHOOD_EMAIL or not ROBINHOOD_PWD:
     raise ValueError(
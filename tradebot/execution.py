@@ -0,0 +1,686 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from tradebot.risk_mgmt import TradeDecision
+from tradebot.strategy import Signal
+
+
+logger = logging.getLogger(__name__)
+
+
+class OrderSide(Enum):
+    BUY = "buy"
+    SELL = "sell"
+
+
+class OrderState(Enum):
+    PENDING = "pending"  # not acknowledged by the broker yet
+    SUBMITTED = "submitted"  # acknowledged, not (completely) filled
+    FILLED = "filled"
+    CANCELLED = "cancelled"
+    REJECTED = "rejected"
+    FAILED = "failed"
+    # the submission may or may not have reached the broker; never resubmitted
+    UNKNOWN = "unknown"
+
+
+FINAL_STATES = {
+    OrderState.FILLED,
+    OrderState.CANCELLED,
+    OrderState.REJECTED,
+    OrderState.FAILED,
+    OrderState.UNKNOWN,
+}
+
+# Robinhood order states
+BROKER_STATES = {
+    "queued": OrderState.SUBMITTED,
+    "unconfirmed": OrderState.SUBMITTED,
+    "confirmed": OrderState.SUBMITTED,
+    "partially_filled": OrderState.SUBMITTED,
+    "filled": OrderState.FILLED,
+    "cancelled": OrderState.CANCELLED,
+    "canceled": OrderState.CANCELLED,
+    "rejected": OrderState.REJECTED,
+    "failed": OrderState.FAILED,
+}
+
+
+@dataclass(frozen=True)
+class OrderRequest:
+    """
+    A market order for `amount` dollars of `ticker`. Requests with the same
+    `key` are the same order: it is placed at most once.
+    """
+
+    ticker: str
+    side: OrderSide
+    amount: float
+    key: str
+
+
+@dataclass
+class Order:
+    request: OrderRequest
+    state: OrderState = OrderState.PENDING
+    broker_id: Optional[str] = None
+    # clock readings: sent, acknowledged by the broker, first seen filled
+    submitted_at: Optional[float] = None
+    acked_at: Optional[float] = None
+    filled_at: Optional[float] = None
+    filled_quantity: float = 0.0
+    average_price: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def ack_latency(self) -> Optional[float]:
+        if self.submitted_at is None or self.acked_at is None:
+            return None
+        return self.acked_at - self.submitted_at
+
+    @property
+    def fill_latency(self) -> Optional[float]:
+        if self.acked_at is None or self.filled_at is None:
+            return None
+        return self.filled_at - self.acked_at
+
+
+@dataclass
+class ExecutionStats:
+    submitted: int = 0
+    filled: int = 0
+    rejected: int = 0
+    failed: int = 0
+    unknown: int = 0
+    duplicates: int = 0
+    retries: int = 0
+    status_queries: int = 0
+
+
+class ExecutionMetrics:
+    """Order outcomes plus sliding windows of submit-to-ack and ack-to-fill latencies."""
+
+    def __init__(self, window: int = 500):
+        self.stats = ExecutionStats()
+        self._ack: deque = deque(maxlen=window)
+        self._fill: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def count(self, outcome: str) -> None:
+        with self._lock:
+            setattr(self.stats, outcome, getattr(self.stats, outcome) + 1)
+
+    def observe(self, order: Order) -> None:
+        """Record the latencies of an order once it has reached a final state."""
+        with self._lock:
+            if order.ack_latency is not None:
+                self._ack.append(order.ack_latency)
+            if order.fill_latency is not None:
+                self._fill.append(order.fill_latency)
+
+    @staticmethod
+    def _percentile(latencies: List[float], q: float) -> Optional[float]:
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = asdict(self.stats)
+            ack, fill = sorted(self._ack), sorted(self._fill)
+        for name, latencies in (("ack", ack), ("fill", fill)):
+            for q in (0.5, 0.95, 0.99):
+                stats[f"{name}_p{int(q * 100)}"] = self._percentile(latencies, q)
+        return stats
+
+    def log_stats(self, name: str = "Execution") -> Dict[str, Any]:
+        stats = self.snapshot()
+
+        def fmt(latency: Optional[float]) -> str:
+            return "n/a" if latency is None else f"{latency:.2f}s"
+
+        logger.info(
+            f"{name}: {stats['submitted']} orders submitted, {stats['filled']} "
+            f"filled, {stats['rejected']} rejected, {stats['failed']} failed, "
+            f"{stats['unknown']} unknown, {stats['duplicates']} duplicates skipped, "
+            f"{stats['retries']} retries, {stats['status_queries']} status queries; "
+            f"submit-to-ack p50 {fmt(stats['ack_p50'])}, p95 {fmt(stats['ack_p95'])}; "
+            f"ack-to-fill p50 {fmt(stats['fill_p50'])}, p95 {fmt(stats['fill_p95'])}"
+        )
+        return stats
+
+
+class Broker(ABC):
+    """
+    Where orders are placed. Order records are dicts with at least `id` and
+    `state` (a Robinhood order state), plus `cumulative_quantity` and
+    `average_price` once (partly) filled.
+
+    `idempotent_submit` brokers recognise a resubmitted `request.key` and
+    return the original order, so a submission whose reply was lost can be
+    retried safely. Other brokers' lost submissions are left UNKNOWN.
+    """
+
+    idempotent_submit = False
+
+    @abstractmethod
+    def submit(self, request: OrderRequest) -> Dict[str, Any]: ...
+
+    @abstractmethod
+    def order_status(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Current records of `order_ids`, in as few requests as possible."""
+
+    @abstractmethod
+    def find_orders(self, requests: List[OrderRequest]) -> Dict[str, Dict[str, Any]]:
+        """
+        Records of orders placed for `requests`, by request key, looked up
+        among the open and recent orders. Used for submissions whose outcome
+        was never recorded (e.g. the process died while they were in flight).
+        """
+
+
+class RobinhoodBroker(Broker):
+    """
+    Fractional market orders through a `RobinhoodClient`.
+
+    Only a reply that rejects the order (a rejected state or an error message)
+    fails it; a missing or unrecognised reply is reported as a
+    `ConnectionError`, leaving the order UNKNOWN rather than FAILED.
+
+    Status checks make one request for all open orders; only orders that have
+    left the open list are then looked up one by one (once, as they are final).
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+
+    def submit(self, request: OrderRequest) -> Dict[str, Any]:
+        record = self.client.submit_order(
+            request.ticker, request.side.value, request.amount
+        )
+        if isinstance(record, dict) and record.get("id"):
+            return record
+        if isinstance(record, dict) and (
+            record.get("state") in ("rejected", "failed")
+            or record.get("detail")
+            or record.get("non_field_errors")
+        ):
+            raise ValueError(f"Robinhood rejected the order: {record}")
+        # robin_stocks answers None when the request timed out, the connection
+        # dropped or the server errored: the order may still have been placed
+        raise ConnectionError(f"No usable reply from Robinhood: {record!r}")
+
+    def find_orders(self, requests: List[OrderRequest]) -> Dict[str, Dict[str, Any]]:
+        # orders are matched on ticker, side and dollar amount since yesterday
+        since = (datetime.now(timezone.utc) - timedelta(days=1)).strftime("%Y-%m-%d")
+        records = list(self.client.get_recent_orders(since) or [])
+        found: Dict[str, Dict[str, Any]] = {}
+        for request in requests:
+            for record in records:
+                if self._matches(request, record):
+                    found[request.key] = record
+                    records.remove(record)
+                    break
+        return found
+
+    def _matches(self, request: OrderRequest, record: Dict[str, Any]) -> bool:
+        if record.get("side") != request.side.value:
+            return False
+        amount = None
+        for field in ("dollar_based_amount", "total_notional"):
+            value = record.get(field)
+            if isinstance(value, dict):
+                amount = _float(value.get("amount"))
+            if amount is not None:
+                break
+        if amount is None or abs(amount - request.amount) > 0.01:
+            return False
+        symbol = self.client.order_symbol(record)
+        return symbol is not None and symbol.upper() == request.ticker.upper()
+
+    def order_status(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        wanted = set(order_ids)
+        records = {
+            record["id"]: record
+            for record in self.client.get_open_orders() or []
+            if record.get("id") in wanted
+        }
+        for order_id in wanted - set(records):
+            record = self.client.get_order(order_id)
+            if record:
+                records[order_id] = record
+        return records
+
+
+class MockBroker(Broker):
+    """
+    In-process broker for tests and dry runs.
+
+    Orders are acknowledged after `latency` seconds and filled in full at
+    `prices[ticker]` (default `price`) once `fill_delay` seconds have passed,
+    or rejected for tickers in `reject`. `drop_replies` submissions are placed
+    but answered with a `ConnectionError`, like a reply lost on the network.
+    Submissions are deduplicated by key, like an exchange `ref_id`.
+    """
+
+    idempotent_submit = True
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        fill_delay: float = 0.0,
+        price: float = 100.0,
+        prices: Optional[Dict[str, float]] = None,
+        reject: Iterable[str] = (),
+        drop_replies: int = 0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.latency = latency
+        self.fill_delay = fill_delay
+        self.price = price
+        self.prices = prices or {}
+        self.reject = {ticker.upper() for ticker in reject}
+        self.drop_replies = drop_replies
+        self.clock = clock
+        self.orders: Dict[str, Dict[str, Any]] = {}
+        self.status_requests = 0
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, request: OrderRequest) -> Dict[str, Any]:
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            order_id = self._by_key.get(request.key)
+            if order_id is None:
+                order_id = f"mock-{len(self.orders) + 1}"
+                self._by_key[request.key] = order_id
+                self.orders[order_id] = {
+                    "request": request,
+                    "placed_at": self.clock(),
+                }
+            if self.drop_replies > 0:
+                self.drop_replies -= 1
+                raise ConnectionError("Mock broker: reply lost")
+            return self._record(order_id)
+
+    def _record(self, order_id: str) -> Dict[str, Any]:
+        order = self.orders[order_id]
+        request = order["request"]
+        ticker = request.ticker.upper()
+        record: Dict[str, Any] = {"id": order_id, "state": "confirmed"}
+        if ticker in self.reject:
+            record["state"] = "rejected"
+        elif self.clock() - order["placed_at"] >= self.fill_delay:
+            price = self.prices.get(ticker, self.price)
+            record.update(
+                state="filled",
+                cumulative_quantity=round(request.amount / price, 6),
+                average_price=price,
+            )
+        return record
+
+    def find_orders(self, requests: List[OrderRequest]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                request.key: self._record(self._by_key[request.key])
+                for request in requests
+                if request.key in self._by_key
+            }
+
+    def order_status(self, order_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            self.status_requests += 1
+            return {
+                order_id: self._record(order_id)
+                for order_id in order_ids
+                if order_id in self.orders
+            }
+
+
+def _is_transient(error: BaseException) -> bool:
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def _float(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ExecutionEngine:
+    """
+    Places orders concurrently and tracks them until they are final.
+
+    - Up to `max_workers` submissions are in flight at once. Transient errors
+      are retried `retries` times with exponential backoff from `backoff`
+      seconds, but only on `idempotent_submit` brokers; otherwise an order
+      whose submission may have been placed is marked UNKNOWN.
+    - Every request key is placed at most once; with `journal_path` this
+      holds across restarts. Orders are journaled as PENDING before they are
+      submitted; PENDING entries left by a run that died are looked up at the
+      broker (`find_orders`) and never resubmitted, becoming UNKNOWN if the
+      broker has no matching order.
+    - Fills are tracked by polling all open orders with one `order_status`
+      call per round, starting `poll_interval` seconds apart and backing off
+      to `max_poll_interval`, until every order is final or `timeout` seconds
+      have passed. Orders still open are left SUBMITTED and are tracked
+      again by the next `execute`, also after a restart with `journal_path`.
+
+    Submit-to-ack and ack-to-fill latencies of every order go to `metrics`;
+    fills are timed when a poll first sees them.
+    """
+
+    def __init__(
+        self,
+        broker: Broker,
+        max_workers: int = 4,
+        retries: int = 2,
+        backoff: float = 0.5,
+        poll_interval: float = 0.5,
+        max_poll_interval: float = 8.0,
+        timeout: float = 60.0,
+        journal_path: Optional[str] = None,
+        metrics: Optional[ExecutionMetrics] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.broker = broker
+        self.max_workers = max_workers
+        self.retries = retries
+        self.backoff = backoff
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.journal_path = journal_path
+        self.metrics = metrics or ExecutionMetrics()
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._journal_lock = threading.Lock()
+        self._orders: Dict[str, Order] = self._load()
+        # submissions of an earlier run whose outcome was never journaled
+        self._unreconciled = [
+            order
+            for order in self._orders.values()
+            if order.state is OrderState.PENDING
+        ]
+
+    def execute(self, requests: List[OrderRequest]) -> Dict[str, Order]:
+        """
+        Place the orders not placed before and wait for them, and for any
+        order still open from an earlier call or run, to be final.
+
+        Returns:
+            Dict[str, Order]: The order of every request, by key.
+        """
+        self._reconcile()
+        new: List[Order] = []
+        with self._lock:
+            for request in requests:
+                if request.key in self._orders:
+                    logger.info(f"Order {request.key} was already placed, skipping")
+                    self.metrics.count("duplicates")
+                    continue
+                order = Order(request)
+                self._orders[request.key] = order
+                new.append(order)
+            resumed = [
+                order
+                for order in self._orders.values()
+                if order.state is OrderState.SUBMITTED
+            ]
+        if resumed:
+            logger.info(f"Tracking {len(resumed)} orders still open from before")
+        if new:
+            # journal the orders before any of them can reach the broker
+            self._save()
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(new)),
+                thread_name_prefix="order",
+            ) as executor:
+                list(executor.map(self._submit, new))
+        if new or resumed:
+            self.track(new + resumed)
+        with self._lock:
+            return {request.key: self._orders[request.key] for request in requests}
+
+    def _reconcile(self) -> None:
+        with self._lock:
+            orders, self._unreconciled = self._unreconciled, []
+        if not orders:
+            return
+        try:
+            found = self.broker.find_orders([order.request for order in orders])
+        except Exception as e:
+            logger.warning(f"Could not look up unfinished submissions: {e}")
+            with self._lock:
+                self._unreconciled.extend(orders)
+            return
+        with self._lock:
+            known = {order.broker_id for order in self._orders.values()}
+        for order in orders:
+            record = found.get(order.request.key)
+            if record is None or record.get("id") in known:
+                order.error = "Submission outcome unknown; no matching broker order"
+                logger.error(
+                    f"Order {order.request.key} was being submitted when the "
+                    f"last run stopped and the broker has no matching order; "
+                    f"not resubmitting"
+                )
+                self._finish(order, OrderState.UNKNOWN)
+                continue
+            order.broker_id = record["id"]
+            known.add(order.broker_id)
+            logger.info(
+                f"Order {order.request.key} was placed by the last run "
+                f"({order.broker_id})"
+            )
+            self._update(order, record)
+        self._save()
+
+    def _submit(self, order: Order) -> None:
+        try:
+            self._place(order)
+        finally:
+            self._save()
+
+    def _place(self, order: Order) -> None:
+        request = order.request
+        for attempt in range(self.retries + 1):
+            order.submitted_at = self._clock()
+            try:
+                record = self.broker.submit(request)
+            except Exception as e:
+                order.error = str(e)
+                if not _is_transient(e):
+                    logger.error(f"Order {request.key} failed: {e}")
+                    self._finish(order, OrderState.FAILED)
+                    return
+                if not self.broker.idempotent_submit:
+                    logger.error(
+                        f"Order {request.key} may or may not have been placed "
+                        f"({e}); not resubmitting"
+                    )
+                    self._finish(order, OrderState.UNKNOWN)
+                    return
+                if attempt == self.retries:
+                    logger.error(f"Order {request.key} failed after retries: {e}")
+                    self._finish(order, OrderState.UNKNOWN)
+                    return
+                self.metrics.count("retries")
+                self._sleep(self.backoff * 2**attempt)
+                continue
+            order.acked_at = self._clock()
+            order.broker_id = record["id"]
+            order.error = None
+            self.metrics.count("submitted")
+            logger.info(
+                f"Submitted {request.side.value} of ${request.amount:.2f} "
+                f"{request.ticker} ({order.broker_id})"
+            )
+            self._update(order, record)
+            return
+
+    def _update(self, order: Order, record: Dict[str, Any]) -> None:
+        state = BROKER_STATES.get(str(record.get("state")), OrderState.SUBMITTED)
+        quantity = _float(record.get("cumulative_quantity"))
+        if quantity is not None:
+            order.filled_quantity = quantity
+        price = _float(record.get("average_price"))
+        if price is not None:
+            order.average_price = price
+        if state is OrderState.FILLED and order.filled_at is None:
+            order.filled_at = self._clock()
+        if state in FINAL_STATES:
+            self._finish(order, state)
+        else:
+            order.state = state
+
+    def _finish(self, order: Order, state: OrderState) -> None:
+        order.state = state
+        outcome = {
+            OrderState.FILLED: "filled",
+            OrderState.REJECTED: "rejected",
+            OrderState.FAILED: "failed",
+            OrderState.UNKNOWN: "unknown",
+        }.get(state)
+        if outcome is not None:
+            self.metrics.count(outcome)
+        self.metrics.observe(order)
+        logger.info(f"Order {order.request.key} {state.value}")
+
+    def track(self, orders: List[Order]) -> None:
+        """Poll the broker until `orders` are final or the timeout passes."""
+        open_orders = {
+            order.broker_id: order
+            for order in orders
+            if order.state is OrderState.SUBMITTED and order.broker_id is not None
+        }
+        deadline = self._clock() + self.timeout
+        delay = self.poll_interval
+        while open_orders and self._clock() < deadline:
+            self._sleep(min(delay, max(deadline - self._clock(), 0.0)))
+            delay = min(delay * 2, self.max_poll_interval)
+            try:
+                records = self.broker.order_status(list(open_orders))
+            except Exception as e:
+                logger.warning(f"Could not get order status: {e}")
+                continue
+            finally:
+                self.metrics.count("status_queries")
+            for order_id, record in records.items():
+                order = open_orders.get(order_id)
+                if order is None:
+                    continue
+                self._update(order, record)
+                if order.state in FINAL_STATES:
+                    del open_orders[order_id]
+        if open_orders:
+            logger.warning(
+                f"{len(open_orders)} orders still open after {self.timeout}s: "
+                f"{', '.join(order.request.key for order in open_orders.values())}"
+            )
+        self._save()
+
+    def _load(self) -> Dict[str, Order]:
+        if self.journal_path is None or not os.path.exists(self.journal_path):
+            return {}
+        try:
+            with open(self.journal_path) as f:
+                entries = json.load(f)
+            return {
+                key: Order(
+                    request=OrderRequest(
+                        ticker=entry["ticker"],
+                        side=OrderSide(entry["side"]),
+                        amount=entry["amount"],
+                        key=key,
+                    ),
+                    state=OrderState(entry["state"]),
+                    broker_id=entry.get("broker_id"),
+                    filled_quantity=entry.get("filled_quantity", 0.0),
+                    average_price=entry.get("average_price"),
+                )
+                for key, entry in entries.items()
+            }
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.warning(
+                f"Ignoring unreadable order journal {self.journal_path}: {e}"
+            )
+            return {}
+
+    def _save(self) -> None:
+        if self.journal_path is None:
+            return
+        # one writer at a time, so an older snapshot never replaces a newer one
+        with self._journal_lock:
+            with self._lock:
+                entries = {
+                    key: {
+                        "ticker": order.request.ticker,
+                        "side": order.request.side.value,
+                        "amount": order.request.amount,
+                        "state": order.state.value,
+                        "broker_id": order.broker_id,
+                        "filled_quantity": order.filled_quantity,
+                        "average_price": order.average_price,
+                    }
+                    for key, order in self._orders.items()
+                }
+            directory = os.path.dirname(self.journal_path) or "."
+            try:
+                os.makedirs(directory, exist_ok=True)
+                fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+                with os.fdopen(fd, "w") as f:
+                    json.dump(entries, f)
+                os.replace(tmp_path, self.journal_path)
+            except OSError as e:
+                logger.warning(
+                    f"Could not save order journal to {self.journal_path}: {e}"
+                )
+
+
+def order_requests(results: Dict[str, Any], run_id: str) -> List[OrderRequest]:
+    """
+    Orders for the trades approved by risk management in a pipeline run.
+
+    Args:
+        results (Dict[str, Any]): `run_pipeline` results (`TickerResult`s).
+        run_id (str): Part of every order key. It must be the same when a
+            run is retried (e.g. the trading date), so the retry does not
+            place the same orders again.
+
+    Returns:
+        List[OrderRequest]: One order per approved BUY or SELL with a size.
+    """
+    requests = []
+    for ticker, result in results.items():
+        if result.signal is Signal.HOLD or not result.risk:
+            continue
+        decision, risk = result.risk
+        size = _float(risk.get("position_size")) if isinstance(risk, dict) else None
+        if decision is not TradeDecision.APPROVED or not size or size <= 0:
+            continue
+        side = OrderSide.BUY if result.signal is Signal.BUY else OrderSide.SELL
+        requests.append(
+            OrderRequest(
+                ticker=ticker.upper(),
+                side=side,
+                amount=round(size, 2),
+                key=f"{run_id}:{ticker.upper()}:{side.value}",
+            )
+        )
+    return requests
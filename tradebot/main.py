@@ -1,8 +1,13 @@
 import logging
+import time
 
 from tradebot.configs.config import (
     ROBINHOOD_EMAIL,
     ROBINHOOD_PWD,
+    ROBINHOOD_SESSION_KEY,
+    ROBINHOOD_SESSION_PATH,
+    ROBINHOOD_INSTRUMENTS_PATH,
+    ROBINHOOD_LOGOUT,
     AV_API_KEY,
     NEWS_API_KEY,
     TWITTER_API_KEY,
@@ -10,27 +15,71 @@ from tradebot.configs.config import (
     TWITTER_ACCESS_TOKEN,
     TWITTER_ACCESS_TOKEN_SECRET,
     TWITTER_BEARER_TOKEN,
+    WATCHLIST,
+    MAX_TICKER_WORKERS,
+    PROVIDER_CONCURRENCY,
+    OHLCV_CACHE_DIR,
+    AV_CALLS_PER_MINUTE,
+    AV_CALLS_PER_DAY,
+    AV_QUOTA_PATH,
+    AV_BULK_QUOTES,
+    FUNDAMENTALS_CACHE_DIR,
+    FUNDAMENTALS_CACHE_TTL,
+    FUNDAMENTALS_CACHE_SIZE,
+    INDICATOR_CACHE_DIR,
+    INDICATOR_CACHE_SIZE,
+    DECISION_CACHE_DIR,
+    DECISION_CACHE_TTL,
+    DECISION_CACHE_SIZE,
+    STRATEGY_BATCH_TOKENS,
+    LLM_MAX_CONCURRENCY,
+    LLM_TIMEOUT,
+    LLM_RETRIES,
+    LLM_HEDGE_PERCENTILE,
+    LLM_PROMPT_TOKENS,
+    LLM_BACKEND,
+    LLM_MODEL,
+    LLM_STUB_LATENCY,
+    COMBINED_DECISIONS,
+    JOINT_RISK,
+    EXECUTION_BROKER,
+    ORDER_WORKERS,
+    ORDER_TIMEOUT,
+    ORDER_JOURNAL_PATH,
+    ORDER_RUN_ID,
+    LLM_CONTEXT_CACHE,
+    LLM_CONTEXT_CACHE_TTL,
+    LLM_CONTEXT_PROMPT_TOKENS,
+    LLM_CONTEXT_MEDIA_ITEMS,
+    LLM_RUN_CALLS,
+    LLM_RUN_TOKENS,
+    LLM_RUN_SECONDS,
+    LLM_DEFERRED_PATH,
+    DAILY_TRADES_PATH,
 )
 from tradebot.configs.logger_config import setup_logger
-from tradebot.clients.robinhood_client import RobinhoodClient
-from tradebot.clients.fin_provider import FinDataProvider
+from tradebot.analyzers.technical import IndicatorCache
+from tradebot.budget import LLMBudget
+from tradebot.clients.robinhood_client import InstrumentCache, RobinhoodClient
+from tradebot.clients.session_store import SessionStore
+from tradebot.clients.context_cache import ContextCache
+from tradebot.clients.llm import LLMInvoker
+from tradebot.clients.llm_backend import GeminiBackend, StubBackend
+from tradebot.clients.fin_provider import FinDataProvider, FundamentalsCache
+from tradebot.clients.ohlcv_store import OHLCVStore
+from tradebot.clients.rate_limiter import RequestScheduler
 from tradebot.clients.media_provider import NewsDataProvider, TwitterDataProvider
-from tradebot.analyzers.technical import (
-    calculate_sma,
-    calculate_rsi,
-    calculate_macd,
-    get_latest_indicator,
-)
-from tradebot.analyzers.fundamentals import (
-    get_pe_ratio,
-    get_peg_ratio,
-    get_roe,
-    get_revenue_growth,
-    get_eps_growth,
-    calculate_de_ratio,
-)
-from tradebot.strategy import StrategyEngine, StockData
+from tradebot.clients.throttle import ProviderLimiter
+from tradebot.prefilter import Prefilter
+from tradebot.strategy import DecisionCache, StrategyEngine
 from tradebot.risk_mgmt import RiskManager
+from tradebot.pipeline import TickerProviders, prescreen_prices, run_pipeline
+from tradebot.execution import (
+    ExecutionEngine,
+    MockBroker,
+    RobinhoodBroker,
+    order_requests,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -43,109 +92,161 @@ def main():
 
     rh_client = None
     try:
-        rh_client = RobinhoodClient(email=ROBINHOOD_EMAIL, password=ROBINHOOD_PWD)
-        rh_client.login()
-
-        portfolio = rh_client.get_portfolio_state()
-
-        fd_client = FinDataProvider(api_key=AV_API_KEY)
-
-        test_ticker = ["AAPL", "TSLA", "GARBAGE"]
-        for ticker in test_ticker:
-            # latest price query
-            price = fd_client.get_latest_price(ticker)
-            if price is None:
-                logger.warning(f"Could not get price for {ticker}. Skipping...")
-                continue
-
-            # historical data query
-            hist_data = fd_client.get_historical_data(ticker)
-            if hist_data is None:
-                logger.warning(
-                    f"Could not get historical data for {ticker}. Skipping..."
-                )
-                continue
+        limiter = ProviderLimiter(PROVIDER_CONCURRENCY)
+        # Alpha Vantage concurrency is capped by its scheduler rather than the
+        # limiter so queued requests can be reordered by priority
+        av_scheduler = RequestScheduler.for_alpha_vantage(
+            calls_per_minute=AV_CALLS_PER_MINUTE,
+            calls_per_day=AV_CALLS_PER_DAY,
+            max_concurrency=PROVIDER_CONCURRENCY["alpha_vantage"],
+            quota_path=AV_QUOTA_PATH,
+        )
 
-            # technicals
-            sma = get_latest_indicator(calculate_sma(hist_data, period=50))
-            rsi = get_latest_indicator(calculate_rsi(hist_data, period=14))
-            macd = get_latest_indicator(calculate_macd(hist_data))
-            if sma is None or rsi is None or macd is None:
-                logger.warning(
-                    f"Could not calculate indicators for {ticker}. Skipping..."
-                )
-                continue
-            else:
-                logger.info(
-                    f"Analysis for {ticker}: Price=${price:.2f}, SMA(50)=${sma:.2f}, RSI(14)={rsi:.2f}, MACD(12,26,9)=${macd.to_dict()}"
-                )
+        # one worker pool and one set of latency metrics for every Gemini call
+        llm_invoker = LLMInvoker(
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            timeout=LLM_TIMEOUT,
+            retries=LLM_RETRIES,
+            hedge_percentile=LLM_HEDGE_PERCENTILE,
+        )
+        llm_backend = (
+            StubBackend(latency=LLM_STUB_LATENCY)
+            if LLM_BACKEND == "stub"
+            else GeminiBackend(timeout=LLM_TIMEOUT)
+        )
+        context_cache = (
+            ContextCache(ttl=LLM_CONTEXT_CACHE_TTL) if LLM_CONTEXT_CACHE else None
+        )
+        # cached contexts need prompts past the API's minimum cacheable size
+        prompt_options = (
+            {
+                "max_prompt_tokens": LLM_CONTEXT_PROMPT_TOKENS,
+                "media_items": LLM_CONTEXT_MEDIA_ITEMS,
+            }
+            if context_cache is not None
+            else {"max_prompt_tokens": LLM_PROMPT_TOKENS}
+        )
 
-            # fundamentals
-            overview = fd_client.get_company_overview(ticker)
-            balance_sheet = fd_client.get_balance_sheet(ticker)
-            earnings = fd_client.get_earnings_history(ticker)
-            if overview is None or balance_sheet is None or earnings is None:
-                logger.warning(
-                    f"Could not retrieve all fundamental data for {ticker}. Skipping..."
-                )
-                continue
-            logger.info(f"Fundamental analysis for {ticker}:")
-            logger.info(f"  P/E Ratio: {get_pe_ratio(overview)}")
-            logger.info(f"  PEG Ratio: {get_peg_ratio(overview)}")
-            logger.info(f"  ROE: {get_roe(overview)}")
-            logger.info(f"  Revenue Growth: {get_revenue_growth(overview)}")
-            logger.info(f"  EPS Growth: {get_eps_growth(earnings)}")
-            logger.info(f"  Debt/Equity Ratio: {calculate_de_ratio(balance_sheet)}")
+        rh_client = RobinhoodClient(
+            email=ROBINHOOD_EMAIL,
+            password=ROBINHOOD_PWD,
+            session_store=(
+                SessionStore(ROBINHOOD_SESSION_PATH, ROBINHOOD_SESSION_KEY)
+                if ROBINHOOD_SESSION_KEY
+                else None
+            ),
+            instruments=InstrumentCache(ROBINHOOD_INSTRUMENTS_PATH),
+        )
+        rh_client.login()
 
-            news_provider = NewsDataProvider(api_key=NEWS_API_KEY)
-            twitter_provider = TwitterDataProvider(
-                api_key=TWITTER_API_KEY,
-                api_secret=TWITTER_API_SECRET,
-                access_token=TWITTER_ACCESS_TOKEN,
-                access_token_secret=TWITTER_ACCESS_TOKEN_SECRET,
-                bearer_token=TWITTER_BEARER_TOKEN,
-            )
-            logger.info(f"Fetching media data for {ticker}...")
-            news_articles = news_provider.get_everything(query=ticker, language="en")
-            tweets, _ = twitter_provider.search_tweets(query=ticker, count=10)
-            logger.info(
-                f"Fetched {len(news_articles) if news_articles else 0} news articles and {len(tweets) if tweets else 0} tweets for {ticker}."
-            )
-            if news_articles:
-                logger.info(f"  Latest news headline: {news_articles[0]['title']}")
-            if tweets:
-                logger.info(f"  Latest tweet: {tweets[0].text}")
+        portfolio = limiter.wrap("robinhood", rh_client).get_portfolio_state()
+        ohlcv_store = OHLCVStore(OHLCV_CACHE_DIR)
+
+        providers = TickerProviders(
+            fin=FinDataProvider(
+                api_key=AV_API_KEY,
+                ohlcv_store=ohlcv_store,
+                scheduler=av_scheduler,
+                fundamentals_cache=FundamentalsCache(
+                    directory=FUNDAMENTALS_CACHE_DIR,
+                    ttl=FUNDAMENTALS_CACHE_TTL,
+                    max_entries=FUNDAMENTALS_CACHE_SIZE,
+                ),
+            ),
+            news=limiter.wrap("newsapi", NewsDataProvider(api_key=NEWS_API_KEY)),
+            twitter=limiter.wrap(
+                "twitter",
+                TwitterDataProvider(
+                    api_key=TWITTER_API_KEY,
+                    api_secret=TWITTER_API_SECRET,
+                    access_token=TWITTER_ACCESS_TOKEN,
+                    access_token_secret=TWITTER_ACCESS_TOKEN_SECRET,
+                    bearer_token=TWITTER_BEARER_TOKEN,
+                ),
+            ),
+            strategy=limiter.wrap(
+                "gemini",
+                StrategyEngine(
+                    decision_cache=DecisionCache(
+                        directory=DECISION_CACHE_DIR,
+                        ttl=DECISION_CACHE_TTL,
+                        max_entries=DECISION_CACHE_SIZE,
+                    ),
+                    batch_tokens=STRATEGY_BATCH_TOKENS,
+                    invoker=llm_invoker,
+                    **prompt_options,
+                    context_cache=context_cache,
+                    backend=llm_backend,
+                    model=LLM_MODEL,
+                ),
+            ),
+            risk=limiter.wrap(
+                "gemini",
+                RiskManager(
+                    rh_client=rh_client,
+                    invoker=llm_invoker,
+                    **prompt_options,
+                    context_cache=context_cache,
+                    backend=llm_backend,
+                    model=LLM_MODEL,
+                    # risk metrics come from the bars cached by the fetches
+                    history=ohlcv_store.read,
+                    trades_path=DAILY_TRADES_PATH,
+                ),
+            ),
+            prefilter=Prefilter(),
+            budget=LLMBudget(
+                max_calls=LLM_RUN_CALLS,
+                max_tokens=LLM_RUN_TOKENS,
+                max_seconds=LLM_RUN_SECONDS,
+                tokens_per_call=prompt_options["max_prompt_tokens"],
+                path=LLM_DEFERRED_PATH,
+            ),
+            indicators=IndicatorCache(
+                max_entries=INDICATOR_CACHE_SIZE, directory=INDICATOR_CACHE_DIR
+            ),
+        )
 
-            stock_data = StockData(
-                ticker=ticker,
-                price=price,
-                volume=hist_data["volume"].iloc[-1],
-                sma=sma,
-                rsi=rsi,
-                macd=macd,
-                pe_ratio=get_pe_ratio(overview),
-                peg_ratio=get_peg_ratio(overview),
-                roe=get_roe(overview),
-                revenue_growth=get_revenue_growth(overview),
-                eps_growth=get_eps_growth(earnings),
-                de_ratio=calculate_de_ratio(balance_sheet),
-                news_articles=news_articles,
-                tweets=tweets,
+        # without bulk quotes every ticker is priced on its own
+        prices = prescreen_prices(WATCHLIST, providers.fin) if AV_BULK_QUOTES else None
+        run_id = ORDER_RUN_ID or time.strftime("%Y-%m-%d")
+        results = run_pipeline(
+            WATCHLIST,
+            providers,
+            portfolio,
+            max_workers=MAX_TICKER_WORKERS,
+            prices=prices,
+            combined=COMBINED_DECISIONS,
+            joint_risk=JOINT_RISK,
+        )
+        if EXECUTION_BROKER in ("robinhood", "mock"):
+            engine = ExecutionEngine(
+                (
+                    RobinhoodBroker(rh_client)
+                    if EXECUTION_BROKER == "robinhood"
+                    else MockBroker()
+                ),
+                max_workers=ORDER_WORKERS,
+                timeout=ORDER_TIMEOUT,
+                journal_path=ORDER_JOURNAL_PATH,
             )
-            strategy_engine = StrategyEngine()
-            signal, reasoning = strategy_engine.decide_trade(stock_data)
-            logger.info(f"Trading signal for {ticker}: {signal.name}")
-            logger.info(f"Reasoning: {reasoning}")
-
-            risk_manager = RiskManager(rh_client=rh_client)
-            risk_manager.assess_risk(stock_data=stock_data, portfolio=portfolio)
+            engine.execute(order_requests(results, run_id))
+            engine.metrics.log_stats(f"Execution ({EXECUTION_BROKER})")
+        av_scheduler.log_stats("Alpha Vantage")
+        providers.indicators.log_stats()
+        providers.prefilter.log_stats()
+        providers.budget.log_stats()
+        llm_invoker.metrics.log_stats("Gemini")
+        llm_backend.metrics.log_stats(f"Model backend ({LLM_BACKEND})")
+        if context_cache is not None:
+            context_cache.log_stats("Gemini context cache")
 
     except Exception as e:
         logger.error(
             f"An unexpected error occurred during bot execution: {e}", exc_info=True
         )
     finally:
-        if rh_client and rh_client.authenticated:
+        if rh_client and rh_client.authenticated and ROBINHOOD_LOGOUT:
             rh_client.logout()
         logger.info("Bot shutting down.")
 
@@ -0,0 +1,671 @@
+import logging
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from tradebot.analyzers.technical import IndicatorCache, latest_indicators
+from tradebot.analyzers.fundamentals import (
+    get_pe_ratio,
+    get_peg_ratio,
+    get_roe,
+    get_revenue_growth,
+    get_eps_growth,
+    calculate_de_ratio,
+)
+from tradebot.budget import LLMBudget
+from tradebot.clients.rate_limiter import Priority
+from tradebot.prefilter import Prefilter, PrefilterOutcome
+from tradebot.risk_mgmt import TradeDecision
+from tradebot.strategy import Signal, StockData
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TickerProviders:
+    """Clients shared by every ticker in a run (usually throttled proxies)."""
+
+    fin: Any
+    news: Any
+    twitter: Any
+    strategy: Any
+    risk: Any
+    indicators: Optional[IndicatorCache] = None
+    prefilter: Optional[Prefilter] = None
+    budget: Optional[LLMBudget] = None
+
+
+@dataclass
+class TickerResult:
+    ticker: str
+    stock_data: StockData
+    signal: Signal
+    reasoning: Any
+    risk: Any
+
+
+@dataclass
+class TickerBundle:
+    """Everything fetched from the data providers for one ticker."""
+
+    ticker: str
+    price: float
+    history: pd.DataFrame
+    overview: Optional[pd.DataFrame]
+    balance_sheet: Optional[pd.DataFrame]
+    earnings: Optional[pd.DataFrame]
+    news_articles: List[dict]
+    tweets: List
+
+
+# Number of provider calls issued concurrently by fetch_ticker_bundle
+BUNDLE_FETCHES = 7
+
+
+def is_held(ticker: str, portfolio: Dict) -> bool:
+    """Whether the portfolio holds an equity position in `ticker`."""
+    return ticker.upper() in (portfolio.get("equity") or {})
+
+
+def prescreen_prices(tickers: List[str], fin: Any) -> Optional[Dict[str, float]]:
+    """
+    Price the whole universe with bulk quotes and drop tickers without a price.
+
+    Args:
+        tickers (List[str]): The ticker symbols to price.
+        fin (Any): The financial data provider.
+
+    Returns:
+        Optional[Dict[str, float]]: Prices keyed by ticker, or None if bulk quotes
+            are unavailable and tickers should be priced one by one.
+    """
+    prices, errors = fin.get_latest_prices(tickers)
+    if not prices and errors:
+        logger.warning("Bulk quotes unavailable, falling back to per-ticker quotes.")
+        return None
+    for ticker, error in errors.items():
+        logger.warning(f"Could not get price for {ticker} ({error}). Skipping...")
+    return prices
+
+
+def fetch_ticker_bundle(
+    ticker: str,
+    providers: TickerProviders,
+    executor: Executor,
+    held: bool = False,
+    price: Optional[float] = None,
+) -> Optional[TickerBundle]:
+    """
+    Issue every data provider call for a ticker at once and assemble the results.
+
+    The price and history are awaited first; if either is missing the ticker is
+    skipped and any calls that have not started yet are cancelled.
+
+    Args:
+        ticker (str): The ticker symbol to fetch.
+        providers (TickerProviders): The clients used to fetch data.
+        executor (Executor): The executor the provider calls are submitted to.
+        held (bool): Whether the ticker is held, which raises its quote priority.
+        price (Optional[float]): Price already known from a bulk quote; the quote
+            request is skipped when given.
+
+    Returns:
+        Optional[TickerBundle]: The fetched data, or None if the ticker should be skipped.
+    """
+    fin = providers.fin
+    futures: Dict[str, Future] = {}
+    if price is None:
+        futures["price"] = executor.submit(
+            fin.get_latest_price,
+            ticker,
+            priority=Priority.HELD_QUOTE if held else Priority.QUOTE,
+        )
+    futures.update(
+        {
+            "history": executor.submit(fin.get_historical_data, ticker),
+            "overview": executor.submit(fin.get_company_overview, ticker),
+            "balance_sheet": executor.submit(fin.get_balance_sheet, ticker),
+            "earnings": executor.submit(fin.get_earnings_history, ticker),
+            "news": executor.submit(
+                providers.news.get_everything, query=ticker, language="en"
+            ),
+            "tweets": executor.submit(
+                providers.twitter.search_tweets, query=ticker, count=10
+            ),
+        }
+    )
+    try:
+        if "price" in futures:
+            price = futures["price"].result()
+        if price is None:
+            logger.warning(f"Could not get price for {ticker}. Skipping...")
+            return None
+
+        history = futures["history"].result()
+        if history is None:
+            logger.warning(f"Could not get historical data for {ticker}. Skipping...")
+            return None
+
+        # search_tweets returns (tweets, meta) or None on failure
+        tweets_response = futures["tweets"].result()
+        return TickerBundle(
+            ticker=ticker,
+            price=price,
+            history=history,
+            overview=futures["overview"].result(),
+            balance_sheet=futures["balance_sheet"].result(),
+            earnings=futures["earnings"].result(),
+            news_articles=futures["news"].result() or [],
+            tweets=tweets_response[0] if tweets_response else [],
+        )
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+
+def prepare_ticker(
+    ticker: str,
+    providers: TickerProviders,
+    portfolio: Dict,
+    executor: Executor,
+    price: Optional[float] = None,
+) -> Optional[StockData]:
+    """
+    Fetch and analyze one ticker, up to the point where a decision is needed.
+
+    Args:
+        ticker (str): The ticker symbol to process.
+        providers (TickerProviders): The clients used to fetch data.
+        portfolio (Dict): The current portfolio state.
+        executor (Executor): Executor for the provider calls.
+        price (Optional[float]): Price already known from a bulk quote.
+
+    Returns:
+        Optional[StockData]: The analyzed data, or None if the ticker was skipped.
+    """
+    bundle = fetch_ticker_bundle(
+        ticker, providers, executor, held=is_held(ticker, portfolio), price=price
+    )
+    if bundle is None:
+        return None
+    price, hist_data = bundle.price, bundle.history
+
+    # technicals
+    if providers.indicators is not None:
+        indicators = providers.indicators.compute(ticker, hist_data, latest_indicators)
+    else:
+        indicators = latest_indicators(hist_data)
+    if indicators is None or None in (
+        indicators.sma,
+        indicators.rsi,
+        indicators.macd,
+    ):
+        logger.warning(f"Could not calculate indicators for {ticker}. Skipping...")
+        return None
+    logger.info(
+        f"Analysis for {ticker}: Price=${price:.2f}, SMA(50)=${indicators.sma:.2f}, RSI(14)={indicators.rsi:.2f}, "
+        f"MACD(12,26,9)={indicators.macd:.2f} (signal {indicators.macd_signal:.2f}, hist {indicators.macd_hist:.2f})"
+    )
+
+    # fundamentals
+    overview = bundle.overview
+    balance_sheet = bundle.balance_sheet
+    earnings = bundle.earnings
+    if overview is None or balance_sheet is None or earnings is None:
+        logger.warning(
+            f"Could not retrieve all fundamental data for {ticker}. Skipping..."
+        )
+        return None
+    logger.info(f"Fundamental analysis for {ticker}:")
+    logger.info(f"  P/E Ratio: {get_pe_ratio(overview)}")
+    logger.info(f"  PEG Ratio: {get_peg_ratio(overview)}")
+    logger.info(f"  ROE: {get_roe(overview)}")
+    logger.info(f"  Revenue Growth: {get_revenue_growth(overview)}")
+    logger.info(f"  EPS Growth: {get_eps_growth(earnings)}")
+    logger.info(f"  Debt/Equity Ratio: {calculate_de_ratio(balance_sheet)}")
+
+    news_articles, tweets = bundle.news_articles, bundle.tweets
+    logger.info(
+        f"Fetched {len(news_articles) if news_articles else 0} news articles and {len(tweets) if tweets else 0} tweets for {ticker}."
+    )
+    if news_articles:
+        logger.info(f"  Latest news headline: {news_articles[0]['title']}")
+    if tweets:
+        logger.info(f"  Latest tweet: {tweets[0].text}")
+
+    stock_data = StockData(
+        ticker=ticker,
+        price=price,
+        volume=hist_data["volume"].iloc[-1],
+        sma=indicators.sma,
+        rsi=indicators.rsi,
+        macd=indicators.macd,
+        macd_hist=indicators.macd_hist,
+        macd_signal=indicators.macd_signal,
+        pe_ratio=get_pe_ratio(overview),
+        peg_ratio=get_peg_ratio(overview),
+        roe=get_roe(overview),
+        revenue_growth=get_revenue_growth(overview),
+        eps_growth=get_eps_growth(earnings),
+        de_ratio=calculate_de_ratio(balance_sheet),
+        news_articles=news_articles,
+        tweets=tweets,
+    )
+    return stock_data
+
+
+def assess_ticker(
+    stock_data: StockData,
+    decision: Tuple[Signal, Any],
+    providers: TickerProviders,
+    portfolio: Dict,
+) -> TickerResult:
+    """Run risk assessment on a ticker the strategy has decided to trade."""
+    signal, reasoning = decision
+    logger.info(f"Trading signal for {stock_data.ticker}: {signal.name}")
+    logger.info(f"Reasoning: {reasoning}")
+
+    risk = None
+    if signal is not Signal.HOLD:
+        risk = providers.risk.assess_risk(
+            stock_data=stock_data, portfolio=portfolio, signal=signal
+        )
+    return TickerResult(
+        ticker=stock_data.ticker,
+        stock_data=stock_data,
+        signal=signal,
+        reasoning=reasoning,
+        risk=risk,
+    )
+
+
+def assess_jointly(
+    stocks: List[StockData],
+    decisions: Dict[str, Tuple[Signal, Any]],
+    providers: TickerProviders,
+    portfolio: Dict,
+) -> Dict[str, TickerResult]:
+    """
+    Risk-assess every ticker the strategy has decided to trade with one
+    `assess_portfolio` call, so sizes and limits are applied to the run as a whole.
+    """
+    candidates = [
+        (stock_data, decisions[stock_data.ticker][0])
+        for stock_data in stocks
+        if decisions[stock_data.ticker][0] is not Signal.HOLD
+    ]
+    assessed: Dict[str, Any] = {}
+    if candidates:
+        try:
+            assessed = providers.risk.assess_portfolio(candidates, portfolio)
+        except Exception as e:
+            logger.error(f"Failed to assess this run's trades: {e}", exc_info=True)
+            stocks = [
+                stock_data
+                for stock_data in stocks
+                if decisions[stock_data.ticker][0] is Signal.HOLD
+            ]
+
+    results: Dict[str, TickerResult] = {}
+    for stock_data in stocks:
+        signal, reasoning = decisions[stock_data.ticker]
+        logger.info(f"Trading signal for {stock_data.ticker}: {signal.name}")
+        logger.info(f"Reasoning: {reasoning}")
+        results[stock_data.ticker] = TickerResult(
+            ticker=stock_data.ticker,
+            stock_data=stock_data,
+            signal=signal,
+            reasoning=reasoning,
+            risk=assessed.get(stock_data.ticker.upper()),
+        )
+    return results
+
+
+def decide_combined(
+    stock_data: StockData, providers: TickerProviders, portfolio: Dict
+) -> Optional[TickerResult]:
+    """Decide on and risk-assess a ticker with one combined model request."""
+    combined = providers.risk.decide_and_assess(stock_data, portfolio)
+    if combined is None:
+        logger.warning(f"No combined decision for {stock_data.ticker}. Skipping...")
+        return None
+    signal, reasoning, risk = combined
+    logger.info(f"Trading signal for {stock_data.ticker}: {signal.name}")
+    logger.info(f"Reasoning: {reasoning}")
+    return TickerResult(
+        ticker=stock_data.ticker,
+        stock_data=stock_data,
+        signal=signal,
+        reasoning=reasoning,
+        risk=risk,
+    )
+
+
+def prefilter_ticker(
+    stock_data: StockData, providers: TickerProviders, portfolio: Dict
+) -> Optional[TickerResult]:
+    """
+    Resolve a clear-cut ticker without the models.
+
+    Returns:
+        Optional[TickerResult]: A local HOLD or veto, or None if the ticker
+            needs the strategy and risk models.
+    """
+    if providers.prefilter is None:
+        return None
+    screened = providers.prefilter.screen(
+        stock_data, held=is_held(stock_data.ticker, portfolio)
+    )
+    if screened.outcome is PrefilterOutcome.ESCALATE:
+        return None
+
+    reasoning = {
+        "signal": Signal.HOLD.name,
+        "reasoning": "; ".join(screened.reasons) or "No clear technical signal",
+        "source": "prefilter",
+    }
+    risk = None
+    if screened.outcome is PrefilterOutcome.VETO:
+        risk = (
+            TradeDecision.VETOED,
+            {
+                "decision": TradeDecision.VETOED,
+                "reasoning": f"Vetoed by prefilter: {reasoning['reasoning']}",
+            },
+        )
+    logger.info(
+        f"Prefilter resolved {stock_data.ticker} locally: {screened.outcome.name} "
+        f"(score {screened.score})"
+    )
+    return TickerResult(
+        ticker=stock_data.ticker,
+        stock_data=stock_data,
+        signal=Signal.HOLD,
+        reasoning=reasoning,
+        risk=risk,
+    )
+
+
+def _avoided_calls(
+    resolved: List[StockData],
+    providers: TickerProviders,
+    combined: bool,
+    joint_risk: bool,
+) -> float:
+    """
+    Model requests the run would have spent on the tickers the prefilter
+    resolved: a combined request each, or their share of the batched strategy
+    requests plus a risk request each (none with `joint_risk`, whose single
+    request covers the whole run).
+    """
+    if combined:
+        return float(len(resolved))
+    costs = providers.strategy.request_costs(resolved)
+    calls = sum(calls for calls, _ in costs.values())
+    return calls + (0 if joint_risk else len(resolved))
+
+
+def _request_costs(
+    prepared: Dict[str, StockData],
+    providers: TickerProviders,
+    budget: LLMBudget,
+    joint_risk: bool,
+) -> Tuple[Dict[str, Tuple[float, int]], int]:
+    """
+    `LLMBudget.allocate` costs of the batched strategy requests plus, since any
+    ticker may turn out to be a trade, one risk request per ticker (or one for
+    the whole run with `joint_risk`).
+    """
+    costs = providers.strategy.request_costs(list(prepared.values()))
+    if joint_risk:
+        return costs, 1
+    return {
+        ticker: (calls + 1, tokens + budget.tokens_per_call)
+        for ticker, (calls, tokens) in costs.items()
+    }, 0
+
+
+def _within_budget(
+    budget: Optional[LLMBudget],
+    decide: Callable[..., Any],
+    stock_data: StockData,
+    *args,
+) -> Any:
+    """Call `decide(stock_data, *args)` unless the run is out of time."""
+    if budget is not None and budget.expired():
+        budget.defer([stock_data])
+        return None
+    return decide(stock_data, *args)
+
+
+def analyze_ticker(
+    ticker: str,
+    providers: TickerProviders,
+    portfolio: Dict,
+    executor: Optional[Executor] = None,
+    price: Optional[float] = None,
+    combined: bool = False,
+) -> Optional[TickerResult]:
+    """
+    Run the full fetch -> analyze -> decide -> assess flow for one ticker.
+
+    Args:
+        ticker (str): The ticker symbol to process.
+        providers (TickerProviders): The clients used to fetch data and decide.
+        portfolio (Dict): The current portfolio state passed to risk assessment.
+        executor (Optional[Executor]): Executor for the provider calls. A private
+            one is created when omitted.
+        price (Optional[float]): Price already known from a bulk quote.
+        combined (bool): Decide and assess risk in a single model request.
+
+    Returns:
+        Optional[TickerResult]: The decision for the ticker, or None if it was skipped.
+    """
+    if executor is None:
+        with ThreadPoolExecutor(max_workers=BUNDLE_FETCHES) as own_executor:
+            return analyze_ticker(
+                ticker, providers, portfolio, own_executor, price, combined
+            )
+
+    stock_data = prepare_ticker(ticker, providers, portfolio, executor, price)
+    if stock_data is None:
+        return None
+    local = prefilter_ticker(stock_data, providers, portfolio)
+    if local is not None:
+        if providers.prefilter is not None:
+            # one strategy and one risk request, or a combined one
+            providers.prefilter.record_avoided(1 if combined else 2)
+        return local
+    if combined:
+        return decide_combined(stock_data, providers, portfolio)
+    decision = providers.strategy.decide_trade(stock_data)
+    return assess_ticker(stock_data, decision, providers, portfolio)
+
+
+def run_pipeline(
+    tickers: List[str],
+    providers: TickerProviders,
+    portfolio: Dict,
+    max_workers: int = 8,
+    prices: Optional[Dict[str, float]] = None,
+    combined: bool = False,
+    joint_risk: bool = False,
+) -> Dict[str, TickerResult]:
+    """
+    Process many tickers concurrently.
+
+    Tickers are first fetched and analyzed in parallel, screened by the
+    prefilter (if any), then decided on with one batched `decide_trades` call,
+    then risk-assessed in parallel (HOLDs are not assessed). With `joint_risk`
+    the trades are risk-assessed together in one `assess_portfolio` call
+    instead. In `combined` mode each ticker is decided on and assessed in a
+    single request.
+
+    With an LLM budget in `providers`, only the highest-priority tickers that
+    fit in it reach the models; the rest, and any whose model requests would
+    start after the budget's deadline, are deferred to the next run and left
+    out of the results.
+
+    Provider concurrency is bounded by the (throttled) clients in `providers`;
+    a failure in one ticker is logged and does not affect the others.
+
+    Args:
+        tickers (List[str]): The ticker symbols to process.
+        providers (TickerProviders): The clients shared by every ticker.
+        portfolio (Dict): The current portfolio state.
+        max_workers (int): Maximum number of tickers processed at once.
+        prices (Optional[Dict[str, float]]): Pre-screened prices (see
+            `prescreen_prices`). Only these tickers are processed when given.
+        combined (bool): Use combined strategy + risk requests.
+        joint_risk (bool): Assess the run's trades together (ignored when
+            `combined`).
+
+    Returns:
+        Dict[str, TickerResult]: Results for the tickers that were not skipped.
+    """
+    results: Dict[str, TickerResult] = {}
+    budget = providers.budget
+    if budget is not None:
+        budget.start()
+    if prices is not None:
+        tickers = [ticker for ticker in tickers if ticker.upper() in prices]
+    if not tickers:
+        return results
+
+    workers = min(max_workers, len(tickers))
+    # provider calls run on their own pool so ticker workers never wait on
+    # fetches queued behind other ticker workers
+    with (
+        ThreadPoolExecutor(
+            max_workers=workers * BUNDLE_FETCHES, thread_name_prefix="fetch"
+        ) as fetch_executor,
+        ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ticker"
+        ) as executor,
+    ):
+        futures = {
+            executor.submit(
+                prepare_ticker,
+                ticker,
+                providers,
+                portfolio,
+                fetch_executor,
+                prices.get(ticker.upper()) if prices is not None else None,
+            ): ticker
+            for ticker in tickers
+        }
+        prepared = _collect(futures)
+        resolved = []
+        for ticker, stock_data in list(prepared.items()):
+            local = prefilter_ticker(stock_data, providers, portfolio)
+            if local is not None:
+                results[ticker] = local
+                resolved.append(stock_data)
+                del prepared[ticker]
+        if providers.prefilter is not None and resolved:
+            providers.prefilter.record_avoided(
+                _avoided_calls(resolved, providers, combined, joint_risk)
+            )
+        if budget is not None and prepared:
+            # a combined request decides on and assesses one ticker
+            costs, run_calls = (
+                (None, 0)
+                if combined
+                else _request_costs(prepared, providers, budget, joint_risk)
+            )
+            granted, _ = budget.allocate(
+                list(prepared.values()),
+                held={
+                    ticker.upper() for ticker in prepared if is_held(ticker, portfolio)
+                },
+                calls=1,
+                costs=costs,
+                run_calls=run_calls,
+            )
+            prepared = {stock_data.ticker: stock_data for stock_data in granted}
+
+        if combined:
+            futures = {
+                executor.submit(
+                    _within_budget,
+                    budget,
+                    decide_combined,
+                    stock_data,
+                    providers,
+                    portfolio,
+                ): ticker
+                for ticker, stock_data in prepared.items()
+            }
+        else:
+            if budget is not None and budget.expired():
+                budget.defer(list(prepared.values()))
+                prepared = {}
+            try:
+                decisions = (
+                    providers.strategy.decide_trades(list(prepared.values()))
+                    if prepared
+                    else {}
+                )
+            except Exception as e:
+                logger.error(f"Failed to decide on trades: {e}", exc_info=True)
+                decisions = {}
+            for ticker in prepared:
+                if ticker not in decisions:
+                    logger.warning(f"No trade decision for {ticker}. Skipping...")
+            decided = [
+                stock_data
+                for ticker, stock_data in prepared.items()
+                if ticker in decisions
+            ]
+
+            if joint_risk:
+                trades = [
+                    stock_data
+                    for stock_data in decided
+                    if decisions[stock_data.ticker][0] is not Signal.HOLD
+                ]
+                if trades and budget is not None and budget.expired():
+                    budget.defer(trades)
+                    decided = [
+                        stock_data for stock_data in decided if stock_data not in trades
+                    ]
+                results.update(assess_jointly(decided, decisions, providers, portfolio))
+                decided = []
+
+            futures = {
+                executor.submit(
+                    _within_budget,
+                    # HOLDs are not risk-assessed, so they cost nothing more
+                    budget
+                    if decisions[stock_data.ticker][0] is not Signal.HOLD
+                    else None,
+                    assess_ticker,
+                    stock_data,
+                    decisions[stock_data.ticker],
+                    providers,
+                    portfolio,
+                ): stock_data.ticker
+                for stock_data in decided
+            }
+        results.update(_collect(futures))
+
+    logger.info(f"Processed {len(results)}/{len(tickers)} tickers.")
+    return results
+
+
+def _collect(futures: Dict[Future, str]) -> Dict[str, Any]:
+    """Gather per-ticker results, logging (and dropping) failed tickers."""
+    collected: Dict[str, Any] = {}
+    for future in as_completed(futures):
+        ticker = futures[future]
+        try:
+            result = future.result()
+        except Exception as e:
+            logger.error(f"Failed to process {ticker}: {e}", exc_info=True)
+            continue
+        if result is not None:
+            collected[ticker] = result
+    return collected
@@ -0,0 +1,187 @@
+import logging
+import math
+import threading
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, List, Optional
+
+from tradebot.strategy import StockData
+
+
+logger = logging.getLogger(__name__)
+
+
+class PrefilterOutcome(Enum):
+    HOLD = 0
+    VETO = -1
+    ESCALATE = 1
+
+
+@dataclass
+class PrefilterResult:
+    outcome: PrefilterOutcome
+    score: int
+    reasons: List[str] = field(default_factory=list)
+
+
+@dataclass
+class PrefilterStats:
+    screened: int = 0
+    held: int = 0
+    vetoed: int = 0
+    escalated: int = 0
+    # model requests the held and vetoed tickers would have cost, as planned
+    # by the caller (batched strategy requests count fractionally)
+    llm_calls_avoided: float = 0.0
+
+
+def _missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _reported(value: Optional[float]) -> Optional[float]:
+    """The value, or None if it is missing or NaN."""
+    return None if _missing(value) else value
+
+
+class Prefilter:
+    """
+    Deterministic screen run before the strategy model.
+
+    Technicals give a score from -3 to +3: RSI below `rsi_oversold` (+1) or
+    above `rsi_overbought` (-1), price more than `sma_band` above (+1) or below
+    (-1) its SMA, and the sign of the MACD histogram. Fundamentals raise red
+    flags for P/E above `max_pe` (or negative), PEG above `max_peg` and D/E
+    above `max_de`.
+
+    - A score within `escalate_score` of zero is a clear HOLD.
+    - A bullish score with `max_red_flags` or more red flags is vetoed.
+    - A bearish score on a ticker that is not held is a HOLD (nothing to sell).
+    - Everything else is escalated to the model.
+    """
+
+    def __init__(
+        self,
+        rsi_oversold: float = 30,
+        rsi_overbought: float = 70,
+        sma_band: float = 0.02,
+        max_pe: float = 40,
+        max_peg: float = 2,
+        max_de: float = 2,
+        max_red_flags: int = 2,
+        escalate_score: int = 2,
+    ):
+        self.rsi_oversold = rsi_oversold
+        self.rsi_overbought = rsi_overbought
+        self.sma_band = sma_band
+        self.max_pe = max_pe
+        self.max_peg = max_peg
+        self.max_de = max_de
+        self.max_red_flags = max_red_flags
+        self.escalate_score = escalate_score
+        self.stats = PrefilterStats()
+        self._lock = threading.Lock()
+
+    def technical_score(self, stock_data: StockData, reasons: List[str]) -> int:
+        score = 0
+        if stock_data.rsi < self.rsi_oversold:
+            score += 1
+            reasons.append(f"RSI {stock_data.rsi:.1f} oversold")
+        elif stock_data.rsi > self.rsi_overbought:
+            score -= 1
+            reasons.append(f"RSI {stock_data.rsi:.1f} overbought")
+
+        if stock_data.price > stock_data.sma * (1 + self.sma_band):
+            score += 1
+            reasons.append("price above SMA")
+        elif stock_data.price < stock_data.sma * (1 - self.sma_band):
+            score -= 1
+            reasons.append("price below SMA")
+
+        hist = stock_data.macd_hist
+        if hist is not None and not math.isnan(hist) and hist != 0:
+            score += 1 if hist > 0 else -1
+            reasons.append(f"MACD histogram {'positive' if hist > 0 else 'negative'}")
+        return score
+
+    def red_flags(self, stock_data: StockData) -> List[str]:
+        flags = []
+        pe = _reported(stock_data.pe_ratio)
+        if pe is not None and (pe < 0 or pe > self.max_pe):
+            flags.append(f"P/E {pe:.1f}")
+        peg = _reported(stock_data.peg_ratio)
+        if peg is not None and peg > self.max_peg:
+            flags.append(f"PEG {peg:.2f}")
+        de = _reported(stock_data.de_ratio)
+        if de is not None and de > self.max_de:
+            flags.append(f"D/E {de:.2f}")
+        return flags
+
+    def screen(self, stock_data: StockData, held: bool = False) -> PrefilterResult:
+        """
+        Classify a ticker as a local HOLD, a local veto, or one for the model.
+
+        Args:
+            stock_data (StockData): The analyzed ticker.
+            held (bool): Whether the portfolio holds the ticker.
+
+        Returns:
+            PrefilterResult: The outcome, the technical score and the reasons.
+        """
+        reasons: List[str] = []
+        if any(
+            _missing(value)
+            for value in (stock_data.price, stock_data.sma, stock_data.rsi)
+        ):
+            result = PrefilterResult(
+                PrefilterOutcome.HOLD, 0, ["insufficient technical data"]
+            )
+        else:
+            score = self.technical_score(stock_data, reasons)
+            flags = self.red_flags(stock_data)
+            if abs(score) < self.escalate_score:
+                outcome = PrefilterOutcome.HOLD
+            elif score > 0 and len(flags) >= self.max_red_flags:
+                outcome = PrefilterOutcome.VETO
+                reasons.extend(flags)
+            elif score < 0 and not held:
+                outcome = PrefilterOutcome.HOLD
+                reasons.append("not held")
+            else:
+                outcome = PrefilterOutcome.ESCALATE
+            result = PrefilterResult(outcome, score, reasons)
+
+        with self._lock:
+            self.stats.screened += 1
+            if result.outcome is PrefilterOutcome.HOLD:
+                self.stats.held += 1
+            elif result.outcome is PrefilterOutcome.VETO:
+                self.stats.vetoed += 1
+            else:
+                self.stats.escalated += 1
+        return result
+
+    def record_avoided(self, calls: float) -> None:
+        """Count the model requests that tickers resolved locally would have cost."""
+        with self._lock:
+            self.stats.llm_calls_avoided += calls
+
+    def reset_stats(self) -> PrefilterStats:
+        with self._lock:
+            stats, self.stats = self.stats, PrefilterStats()
+        return stats
+
+    def log_stats(self, name: str = "Prefilter") -> Dict[str, float]:
+        stats = self.reset_stats()
+        logger.info(
+            f"{name}: {stats.screened} screened, {stats.held} held and "
+            f"{stats.vetoed} vetoed locally, {stats.escalated} escalated; "
+            f"{stats.llm_calls_avoided:g} LLM calls avoided"
+        )
+        return {
+            "screened": stats.screened,
+            "held": stats.held,
+            "vetoed": stats.vetoed,
+            "escalated": stats.escalated,
+            "llm_calls_avoided": stats.llm_calls_avoided,
+        }
@@ -0,0 +1,161 @@
+import logging
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Headlines sharing at least this fraction of their words are duplicates
+DUPLICATE_SIMILARITY = 0.75
+_URL = re.compile(r"https?://\S+")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough prompt token count (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+@dataclass
+class Prompt:
+    text: str
+    tokens: int
+    articles: int
+    tweets: int
+
+
+def _words(text: str) -> frozenset:
+    return frozenset(_WORD.findall(text.lower()))
+
+
+def _is_duplicate(words: frozenset, seen: List[frozenset]) -> bool:
+    for other in seen:
+        union = words | other
+        if union and len(words & other) / len(union) >= DUPLICATE_SIMILARITY:
+            return True
+    return False
+
+
+def compact_articles(
+    articles: Optional[List[dict]], limit: Optional[int] = None
+) -> List[dict]:
+    """
+    Reduce NewsAPI articles to title, description and date, newest first, with
+    near-duplicate headlines removed.
+
+    Args:
+        articles (Optional[List[dict]]): Articles as returned by NewsAPI.
+        limit (Optional[int]): Maximum number of articles to keep.
+
+    Returns:
+        List[dict]: The compacted articles.
+    """
+    ranked = sorted(
+        (article for article in articles or [] if article.get("title")),
+        key=lambda article: article.get("publishedAt") or "",
+        reverse=True,
+    )
+    compacted: List[dict] = []
+    seen: List[frozenset] = []
+    for article in ranked:
+        words = _words(article["title"])
+        if _is_duplicate(words, seen):
+            continue
+        seen.append(words)
+        compacted.append(
+            {
+                "title": article["title"],
+                "description": article.get("description") or "",
+                "date": (article.get("publishedAt") or "")[:10],
+            }
+        )
+        if limit is not None and len(compacted) >= limit:
+            break
+    return compacted
+
+
+def compact_tweets(
+    tweets: Optional[List[Any]], limit: Optional[int] = None
+) -> List[str]:
+    """Tweet texts without links, newest first, with near-duplicates removed."""
+
+    def created_at(tweet) -> str:
+        return str(getattr(tweet, "created_at", None) or "")
+
+    compacted: List[str] = []
+    seen: List[frozenset] = []
+    for tweet in sorted(tweets or [], key=created_at, reverse=True):
+        text = getattr(tweet, "text", tweet)
+        if not isinstance(text, str):
+            continue
+        text = " ".join(_URL.sub("", text).split())
+        words = _words(text)
+        if not text or _is_duplicate(words, seen):
+            continue
+        seen.append(words)
+        compacted.append(text)
+        if limit is not None and len(compacted) >= limit:
+            break
+    return compacted
+
+
+def summarize_portfolio(portfolio: Optional[Dict], ticker: str) -> Dict[str, Any]:
+    """
+    The parts of the portfolio relevant to trading `ticker`: buying power,
+    total equity, number of positions and the current position in `ticker`.
+    """
+    portfolio = portfolio or {}
+    profile = portfolio.get("cash")
+    holdings = portfolio.get("equity") or {}
+    summary: Dict[str, Any] = {
+        "cash": profile.get("cash") if isinstance(profile, dict) else profile,
+        "total_equity": profile.get("equity") if isinstance(profile, dict) else None,
+        "positions": len(holdings),
+    }
+    position = holdings.get(ticker.upper())
+    if position:
+        summary["position"] = {
+            key: position.get(key)
+            for key in ("quantity", "average_buy_price", "equity", "percentage")
+        }
+    return summary
+
+
+def build_prompt(
+    render: Callable[[List[dict], List[str]], str],
+    articles: List[dict],
+    tweets: List[str],
+    max_tokens: int,
+) -> Prompt:
+    """
+    Render a prompt, dropping the lowest-ranked media items until it fits in
+    `max_tokens` estimated tokens.
+
+    Args:
+        render (Callable[[List[dict], List[str]], str]): Builds the prompt text
+            from the articles and tweets to include.
+        articles (List[dict]): Compacted articles, best first.
+        tweets (List[str]): Compacted tweets, best first.
+        max_tokens (int): The token budget.
+
+    Returns:
+        Prompt: The prompt text and its estimated size.
+    """
+    articles, tweets = list(articles), list(tweets)
+    while True:
+        text = render(articles, tweets)
+        tokens = estimate_tokens(text)
+        if tokens <= max_tokens or not (articles or tweets):
+            break
+        if len(articles) >= len(tweets):
+            articles.pop()
+        else:
+            tweets.pop()
+
+    if tokens > max_tokens:
+        logger.warning(
+            f"Prompt needs ~{tokens} tokens without any media, over the "
+            f"{max_tokens} token budget"
+        )
+    return Prompt(text=text, tokens=tokens, articles=len(articles), tweets=len(tweets))
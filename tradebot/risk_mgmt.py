@@ -1,36 +1,271 @@
+import json
 import logging
+import math
+import os
+import tempfile
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
 from enum import Enum
-from typing import Tuple, Optional, Dict
-from google import genai
+from typing import Any, Callable, List, Tuple, Optional, Dict
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
 from google.genai.types import GenerateContentConfig
 
-from tradebot.strategy import StockData
+from tradebot.analyzers.risk_metrics import (
+    covariance,
+    historical_var,
+    parametric_var,
+    portfolio_correlation,
+    realized_volatility,
+    returns_matrix,
+)
+from tradebot.strategy import (
+    DEFAULT_MODEL,
+    Signal,
+    StockData,
+    _answer_field,
+    parse_signal,
+)
+from tradebot.clients.context_cache import ContextCache
+from tradebot.clients.llm import LLMInvoker
+from tradebot.clients.llm_backend import GeminiBackend, ModelBackend
+from tradebot.prompts import (
+    build_prompt,
+    compact_articles,
+    compact_tweets,
+    estimate_tokens,
+    summarize_portfolio,
+)
 from tradebot.configs.config import (
     MAX_POSITION_SIZE,
     MAX_DAILY_TRADES,
     MAX_PORTFOLIO_SHARE,
+    MAX_POSITION_VAR,
+    MAX_VOLATILITY,
+    MAX_HOLDINGS_CORRELATION,
+    MIN_POSITION_SIZE,
+    MAX_RUN_VAR,
+    RISK_LOOKBACK_DAYS,
+    RISK_VAR_CONFIDENCE,
 )
 from tradebot.clients.robinhood_client import RobinhoodClient
 
 
 logger = logging.getLogger(__name__)
 
+# Trading days follow the exchange's calendar, not the host's or UTC's
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+
+
+def _trading_date() -> str:
+    return datetime.now(MARKET_TIMEZONE).date().isoformat()
+
+
+# Most news articles and tweets included in a risk prompt
+RISK_MEDIA_ITEMS = 5
+RISK_SYSTEM_INSTRUCTION = [
+    "You are a risk management assistant. \
+    Provide clear and concise risk analyses based on the data provided \
+    along with a detailed research and reasoning for your decision."
+]
+PORTFOLIO_SYSTEM_INSTRUCTION = [
+    "You are a portfolio risk management assistant. \
+    Review a set of proposed trades together and provide clear and concise \
+    risk decisions with the reasoning for each."
+]
+COMBINED_SYSTEM_INSTRUCTION = [
+    "You are a financial trading and risk management assistant. \
+    Provide clear and concise trading signals and risk analyses based \
+    on the data provided along with a detailed research and reasoning \
+    for your decisions."
+]
+
 
 class TradeDecision(Enum):
     APPROVED = 1
     VETOED = -1
 
 
+@dataclass
 class RiskDecision:
     decision: TradeDecision
     reasoning: str
+    position_size: float
+
+
+@dataclass
+class PortfolioRiskDecision:
+    ticker: str
+    decision: TradeDecision
+    reasoning: str
+    position_size: float
+
+
+@dataclass
+class CombinedDecision:
+    signal: Signal
+    reasoning: str
+    confidence: str
+    decision: TradeDecision
+    position_size: float
+
+
+@dataclass(frozen=True)
+class RiskLimits:
+    """
+    Hard limits enforced locally. Shares are percentages of total portfolio
+    equity; `max_position_var` caps the one-day historical VaR of a position
+    and `max_run_var` the one-day VaR of all the trades approved in one run.
+    """
+
+    max_position_size: float = MAX_POSITION_SIZE
+    max_portfolio_share: float = MAX_PORTFOLIO_SHARE
+    max_position_var: float = MAX_POSITION_VAR
+    max_volatility: float = MAX_VOLATILITY
+    max_correlation: float = MAX_HOLDINGS_CORRELATION
+    min_position_size: float = MIN_POSITION_SIZE
+    max_run_var: float = MAX_RUN_VAR
+    var_confidence: float = RISK_VAR_CONFIDENCE
+    lookback: int = RISK_LOOKBACK_DAYS
+
+
+@dataclass
+class LocalRisk:
+    """Numbers from the local risk engine for one candidate trade."""
+
+    max_size: float
+    volatility: Optional[float] = None
+    var: Optional[float] = None
+    correlation: Optional[float] = None
+    vetoes: List[str] = field(default_factory=list)
+
+    def summary(self, confidence: float = RISK_VAR_CONFIDENCE) -> Dict[str, Any]:
+        def pct(value: Optional[float]) -> str:
+            return "unknown" if value is None else f"{value:.1%}"
+
+        return {
+            "Annualized volatility": pct(self.volatility),
+            f"1-day {confidence:.0%} historical VaR": pct(self.var),
+            "Correlation with holdings": (
+                "unknown" if self.correlation is None else round(self.correlation, 2)
+            ),
+            "Maximum position size": f"${self.max_size:.2f}",
+        }
+
+
+def _number(value: Any) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def _finite(value: float) -> Optional[float]:
+    return float(value) if np.isfinite(value) else None
+
+
+def _holding_values(portfolio: Dict) -> Dict[str, float]:
+    return {
+        ticker.upper(): value
+        for ticker, position in (portfolio.get("equity") or {}).items()
+        if isinstance(position, dict)
+        and (value := _number(position.get("equity"))) is not None
+        and value > 0
+    }
 
 
 class RiskManager:
-    def __init__(self, rh_client: RobinhoodClient):
-        self.llm_client = genai.Client()
+    def __init__(
+        self,
+        rh_client: RobinhoodClient,
+        invoker: Optional[LLMInvoker] = None,
+        max_prompt_tokens: int = 1000,
+        context_cache: Optional[ContextCache] = None,
+        backend: Optional[ModelBackend] = None,
+        model: str = DEFAULT_MODEL,
+        history: Optional[Callable[[str], Optional[pd.DataFrame]]] = None,
+        limits: Optional[RiskLimits] = None,
+        media_items: int = RISK_MEDIA_ITEMS,
+        trades_path: Optional[str] = None,
+        today: Callable[[], str] = _trading_date,
+    ):
+        self.backend = backend or GeminiBackend()
+        # cached daily bars by ticker (e.g. `OHLCVStore.read`); no network calls
+        self.history = history
+        self.limits = limits or RiskLimits()
+        self.model = model
+        self.invoker = invoker or LLMInvoker()
+        self.max_prompt_tokens = max_prompt_tokens
+        self.media_items = media_items
+        self.context_cache = context_cache
         self.rh_client = rh_client
-        self.daily_trades = 0
+        # with `trades_path` the day's trade count survives restarts, so a bot
+        # run as a fresh process on a schedule still stops at MAX_DAILY_TRADES
+        self.trades_path = trades_path
+        self._today = today
+        self._trades_lock = threading.Lock()
+        self._trades_day, self._daily_trades = self._load_trades()
+
+    @property
+    def llm_client(self) -> Any:
+        """The backend's `genai.Client`-like client."""
+        return self.backend.client
+
+    @llm_client.setter
+    def llm_client(self, client: Any) -> None:
+        self.backend = GeminiBackend(
+            client,
+            metrics=self.backend.metrics,
+            timeout=getattr(self.backend, "timeout", None),
+        )
+
+    @property
+    def daily_trades(self) -> int:
+        """Trades approved (or reserved) on the current trading day."""
+        with self._trades_lock:
+            self._roll_trades()
+            return self._daily_trades
+
+    @daily_trades.setter
+    def daily_trades(self, count: int) -> None:
+        with self._trades_lock:
+            self._roll_trades()
+            self._daily_trades = count
+            self._save_trades()
+
+    def _roll_trades(self) -> None:
+        today = self._today()
+        if today != self._trades_day:
+            self._trades_day, self._daily_trades = today, 0
+
+    def _load_trades(self) -> Tuple[str, int]:
+        today = self._today()
+        if self.trades_path is None or not os.path.exists(self.trades_path):
+            return today, 0
+        try:
+            with open(self.trades_path) as f:
+                saved = json.load(f)
+            return str(saved["date"]), int(saved["trades"])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable daily trades {self.trades_path}: {e}")
+            return today, 0
+
+    def _save_trades(self) -> None:
+        if self.trades_path is None:
+            return
+        directory = os.path.dirname(self.trades_path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".json.tmp")
+            with os.fdopen(fd, "w") as f:
+                json.dump({"date": self._trades_day, "trades": self._daily_trades}, f)
+            os.replace(tmp_path, self.trades_path)
+        except OSError as e:
+            logger.warning(f"Could not save daily trades to {self.trades_path}: {e}")
 
     def can_trade(self) -> bool:
         if self.daily_trades >= MAX_DAILY_TRADES:
@@ -38,62 +273,744 @@ class RiskManager:
             return False
         return True
 
-    def assess_risk(
+    def _reserve_trades(self, count: int = 1) -> int:
+        """
+        Take up to `count` of the day's remaining trades before asking the
+        model, so concurrent assessments cannot approve more than
+        `MAX_DAILY_TRADES` between them. Returns how many were taken.
+        """
+        with self._trades_lock:
+            self._roll_trades()
+            taken = max(min(count, MAX_DAILY_TRADES - self._daily_trades), 0)
+            if taken:
+                self._daily_trades += taken
+                self._save_trades()
+        if taken < count:
+            logger.info("Reached maximum daily trades limit.")
+        return taken
+
+    def _release_trades(self, count: int = 1) -> None:
+        """Give back reserved trades that were not approved."""
+        if count > 0:
+            with self._trades_lock:
+                self._roll_trades()
+                self._daily_trades = max(self._daily_trades - count, 0)
+                self._save_trades()
+
+    def _closes(self, ticker: str) -> Optional[pd.Series]:
+        if self.history is None:
+            return None
+        try:
+            bars = self.history(ticker)
+        except Exception as e:
+            logger.warning(f"Could not read cached history for {ticker}: {e}")
+            return None
+        if bars is None or "close" not in bars:
+            return None
+        return bars["close"].tail(self.limits.lookback + 1)
+
+    def measure(
         self, stock_data: StockData, portfolio: Dict
+    ) -> Tuple[Optional[float], Optional[float], Optional[float]]:
+        """
+        Realized volatility, historical VaR and correlation with the current
+        holdings of a ticker, from cached daily history (None when unknown).
+        """
+        ticker = stock_data.ticker.upper()
+        values = _holding_values(portfolio)
+        values.pop(ticker, None)
+        closes = {ticker: self._closes(ticker)}
+        closes.update({held: self._closes(held) for held in values})
+        returns = returns_matrix(closes, self.limits.lookback)
+        if ticker not in returns:
+            return None, None, None
+
+        candidate = returns[ticker].to_numpy()
+        volatility = _finite(realized_volatility(candidate)[0])
+        var = _finite(historical_var(candidate, self.limits.var_confidence)[0])
+        held = [held for held in values if held in returns]
+        correlation = None
+        if held:
+            correlation = portfolio_correlation(
+                candidate, returns[held].to_numpy(), [values[t] for t in held]
+            )
+        return volatility, var, correlation
+
+    def local_risk(
+        self,
+        stock_data: StockData,
+        portfolio: Dict,
+        signal: Optional[Signal] = None,
+        measured: Optional[Tuple[Optional[float], ...]] = None,
+    ) -> LocalRisk:
+        """
+        Largest allowed trade and hard-limit breaches for a ticker.
+
+        A BUY (or a trade of unknown direction) is capped by `max_position_size`,
+        buying power, the room left under `max_portfolio_share` and the VaR
+        budget `max_position_var`, and is vetoed when volatility or correlation
+        with the holdings is over its limit or less than `min_position_size` is
+        left. A SELL is capped by the position held and vetoed without one.
+
+        Args:
+            stock_data (StockData): The candidate ticker.
+            portfolio (Dict): The current portfolio state.
+            signal (Optional[Signal]): The direction of the trade.
+            measured (Optional[Tuple]): Output of `measure`, if already known.
+
+        Returns:
+            LocalRisk: The metrics, the size cap and any vetoes.
+        """
+        limits = self.limits
+        ticker = stock_data.ticker.upper()
+        volatility, var, correlation = measured or self.measure(stock_data, portfolio)
+        summary = summarize_portfolio(portfolio, ticker)
+        values = _holding_values(portfolio)
+        position = values.get(ticker, 0.0)
+        cash = _number(summary["cash"])
+        equity = _number(summary["total_equity"])
+        if equity is None and cash is not None:
+            equity = cash + sum(values.values())
+
+        vetoes = []
+        if signal is Signal.SELL:
+            max_size = min(limits.max_position_size, position)
+            if position <= 0:
+                vetoes.append(f"No {ticker} position to sell")
+        else:
+            caps = [limits.max_position_size]
+            if cash is not None:
+                caps.append(cash)
+            if equity:
+                caps.append(limits.max_portfolio_share / 100 * equity - position)
+                if var:
+                    caps.append(limits.max_position_var / 100 * equity / var - position)
+            max_size = max(min(caps), 0.0)
+            if volatility is not None and volatility > limits.max_volatility:
+                vetoes.append(
+                    f"Volatility {volatility:.0%} is over {limits.max_volatility:.0%}"
+                )
+            if correlation is not None and correlation > limits.max_correlation:
+                vetoes.append(
+                    f"Correlation with holdings {correlation:.2f} is over "
+                    f"{limits.max_correlation:.2f}"
+                )
+            if max_size < limits.min_position_size:
+                vetoes.append(
+                    f"Only ${max_size:.2f} left within the position, portfolio "
+                    "share, VaR and buying power limits"
+                )
+        return LocalRisk(
+            max_size=round(max_size, 2),
+            volatility=volatility,
+            var=var,
+            correlation=correlation,
+            vetoes=vetoes,
+        )
+
+    def _veto(
+        self, stock_data: StockData, local: LocalRisk
+    ) -> Tuple[TradeDecision, dict]:
+        reasoning = "Vetoed by risk limits: " + "; ".join(local.vetoes)
+        logger.info(f"Risk assessment for {stock_data.ticker}: {reasoning}")
+        return TradeDecision.VETOED, {
+            "decision": TradeDecision.VETOED,
+            "reasoning": reasoning,
+            "position_size": 0.0,
+            "metrics": local.summary(self.limits.var_confidence),
+        }
+
+    def _build_prompt(
+        self,
+        stock_data: StockData,
+        facts: Dict[str, Any],
+        portfolio_summary: Dict[str, Any],
+        instructions: str,
+        articles: List[dict],
+        tweets: List[str],
+    ) -> str:
+        def render(articles, tweets) -> str:
+            return (
+                f"Given the following stock data:\n"
+                f"Ticker: {stock_data.ticker}\n"
+                + "".join(f"{name}: {value}\n" for name, value in facts.items())
+                + f"News Articles: {articles}\n"
+                f"Tweets: {tweets}\n"
+                f"Portfolio: {portfolio_summary}\n\n" + instructions
+            )
+
+        built = build_prompt(render, articles, tweets, self.max_prompt_tokens)
+        logger.info(
+            f"Risk prompt for {stock_data.ticker}: ~{built.tokens} tokens "
+            f"({built.articles} articles, {built.tweets} tweets)"
+        )
+        return built.text
+
+    def _generate(
+        self,
+        kind: str,
+        stock_data: StockData,
+        portfolio: Dict,
+        local: LocalRisk,
+        instructions: str,
+        system_instruction: List[str],
+        response_schema: Any,
+        signal: Optional[Signal] = None,
+    ) -> Any:
+        """
+        Request a `kind` ("risk" or "combined") answer for one ticker.
+
+        Risk requests get the local risk numbers instead of the raw technicals
+        and fundamentals; combined requests, which also pick the signal, get
+        both. With a context cache only what changed since the ticker's cached
+        context is sent (see `ContextCache`).
+        """
+        facts: Dict[str, Any] = {"Price": stock_data.price}
+        if signal is not None:
+            facts["Proposed trade"] = signal.name
+        if kind == "combined":
+            facts.update(
+                {
+                    "SMA": stock_data.sma,
+                    "RSI": stock_data.rsi,
+                    "MACD": stock_data.macd,
+                    **stock_data.get_fundamentals(),
+                }
+            )
+        facts.update(local.summary(self.limits.var_confidence))
+        portfolio_summary = summarize_portfolio(portfolio, stock_data.ticker)
+        articles = compact_articles(stock_data.news_articles, self.media_items)
+        tweets = compact_tweets(stock_data.tweets, self.media_items)
+        prompt = self._build_prompt(
+            stock_data, facts, portfolio_summary, instructions, articles, tweets
+        )
+
+        def send(contents: str, cached_content: Optional[str]) -> Any:
+            if cached_content is None:
+                config = GenerateContentConfig(
+                    system_instruction=system_instruction,
+                    response_mime_type="application/json",
+                    response_schema=response_schema,
+                )
+            else:
+                config = GenerateContentConfig(
+                    cached_content=cached_content,
+                    response_mime_type="application/json",
+                    response_schema=response_schema,
+                )
+            response = self.invoker.call(
+                self.backend.generate,
+                model=self.model,
+                contents=f'"role": "user", "content": {contents}',
+                config=config,
+            )
+            return response.parsed
+
+        if self.context_cache is None:
+            return send(prompt, None)
+        return self.context_cache.generate(
+            send,
+            key=f"{kind}:{stock_data.ticker.upper()}",
+            full_prompt=prompt,
+            client=self.llm_client,
+            model=self.model,
+            system_instruction=system_instruction,
+            static={
+                "instructions": instructions,
+                "fundamentals": stock_data.get_fundamentals(),
+            },
+            state=dict(facts, Portfolio=portfolio_summary),
+            articles=articles,
+            tweets=tweets,
+        )
+
+    def _approved_size(self, answer: Any, local: LocalRisk) -> float:
+        """
+        The model's position size, capped by the local limit. Without a usable
+        size it is 0, so the trade falls below `min_position_size` and is
+        rejected rather than sized at the limit.
+        """
+        size = _number(_answer_field(answer, "position_size"))
+        return 0.0 if size is None else max(min(size, local.max_size), 0.0)
+
+    def assess_risk(
+        self, stock_data: StockData, portfolio: Dict, signal: Optional[Signal] = None
     ) -> Optional[Tuple[TradeDecision, dict]]:
-        if not self.can_trade():
+        """
+        Risk-assess a trade: hard limits locally, judgement by the model.
+
+        Trades that breach a hard limit (see `local_risk`) are vetoed without a
+        model request. The model gets the local risk numbers and its position
+        size is capped by the local limit.
+
+        Args:
+            stock_data (StockData): The candidate ticker.
+            portfolio (Dict): The current portfolio state.
+            signal (Optional[Signal]): The direction of the trade.
+
+        Returns:
+            Optional[Tuple[TradeDecision, dict]]: The decision and its details
+                (reasoning, position size, metrics), or None if the request failed.
+        """
+        if not self._reserve_trades():
             return TradeDecision.VETOED, {
                 "decision": TradeDecision.VETOED,
                 "reasoning": "Exceeded max daily number of trades.",
             }
+        approved = False
+        try:
+            approved, result = self._assess_reserved(stock_data, portfolio, signal)
+            return result
+        finally:
+            if not approved:
+                self._release_trades()
 
+    def _assess_reserved(
+        self, stock_data: StockData, portfolio: Dict, signal: Optional[Signal]
+    ) -> Tuple[bool, Optional[Tuple[TradeDecision, dict]]]:
+        """`assess_risk` once a daily trade is reserved; (approved, result)."""
+        local = self.local_risk(stock_data, portfolio, signal)
+        if local.vetoes:
+            return False, self._veto(stock_data, local)
+
+        instructions = (
+            "Evaluate the risk of trading this stock and respond with 'APPROVED' or 'REJECTED'.\n"
+            "Consider the volatility, value at risk, correlation with the current "
+            "holdings and market sentiment.\n"
+            "Along with the decision, provide the position size in dollars you think is "
+            "appropriate if the trade is safe, at most the maximum position size above."
+        )
+
+        try:
+            answer = self._generate(
+                "risk",
+                stock_data,
+                portfolio,
+                local,
+                instructions,
+                RISK_SYSTEM_INSTRUCTION,
+                RiskDecision,
+                signal=signal,
+            )
+            decision = {
+                field: _answer_field(answer, field)
+                for field in ("decision", "reasoning", "position_size")
+            }
+            size = self._approved_size(decision, local)
+            decision = dict(
+                decision,
+                position_size=size,
+                metrics=local.summary(self.limits.var_confidence),
+            )
+            if (
+                "APPROVED" in str(decision["decision"])
+                and size >= self.limits.min_position_size
+            ):
+                logger.info(
+                    f"Risk assessment APPROVED for {stock_data.ticker} (${size:.2f})."
+                )
+                return True, (TradeDecision.APPROVED, decision)
+            else:
+                logger.info(f"Risk assessment REJECTED for {stock_data.ticker}.")
+                return False, (TradeDecision.VETOED, decision)
+
+        except Exception as e:
+            logger.error(f"Risk assessment failed for {stock_data.ticker}: {e}")
+            return False, None
+
+    def decide_and_assess(
+        self, stock_data: StockData, portfolio: Dict
+    ) -> Optional[Tuple[Signal, dict, Optional[Tuple[TradeDecision, dict]]]]:
+        """
+        Trading signal and risk assessment from a single model request.
+
+        The model sees the local risk numbers for a BUY; once the signal is
+        known, hard-limit breaches are vetoed and the size is capped locally.
+
+        Args:
+            stock_data (StockData): The analyzed ticker.
+            portfolio (Dict): The current portfolio state.
+
+        Returns:
+            Optional[Tuple[Signal, dict, Optional[Tuple[TradeDecision, dict]]]]:
+                The signal, the model's answer and the risk decision (None for
+                HOLD), or None if the request failed.
+        """
+        if not self._reserve_trades():
+            reasoning = "Exceeded max daily number of trades."
+            return (
+                Signal.HOLD,
+                {"signal": Signal.HOLD.name, "reasoning": reasoning},
+                (
+                    TradeDecision.VETOED,
+                    {"decision": TradeDecision.VETOED, "reasoning": reasoning},
+                ),
+            )
+        result = None
+        try:
+            result = self._decide_reserved(stock_data, portfolio)
+            return result
+        finally:
+            if (
+                result is None
+                or result[2] is None
+                or result[2][0] is not TradeDecision.APPROVED
+            ):
+                self._release_trades()
+
+    def _decide_reserved(
+        self, stock_data: StockData, portfolio: Dict
+    ) -> Optional[Tuple[Signal, dict, Optional[Tuple[TradeDecision, dict]]]]:
+        """`decide_and_assess` once a daily trade is reserved."""
+        measured = self.measure(stock_data, portfolio)
+        buy_risk = self.local_risk(stock_data, portfolio, Signal.BUY, measured)
+        instructions = (
+            "Provide a concise trading signal (BUY, SELL, HOLD) with reasoning and your "
+            "confidence. For BUY or SELL, also evaluate the risk of the trade, considering "
+            "volatility, value at risk, correlation with the holdings, fundamentals and "
+            "market sentiment: respond with 'APPROVED' or 'REJECTED' and the position "
+            "size in dollars, at most the maximum position size above.\n"
+            "Respond in this format:\n"
+            "{\n"
+            '    "signal": "BUY/SELL/HOLD",\n'
+            '    "reasoning": "Detailed reasoning here",\n'
+            '    "confidence": "High/Medium/Low",\n'
+            '    "decision": "APPROVED/REJECTED",\n'
+            '    "position_size": 0.0\n'
+            "}"
+        )
+
+        try:
+            answer = self._generate(
+                "combined",
+                stock_data,
+                portfolio,
+                buy_risk,
+                instructions,
+                COMBINED_SYSTEM_INSTRUCTION,
+                CombinedDecision,
+            )
+            answer = {
+                field: _answer_field(answer, field)
+                for field in (
+                    "signal",
+                    "reasoning",
+                    "confidence",
+                    "decision",
+                    "position_size",
+                )
+            }
+            signal = parse_signal(answer["signal"])
+            if signal is None:
+                self.backend.parse_failure()
+                raise ValueError(f"Unexpected signal {answer['signal']!r}")
+            if signal is Signal.HOLD:
+                return signal, answer, None
+
+            local = (
+                buy_risk
+                if signal is Signal.BUY
+                else self.local_risk(stock_data, portfolio, signal, measured)
+            )
+            if local.vetoes:
+                return signal, answer, self._veto(stock_data, local)
+            size = self._approved_size(answer, local)
+            risk = dict(
+                answer,
+                position_size=size,
+                metrics=local.summary(self.limits.var_confidence),
+            )
+            if (
+                "APPROVED" in str(answer["decision"])
+                and size >= self.limits.min_position_size
+            ):
+                logger.info(f"Combined decision APPROVED for {stock_data.ticker}.")
+                return signal, answer, (TradeDecision.APPROVED, risk)
+            logger.info(f"Combined decision REJECTED for {stock_data.ticker}.")
+            return signal, answer, (TradeDecision.VETOED, risk)
+
+        except Exception as e:
+            logger.error(f"Combined decision failed for {stock_data.ticker}: {e}")
+            return None
+
+    def assess_portfolio(
+        self, candidates: List[Tuple[StockData, Signal]], portfolio: Dict
+    ) -> Dict[str, Optional[Tuple[TradeDecision, dict]]]:
+        """
+        Risk-assess every BUY/SELL candidate of a run together.
+
+        Each candidate gets the checks of `local_risk`, then, over a covariance
+        matrix of cached returns for the candidates and holdings:
+
+        - trades past the daily limit are vetoed (in candidate order),
+        - a BUY correlated above `max_correlation` with an earlier BUY is vetoed,
+        - BUY sizes are scaled down together so they fit in buying power and
+          the one-day VaR of all the run's trades stays within `max_run_var`.
+
+        What is left is judged in one model request; the model can reject or
+        shrink trades but not grow them past the computed sizes.
+
+        Args:
+            candidates (List[Tuple[StockData, Signal]]): The candidate tickers
+                and their signals, highest priority first.
+            portfolio (Dict): The current portfolio state.
+
+        Returns:
+            Dict[str, Optional[Tuple[TradeDecision, dict]]]: Decision by ticker;
+                None where the model request failed.
+        """
+        limits = self.limits
+        candidates = [
+            (stock_data, signal)
+            for stock_data, signal in candidates
+            if signal is not Signal.HOLD
+        ]
+        if not candidates:
+            return {}
+
+        values = _holding_values(portfolio)
+        tickers = [stock_data.ticker.upper() for stock_data, _ in candidates]
+        universe = list(dict.fromkeys(tickers + list(values)))
+        returns = returns_matrix(
+            {ticker: self._closes(ticker) for ticker in universe}, limits.lookback
+        )
+
+        results: Dict[str, Optional[Tuple[TradeDecision, dict]]] = {}
+        remaining = self._reserve_trades(len(candidates))
+        try:
+            self._assess_candidates(
+                candidates, tickers, portfolio, returns, remaining, results
+            )
+        finally:
+            approved = sum(
+                1
+                for result in results.values()
+                if result is not None and result[0] is TradeDecision.APPROVED
+            )
+            self._release_trades(remaining - approved)
+        return results
+
+    def _assess_candidates(
+        self,
+        candidates: List[Tuple[StockData, Signal]],
+        tickers: List[str],
+        portfolio: Dict,
+        returns: pd.DataFrame,
+        remaining: int,
+        results: Dict[str, Optional[Tuple[TradeDecision, dict]]],
+    ) -> None:
+        """`assess_portfolio` once `remaining` daily trades are reserved."""
+        limits = self.limits
+        values = _holding_values(portfolio)
+        columns = list(returns.columns)
+        matrix = returns.to_numpy() if columns else np.empty((0, 0))
+        volatility = realized_volatility(matrix) if columns else np.array([])
+        var = historical_var(matrix, limits.var_confidence) if columns else np.array([])
+        survivors: List[Tuple[StockData, Signal, LocalRisk]] = []
+        for (stock_data, signal), ticker in zip(candidates, tickers):
+            measured: Tuple[Optional[float], ...] = (None, None, None)
+            if ticker in columns:
+                i = columns.index(ticker)
+                held = [t for t in values if t != ticker and t in columns]
+                correlation = None
+                if held:
+                    correlation = portfolio_correlation(
+                        matrix[:, i],
+                        matrix[:, [columns.index(t) for t in held]],
+                        [values[t] for t in held],
+                    )
+                measured = (_finite(volatility[i]), _finite(var[i]), correlation)
+            local = self.local_risk(stock_data, portfolio, signal, measured)
+            if not local.vetoes and len(survivors) >= remaining:
+                local.vetoes.append("Exceeded max daily number of trades.")
+            if local.vetoes:
+                results[ticker] = self._veto(stock_data, local)
+            else:
+                survivors.append((stock_data, signal, local))
+
+        survivors = self._size_jointly(survivors, returns, portfolio, results)
+        if survivors:
+            results.update(self._review_jointly(survivors, portfolio))
+
+    def _size_jointly(
+        self,
+        survivors: List[Tuple[StockData, Signal, LocalRisk]],
+        returns: pd.DataFrame,
+        portfolio: Dict,
+        results: Dict[str, Optional[Tuple[TradeDecision, dict]]],
+    ) -> List[Tuple[StockData, Signal, LocalRisk]]:
+        """Cross-trade correlation, buying power and run VaR limits."""
+        limits = self.limits
+        if not survivors:
+            return survivors
+        tickers = [stock_data.ticker.upper() for stock_data, _, _ in survivors]
+        known = [ticker for ticker in tickers if ticker in returns]
+        cov = np.zeros((len(tickers), len(tickers)))
+        if known:
+            index = [tickers.index(ticker) for ticker in known]
+            cov[np.ix_(index, index)] = covariance(returns[known])
+        stdev = np.sqrt(np.diag(cov))
+
+        buys = np.array([signal is Signal.BUY for _, signal, _ in survivors])
+        keep = np.ones(len(survivors), dtype=bool)
+        for i in np.flatnonzero(buys):
+            for j in np.flatnonzero(buys[:i] & keep[:i]):
+                if stdev[i] > 0 and stdev[j] > 0:
+                    correlation = cov[i, j] / (stdev[i] * stdev[j])
+                    if correlation > limits.max_correlation:
+                        keep[i] = False
+                        survivors[i][2].vetoes.append(
+                            f"Correlation {correlation:.2f} with {tickers[j]}, "
+                            "also bought this run"
+                        )
+                        break
+
+        sizes = np.array([local.max_size for _, _, local in survivors])
+        sizes = np.where(keep, sizes, 0.0)
+        bought = np.where(buys, sizes, 0.0)
+        sold = np.where(buys, 0.0, -sizes)
+        scale = 1.0
+        summary = summarize_portfolio(portfolio, "")
+        cash = _number(summary["cash"])
+        if cash is not None and bought.sum() > cash:
+            scale = cash / bought.sum()
+        equity = _number(summary["total_equity"])
+        if equity is None and cash is not None:
+            equity = cash + sum(_holding_values(portfolio).values())
+        if equity and bought.any():
+            budget = limits.max_run_var / 100 * equity
+            scale = min(scale, _var_scale(bought, sold, cov, limits, budget))
+
+        kept = []
+        for i, (stock_data, signal, local) in enumerate(survivors):
+            if buys[i] and keep[i]:
+                local.max_size = round(float(sizes[i] * scale), 2)
+                if local.max_size < limits.min_position_size:
+                    local.vetoes.append(
+                        "No room left within this run's buying power and VaR limits"
+                    )
+            if local.vetoes:
+                results[tickers[i]] = self._veto(stock_data, local)
+            else:
+                kept.append((stock_data, signal, local))
+        if scale < 1:
+            logger.info(f"Scaled this run's purchases to {scale:.0%} of their limits")
+        return kept
+
+    def _review_jointly(
+        self,
+        survivors: List[Tuple[StockData, Signal, LocalRisk]],
+        portfolio: Dict,
+    ) -> Dict[str, Optional[Tuple[TradeDecision, dict]]]:
+        """One model request over the trades that passed the local checks."""
+        sections = []
+        for stock_data, signal, local in survivors:
+            headlines = [
+                article["title"]
+                for article in compact_articles(stock_data.news_articles, 2)
+            ]
+            facts = {
+                "Proposed trade": signal.name,
+                "Price": stock_data.price,
+                **local.summary(self.limits.var_confidence),
+                "Headlines": headlines,
+            }
+            sections.append(
+                f"Ticker: {stock_data.ticker}\n"
+                + "".join(f"{name}: {value}\n" for name, value in facts.items())
+            )
         prompt = (
-            f"Given the following stock data:\n"
-            f"Ticker: {stock_data.ticker}\n"
-            f"Price: {stock_data.price}\n"
-            f"SMA: {stock_data.sma}\n"
-            f"RSI: {stock_data.rsi}\n"
-            f"MACD: {stock_data.macd}\n"
-            f"PE Ratio: {stock_data.pe_ratio}\n"
-            f"PEG Ratio: {stock_data.peg_ratio}\n"
-            f"ROE: {stock_data.roe}\n"
-            f"Revenue Growth: {stock_data.revenue_growth}\n"
-            f"EPS Growth: {stock_data.eps_growth}\n"
-            f"D/E Ratio: {stock_data.de_ratio}\n"
-            f"News Articles: {stock_data.news_articles} articles\n"
-            f"Tweets: {stock_data.tweets} tweets\n"
-            f"Portfolio: {portfolio}\n\n"
-            "Evaluate the risk of trading this stock and respond with 'APPROVE' or 'REJECT'.\n"
-            "Consider factors like volatility, fundamentals, and market sentiment.\n"
-            "Along with the decision, provide the position size you think is appropriate, "
-            f"if the trade is safe and the maximum size for one trade is ${MAX_POSITION_SIZE}."
-            f"Make sure the position is not over {MAX_PORTFOLIO_SHARE}% of the total portfolio."
+            "Given the following proposed trades:\n"
+            + "\n".join(sections)
+            + f"\nPortfolio: {summarize_portfolio(portfolio, '')}\n\n"
+            "Evaluate the risk of these trades together, considering their volatility, "
+            "value at risk, correlation with the holdings and with each other, and "
+            "market sentiment. For every ticker respond with 'APPROVED' or 'REJECTED' "
+            "and the position size in dollars, at most its maximum position size."
+        )
+        logger.info(
+            f"Portfolio risk prompt for {len(survivors)} trades: "
+            f"~{estimate_tokens(prompt)} tokens"
         )
 
         try:
-            response = self.llm_client.models.generate_content(
-                model="gemini-2.5-flash",
+            response = self.invoker.call(
+                self.backend.generate,
+                model=self.model,
                 contents=f'"role": "user", "content": {prompt}',
                 config=GenerateContentConfig(
-                    system_instruction=[
-                        "You are a risk management assistant. \
-                        Provide clear and concise risk analyses based on the data provided \
-                        along with a detailed research and reasoning for your decision."
-                    ],
+                    system_instruction=PORTFOLIO_SYSTEM_INSTRUCTION,
                     response_mime_type="application/json",
-                    response_schema=RiskDecision,
+                    response_schema=list[PortfolioRiskDecision],
                 ),
             )
+            answers = response.parsed
+            if not isinstance(answers, list):
+                raise ValueError(f"Expected a list of decisions, got {answers!r}")
+        except Exception as e:
+            logger.error(f"Portfolio risk assessment failed: {e}")
+            return {stock_data.ticker.upper(): None for stock_data, _, _ in survivors}
 
-            decision = response.parsed
-            if "APPROVED" in decision["decision"]:
-                logger.info(f"Risk assessment APPROVED for {stock_data.ticker}.")
-                self.daily_trades += 1
-                return TradeDecision.APPROVED, decision
+        by_ticker = {
+            str(_answer_field(answer, "ticker") or "").upper(): answer
+            for answer in answers
+        }
+        results: Dict[str, Optional[Tuple[TradeDecision, dict]]] = {}
+        for stock_data, _, local in survivors:
+            ticker = stock_data.ticker.upper()
+            answer = by_ticker.get(ticker)
+            if answer is None:
+                self.backend.parse_failure()
+                logger.warning(f"No portfolio risk decision for {ticker}")
+                results[ticker] = (
+                    TradeDecision.VETOED,
+                    {
+                        "decision": TradeDecision.VETOED,
+                        "reasoning": "No decision from the risk model.",
+                        "position_size": 0.0,
+                    },
+                )
+                continue
+            answer = {
+                field: _answer_field(answer, field)
+                for field in ("decision", "reasoning", "position_size")
+            }
+            size = self._approved_size(answer, local)
+            risk = dict(
+                answer,
+                position_size=size,
+                metrics=local.summary(self.limits.var_confidence),
+            )
+            if (
+                "APPROVED" in str(answer["decision"])
+                and size >= self.limits.min_position_size
+            ):
+                logger.info(f"Portfolio risk APPROVED {ticker} (${size:.2f}).")
+                results[ticker] = TradeDecision.APPROVED, risk
             else:
-                logger.info(f"Risk assessment REJECTED for {stock_data.ticker}.")
-                return TradeDecision.VETOED, decision
+                logger.info(f"Portfolio risk REJECTED {ticker}.")
+                results[ticker] = TradeDecision.VETOED, risk
+        return results
 
-        except Exception as e:
-            logger.error(f"Risk assessment failed for {stock_data.ticker}: {e}")
-            return None
+
+def _var_scale(
+    bought: np.ndarray,
+    sold: np.ndarray,
+    cov: np.ndarray,
+    limits: RiskLimits,
+    budget: float,
+) -> float:
+    """
+    Largest k in [0, 1] with parametric_var(k * bought + sold) <= budget.
+    """
+    if parametric_var(bought + sold, cov, limits.var_confidence) <= budget:
+        return 1.0
+    z = parametric_var(np.ones(1), np.ones((1, 1)), limits.var_confidence)
+    # (k b + s)' C (k b + s) <= (budget / z)^2, a quadratic in k
+    a = float(bought @ cov @ bought)
+    b = 2 * float(bought @ cov @ sold)
+    c = float(sold @ cov @ sold) - (budget / z) ** 2
+    discriminant = b * b - 4 * a * c
+    if a <= 0 or discriminant < 0:
+        return 0.0
+    return float(np.clip((-b + math.sqrt(discriminant)) / (2 * a), 0.0, 1.0))
@@ -1,10 +1,38 @@
+import hashlib
+import json
+import logging
+import math
+import time
 from enum import Enum
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Any, Union
+from dataclasses import dataclass, fields
+from typing import Callable, Dict, List, Optional, Any, Union
 
-from google import genai
 from google.genai.types import GenerateContentConfig
 
+from tradebot.cache import CacheStats, LRUCache
+from tradebot.clients.context_cache import ContextCache
+from tradebot.clients.llm import LLMInvoker
+from tradebot.clients.llm_backend import GeminiBackend, ModelBackend
+from tradebot.prompts import (
+    build_prompt,
+    compact_articles,
+    compact_tweets,
+    estimate_tokens,
+)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "gemini-2.5-flash"
+# Most news articles and tweets included in a strategy prompt (fewer if the
+# prompt would go over its token budget)
+PROMPT_MEDIA_ITEMS = 5
+SYSTEM_INSTRUCTION = [
+    "You are a financial trading assistant. \
+    Provide clear and concise trading signals based on the data provided \
+    along with a detailed research and reasoning for your decision.",
+]
+
 
 class Signal(Enum):
     BUY = 1
@@ -19,6 +47,31 @@ class TradeSignal:
     confidence: float
 
 
+@dataclass
+class BatchTradeSignal:
+    ticker: str
+    signal: Signal
+    reasoning: str
+    confidence: float
+
+
+def _answer_field(answer: Any, name: str) -> Any:
+    if isinstance(answer, dict):
+        return answer.get(name)
+    return getattr(answer, name, None)
+
+
+def parse_signal(value: Any) -> Optional[Signal]:
+    if isinstance(value, Signal):
+        return value
+    if not isinstance(value, str):
+        return None
+    for signal in (Signal.BUY, Signal.SELL, Signal.HOLD):
+        if signal.name in value.upper():
+            return signal
+    return None
+
+
 @dataclass
 class StockData:
     ticker: str
@@ -27,14 +80,17 @@ class StockData:
     sma: float
     rsi: float
     macd: float
-    pe_ratio: float
-    peg_ratio: float
-    roe: float
-    revenue_growth: float
-    eps_growth: float
-    de_ratio: float
+    # fundamentals are None when the provider did not report them
+    pe_ratio: Optional[float]
+    peg_ratio: Optional[float]
+    roe: Optional[float]
+    revenue_growth: Optional[float]
+    eps_growth: Optional[float]
+    de_ratio: Optional[float]
     news_articles: List[dict]
     tweets: List
+    macd_hist: Optional[float] = None
+    macd_signal: Optional[float] = None
 
     def get_basic_info(self) -> Dict[str, Optional[Union[float, str]]]:
         return {
@@ -58,6 +114,8 @@ class StockData:
             "SMA": self.sma,
             "RSI": self.rsi,
             "MACD": self.macd,
+            "MACD Histogram": self.macd_hist,
+            "MACD Signal": self.macd_signal,
         }
 
     def get_media(self) -> Dict[str, Optional[List[dict]]]:
@@ -67,9 +125,117 @@ class StockData:
         }
 
 
+def _bucket(value: Any, tolerance: float) -> Any:
+    """
+    Map a number onto a logarithmic bucket roughly `tolerance` (relative) wide,
+    so values that differ by less than that usually share a bucket.
+    """
+    if value is None or isinstance(value, (str, bool)):
+        return value
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return repr(value)
+    if not math.isfinite(value) or value == 0 or tolerance <= 0:
+        return repr(value)
+    return [
+        1 if value > 0 else -1,
+        round(math.log(abs(value)) / math.log1p(tolerance)),
+    ]
+
+
+class DecisionCache:
+    """
+    Content-addressed cache of `StrategyEngine.decide_trade` results.
+
+    The key is a hash of the template, the model and the `StockData` fields,
+    with every number bucketed to a relative `tolerance` (overridable per field
+    through `tolerances`) and the media reduced to what the prompt actually
+    shows. Entries expire after `ttl` seconds, the least recently used are
+    evicted past `max_entries`, and with `directory` set they survive restarts.
+    """
+
+    def __init__(
+        self,
+        directory: Optional[str] = None,
+        ttl: Optional[float] = 12 * 60 * 60,
+        max_entries: int = 1024,
+        tolerance: float = 0.01,
+        tolerances: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.tolerance = tolerance
+        self.tolerances = tolerances or {}
+        self._cache = LRUCache(
+            max_entries=max_entries, ttl=ttl, directory=directory, clock=clock
+        )
+
+    @property
+    def stats(self) -> CacheStats:
+        return self._cache.stats
+
+    def key(self, stock_data: StockData, template: str, model: str) -> str:
+        normalized: Dict[str, Any] = {"template": template, "model": model}
+        for field in fields(stock_data):
+            value = getattr(stock_data, field.name)
+            if field.name == "ticker":
+                normalized["ticker"] = value.upper()
+            elif field.name == "news_articles":
+                normalized["news_articles"] = compact_articles(
+                    value, PROMPT_MEDIA_ITEMS
+                )
+            elif field.name == "tweets":
+                normalized["tweets"] = compact_tweets(value, PROMPT_MEDIA_ITEMS)
+            else:
+                tolerance = self.tolerances.get(field.name, self.tolerance)
+                normalized[field.name] = _bucket(value, tolerance)
+        payload = json.dumps(normalized, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._cache
+
+    def get(self, key: str) -> Optional[tuple]:
+        return self._cache.get(key)
+
+    def put(self, key: str, decision: tuple) -> None:
+        self._cache.put(key, decision)
+
+
 class StrategyEngine:
-    def __init__(self):
-        self.llm_client = genai.Client()
+    def __init__(
+        self,
+        decision_cache: Optional[DecisionCache] = None,
+        model: str = DEFAULT_MODEL,
+        batch_tokens: int = 8000,
+        invoker: Optional[LLMInvoker] = None,
+        max_prompt_tokens: int = 1000,
+        context_cache: Optional[ContextCache] = None,
+        backend: Optional[ModelBackend] = None,
+        media_items: int = PROMPT_MEDIA_ITEMS,
+    ):
+        self.backend = backend or GeminiBackend()
+        self.invoker = invoker or LLMInvoker()
+        self.decision_cache = decision_cache
+        self.context_cache = context_cache
+        self.model = model
+        self.batch_tokens = batch_tokens
+        self.max_prompt_tokens = max_prompt_tokens
+        # articles and tweets per single-ticker prompt (batches keep the default)
+        self.media_items = media_items
+
+    @property
+    def llm_client(self) -> Any:
+        """The backend's `genai.Client`-like client."""
+        return self.backend.client
+
+    @llm_client.setter
+    def llm_client(self, client: Any) -> None:
+        self.backend = GeminiBackend(
+            client,
+            metrics=self.backend.metrics,
+            timeout=getattr(self.backend, "timeout", None),
+        )
 
     def _load_prompt_template(self, template_name: str) -> str:
         templates = {
@@ -89,13 +255,123 @@ class StrategyEngine:
         }
         return templates.get(template_name, "")
 
-    def _format_prompt(self, template: str, stock_data: StockData) -> str:
-        return template.format(
-            basic_info=stock_data.get_basic_info(),
-            fundamentals=stock_data.get_fundamentals(),
-            technicals=stock_data.get_technicals(),
-            news_articles=stock_data.news_articles[:3],
-            tweets=[tweet.text for tweet in stock_data.tweets[:3]],
+    def _format_prompt(
+        self,
+        template: str,
+        stock_data: StockData,
+        articles: Optional[List[dict]] = None,
+        tweets: Optional[List[str]] = None,
+    ) -> str:
+        def render(articles: List[dict], tweets: List[str]) -> str:
+            return template.format(
+                basic_info=stock_data.get_basic_info(),
+                fundamentals=stock_data.get_fundamentals(),
+                technicals=stock_data.get_technicals(),
+                news_articles=articles,
+                tweets=tweets,
+            )
+
+        if articles is None:
+            articles = compact_articles(stock_data.news_articles, PROMPT_MEDIA_ITEMS)
+        if tweets is None:
+            tweets = compact_tweets(stock_data.tweets, PROMPT_MEDIA_ITEMS)
+        prompt = build_prompt(render, articles, tweets, self.max_prompt_tokens)
+        logger.info(
+            f"Strategy prompt for {stock_data.ticker}: ~{prompt.tokens} tokens "
+            f"({prompt.articles} articles, {prompt.tweets} tweets)"
+        )
+        return prompt.text
+
+    def _load_batch_templates(self, template_name: str) -> tuple[str, str]:
+        """(per-ticker section, batch prompt) templates for `decide_trades`."""
+        templates = {
+            "basic_analysis": (
+                """Basic Info: {basic_info}
+                Fundamentals: {fundamentals}
+                Technicals: {technicals}
+                News Articles: {news_articles}
+                Tweets: {tweets}
+                """,
+                """Given the following data for several stocks:
+                {sections}
+                Provide a concise trading signal (BUY, SELL, HOLD) with reasoning for every ticker, as a list in this format:
+                [{{
+                    "ticker": "TICKER",
+                    "signal": "BUY/SELL/HOLD",
+                    "reasoning": "Detailed reasoning here",
+                    "confidence": "High/Medium/Low"
+                }}]
+                """,
+            )
+        }
+        return templates.get(template_name, ("", ""))
+
+    def _cache_key(self, stock_data: StockData, strategy: str) -> Optional[str]:
+        if self.decision_cache is None:
+            return None
+        template = self._load_prompt_template(strategy)
+        return self.decision_cache.key(stock_data, f"{strategy}:{template}", self.model)
+
+    def _cached_decision(self, cache_key: Optional[str]) -> Optional[tuple]:
+        if cache_key is None or self.decision_cache is None:
+            return None
+        return self.decision_cache.get(cache_key)
+
+    def _generate(
+        self, prompt: str, response_schema: Any, cached_content: Optional[str] = None
+    ) -> Any:
+        if cached_content is None:
+            config = GenerateContentConfig(
+                system_instruction=SYSTEM_INSTRUCTION,
+                response_mime_type="application/json",
+                response_schema=response_schema,
+            )
+        else:
+            # the system instruction is part of the cached context
+            config = GenerateContentConfig(
+                cached_content=cached_content,
+                response_mime_type="application/json",
+                response_schema=response_schema,
+            )
+        response = self.invoker.call(
+            self.backend.generate,
+            model=self.model,
+            contents=f'"role": "user", "content": "{prompt}"',
+            config=config,
+        )
+        return response.parsed
+
+    def _generate_in_context(
+        self, stock_data: StockData, template: str, response_schema: Any
+    ) -> Any:
+        """
+        Single-ticker request that, with a context cache, only sends what
+        changed since the ticker's cached context (see `ContextCache`).
+        """
+        articles = compact_articles(stock_data.news_articles, self.media_items)
+        tweets = compact_tweets(stock_data.tweets, self.media_items)
+        prompt = self._format_prompt(template, stock_data, articles, tweets)
+        if self.context_cache is None:
+            return self._generate(prompt, response_schema)
+
+        state = {f"Basic Info {k}": v for k, v in stock_data.get_basic_info().items()}
+        state.update(
+            {f"Technicals {k}": v for k, v in stock_data.get_technicals().items()}
+        )
+        return self.context_cache.generate(
+            lambda contents, cached: self._generate(contents, response_schema, cached),
+            key=f"strategy:{stock_data.ticker.upper()}",
+            full_prompt=prompt,
+            client=self.llm_client,
+            model=self.model,
+            system_instruction=SYSTEM_INSTRUCTION,
+            static={
+                "template": template,
+                "fundamentals": stock_data.get_fundamentals(),
+            },
+            state=state,
+            articles=articles,
+            tweets=tweets,
         )
 
     def decide_trade(
@@ -105,27 +381,159 @@ class StrategyEngine:
         if not prompt_template:
             raise ValueError(f"Unknown strategy: {strategy}")
 
-        prompt = self._format_prompt(prompt_template, stock_data)
+        cache_key = self._cache_key(stock_data, strategy)
+        cached = self._cached_decision(cache_key)
+        if cached is not None:
+            logger.info(f"Using cached trade decision for {stock_data.ticker}")
+            return cached
 
-        response = self.llm_client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=f'"role": "user", "content": "{prompt}"',
-            config=GenerateContentConfig(
-                system_instruction=[
-                    "You are a financial trading assistant. \
-                    Provide clear and concise trading signals based on the data provided \
-                    along with a detailed research and reasoning for your decision.",
-                ],
-                response_mime_type="application/json",
-                response_schema=list[TradeSignal],
-            ),
+        answer = self._generate_in_context(stock_data, prompt_template, TradeSignal)
+        signal = parse_signal(_answer_field(answer, "signal"))
+        if signal is None:
+            if answer is not None:
+                # replies that did not parse at all are counted by the backend
+                self.backend.parse_failure()
+            raise ValueError(f"Malformed trade decision for {stock_data.ticker}")
+        decision = signal, answer
+
+        if cache_key is not None and self.decision_cache is not None:
+            self.decision_cache.put(cache_key, decision)
+        return decision
+
+    def decide_trades(
+        self, stocks: List[StockData], strategy: str = "basic_analysis"
+    ) -> Dict[str, tuple[Signal, Any]]:
+        """
+        Decide on many tickers with as few model requests as possible.
+
+        Tickers are packed into shared requests of at most `batch_tokens`
+        (estimated) prompt tokens. Any ticker missing from a batch response, or
+        with a malformed entry, is retried on its own with `decide_trade`.
+
+        Args:
+            stocks (List[StockData]): The tickers to decide on.
+            strategy (str): The prompt template to use.
+
+        Returns:
+            Dict[str, tuple[Signal, Any]]: (signal, answer) keyed by ticker, for
+                every ticker a decision could be made for.
+        """
+        section_template, batch_template = self._load_batch_templates(strategy)
+        if not section_template:
+            raise ValueError(f"Unknown strategy: {strategy}")
+
+        decisions: Dict[str, tuple[Signal, Any]] = {}
+        pending: List[tuple[StockData, str, Optional[str]]] = []
+        for stock_data in stocks:
+            cache_key = self._cache_key(stock_data, strategy)
+            cached = self._cached_decision(cache_key)
+            if cached is not None:
+                decisions[stock_data.ticker] = cached
+                continue
+            section = self._batch_section(section_template, stock_data)
+            pending.append((stock_data, section, cache_key))
+
+        overhead = estimate_tokens(batch_template)
+        batch: List[tuple[StockData, str, Optional[str]]] = []
+        batch_tokens = overhead
+        for item in pending:
+            tokens = estimate_tokens(item[1])
+            if batch and batch_tokens + tokens > self.batch_tokens:
+                decisions.update(self._decide_batch(batch, batch_template, strategy))
+                batch, batch_tokens = [], overhead
+            batch.append(item)
+            batch_tokens += tokens
+        if batch:
+            decisions.update(self._decide_batch(batch, batch_template, strategy))
+
+        logger.info(
+            f"Decided on {len(decisions)}/{len(stocks)} tickers "
+            f"({len(stocks) - len(pending)} from cache)"
         )
+        return decisions
 
-        answer = response.parsed
+    def request_costs(
+        self, stocks: List[StockData], strategy: str = "basic_analysis"
+    ) -> Dict[str, tuple[float, int]]:
+        """
+        Estimate what `decide_trades` would spend on each ticker.
 
-        if "BUY" in answer["signal"]:
-            return Signal.BUY, answer
-        elif "SELL" in answer["signal"]:
-            return Signal.SELL, answer
-        else:
-            return Signal.HOLD, answer
+        A ticker's share of a batched request is the fraction of `batch_tokens`
+        its section takes up; tickers with a cached decision cost nothing.
+
+        Args:
+            stocks (List[StockData]): The tickers to decide on.
+            strategy (str): The prompt template to use.
+
+        Returns:
+            Dict[str, tuple[float, int]]: (model requests, prompt tokens) keyed
+                by ticker.
+        """
+        section_template, batch_template = self._load_batch_templates(strategy)
+        if not section_template:
+            raise ValueError(f"Unknown strategy: {strategy}")
+
+        overhead = estimate_tokens(batch_template)
+        room = max(self.batch_tokens - overhead, 1)
+        costs: Dict[str, tuple[float, int]] = {}
+        for stock_data in stocks:
+            cache_key = self._cache_key(stock_data, strategy)
+            if (
+                cache_key is not None
+                and self.decision_cache is not None
+                and cache_key in self.decision_cache
+            ):
+                costs[stock_data.ticker] = (0.0, 0)
+                continue
+            tokens = estimate_tokens(self._batch_section(section_template, stock_data))
+            share = min(tokens / room, 1.0)
+            costs[stock_data.ticker] = (share, tokens + math.ceil(share * overhead))
+        return costs
+
+    def _batch_section(self, section_template: str, stock_data: StockData) -> str:
+        return f"Ticker: {stock_data.ticker}\n" + self._format_prompt(
+            section_template, stock_data
+        )
+
+    def _decide_batch(
+        self,
+        batch: List[tuple[StockData, str, Optional[str]]],
+        batch_template: str,
+        strategy: str,
+    ) -> Dict[str, tuple[Signal, Any]]:
+        decisions: Dict[str, tuple[Signal, Any]] = {}
+        if len(batch) > 1:
+            prompt = batch_template.format(
+                sections="\n".join(section for _, section, _ in batch)
+            )
+            try:
+                answers = self._generate(prompt, list[BatchTradeSignal]) or []
+            except Exception as e:
+                logger.error(f"Batched trade decision failed: {e}")
+                answers = []
+
+            by_ticker = {item[0].ticker.upper(): item for item in batch}
+            for answer in answers if isinstance(answers, list) else []:
+                ticker = str(_answer_field(answer, "ticker") or "").upper()
+                signal = parse_signal(_answer_field(answer, "signal"))
+                item = by_ticker.get(ticker)
+                if item is None or signal is None:
+                    self.backend.parse_failure()
+                    continue
+                stock_data, _, cache_key = item
+                decisions[stock_data.ticker] = signal, answer
+                if cache_key is not None and self.decision_cache is not None:
+                    self.decision_cache.put(cache_key, (signal, answer))
+
+        for stock_data, _, _ in batch:
+            if stock_data.ticker in decisions:
+                continue
+            if len(batch) > 1:
+                logger.warning(
+                    f"No usable batched decision for {stock_data.ticker}, retrying alone"
+                )
+            try:
+                decisions[stock_data.ticker] = self.decide_trade(stock_data, strategy)
+            except Exception as e:
+                logger.error(f"Trade decision failed for {stock_data.ticker}: {e}")
+        return decisions